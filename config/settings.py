@@ -177,6 +177,49 @@ TELEGRAM_LOG_TOPIC_ID = getenv('TELEGRAM_LOG_TOPIC_ID', '1')
 TELEGRAM_NEW_BOT_ADMIN_APPROVAL = bool(getenv('TELEGRAM_NEW_BOT_ADMIN_APPROVAL', '1'))
 TELEGRAM_LANGUAGES = getenv('TELEGRAM_LANGUAGES', 'en').split(' ')
 
+# Feedback bots runtime
+TELEGRAM_BOT_API_URL = getenv('TELEGRAM_BOT_API_URL', 'https://api.telegram.org/bot')
+TELEGRAM_BOT_POOL_SIZE = int(getenv('TELEGRAM_BOT_POOL_SIZE', '512'))
+TELEGRAM_BOT_POOL_IDLE_TIMEOUT = int(getenv('TELEGRAM_BOT_POOL_IDLE_TIMEOUT', '900'))
+TELEGRAM_BOT_CONFIG_CACHE_SIZE = int(getenv('TELEGRAM_BOT_CONFIG_CACHE_SIZE', '4096'))
+TELEGRAM_BOT_CONFIG_CACHE_TTL = int(getenv('TELEGRAM_BOT_CONFIG_CACHE_TTL', '30'))
+TELEGRAM_BAN_INDEX_CACHE_SIZE = int(getenv('TELEGRAM_BAN_INDEX_CACHE_SIZE', '4096'))
+TELEGRAM_BAN_INDEX_TTL = int(getenv('TELEGRAM_BAN_INDEX_TTL', '5'))
+TELEGRAM_BAN_INDEX_BLOOM_THRESHOLD = int(getenv('TELEGRAM_BAN_INDEX_BLOOM_THRESHOLD', '10000'))
+TELEGRAM_MAPPING_CACHE_SIZE = int(getenv('TELEGRAM_MAPPING_CACHE_SIZE', '256'))
+TELEGRAM_MAPPING_CACHE_BOTS = int(getenv('TELEGRAM_MAPPING_CACHE_BOTS', '1024'))
+TELEGRAM_FEEDBACK_CHAT_CACHE_SIZE = int(getenv('TELEGRAM_FEEDBACK_CHAT_CACHE_SIZE', '10000'))
+TELEGRAM_FEEDBACK_CHAT_CACHE_TTL = int(getenv('TELEGRAM_FEEDBACK_CHAT_CACHE_TTL', '60'))
+TELEGRAM_ANTIFLOOD_BURST = int(getenv('TELEGRAM_ANTIFLOOD_BURST', '1'))
+TELEGRAM_ANTIFLOOD_CACHE_SIZE = int(getenv('TELEGRAM_ANTIFLOOD_CACHE_SIZE', '100000'))
+TELEGRAM_MEDIA_GROUP_WINDOW = float(getenv('TELEGRAM_MEDIA_GROUP_WINDOW', '1'))
+TELEGRAM_HTTP_POOL_SIZE = int(getenv('TELEGRAM_HTTP_POOL_SIZE', '256'))
+TELEGRAM_HTTP_POOL_TIMEOUT = float(getenv('TELEGRAM_HTTP_POOL_TIMEOUT', '5'))
+TELEGRAM_HTTP_KEEPALIVE_EXPIRY = float(getenv('TELEGRAM_HTTP_KEEPALIVE_EXPIRY', '60'))
+TELEGRAM_HTTP_VERSION = getenv('TELEGRAM_HTTP_VERSION', '2')
+TELEGRAM_CONCURRENT_UPDATES = int(getenv('TELEGRAM_CONCURRENT_UPDATES', '64'))
+TELEGRAM_WEBHOOK_FAST_ACK = bool_env('TELEGRAM_WEBHOOK_FAST_ACK', 'false')
+TELEGRAM_WEBHOOK_REPLY_IN_RESPONSE = bool_env('TELEGRAM_WEBHOOK_REPLY_IN_RESPONSE', 'false')
+TELEGRAM_UPDATE_JOURNAL_PATH = getenv('TELEGRAM_UPDATE_JOURNAL_PATH', 'ptb-updates.sqlite3')
+TELEGRAM_UPDATE_JOURNAL_MAX_ATTEMPTS = int(getenv('TELEGRAM_UPDATE_JOURNAL_MAX_ATTEMPTS', '3'))
+TELEGRAM_UPDATE_JOURNAL_REPLAY_DELAY = int(getenv('TELEGRAM_UPDATE_JOURNAL_REPLAY_DELAY', '60'))
+TELEGRAM_UPDATE_JOURNAL_RETENTION = int(getenv('TELEGRAM_UPDATE_JOURNAL_RETENTION', '86400'))
+TELEGRAM_UPDATE_DEDUP_WINDOW = int(getenv('TELEGRAM_UPDATE_DEDUP_WINDOW', '600'))
+TELEGRAM_UPDATE_DEDUP_CACHE_SIZE = int(getenv('TELEGRAM_UPDATE_DEDUP_CACHE_SIZE', '50000'))
+TELEGRAM_WEBHOOK_WORKERS = int(getenv('TELEGRAM_WEBHOOK_WORKERS', '16'))
+TELEGRAM_WEBHOOK_QUEUE_SIZE = int(getenv('TELEGRAM_WEBHOOK_QUEUE_SIZE', '1000'))
+TELEGRAM_WEBHOOK_SETUP_CONCURRENCY = int(getenv('TELEGRAM_WEBHOOK_SETUP_CONCURRENCY', '16'))
+TELEGRAM_WEBHOOK_TEARDOWN_ON_SHUTDOWN = bool_env('TELEGRAM_WEBHOOK_TEARDOWN_ON_SHUTDOWN', 'false')
+TELEGRAM_POLLING_CONCURRENCY = int(getenv('TELEGRAM_POLLING_CONCURRENCY', '64'))
+TELEGRAM_POLLING_TIMEOUT = int(getenv('TELEGRAM_POLLING_TIMEOUT', '30'))
+TELEGRAM_POLLING_OFFSETS_PATH = getenv('TELEGRAM_POLLING_OFFSETS_PATH', 'polling-offsets.json')
+TELEGRAM_FLUSH_INTERVAL = float(getenv('TELEGRAM_FLUSH_INTERVAL', '5'))
+TELEGRAM_STATS_FLUSH_THRESHOLD = int(getenv('TELEGRAM_STATS_FLUSH_THRESHOLD', '1000'))
+TELEGRAM_RETENTION_DAYS = int(getenv('TELEGRAM_RETENTION_DAYS', '0'))
+TELEGRAM_RETENTION_MAX_MAPPINGS = int(getenv('TELEGRAM_RETENTION_MAX_MAPPINGS', '0'))
+TELEGRAM_RETENTION_BATCH_SIZE = int(getenv('TELEGRAM_RETENTION_BATCH_SIZE', '1000'))
+TELEGRAM_BUILDER_HANDOFF_SOCKET = getenv('TELEGRAM_BUILDER_HANDOFF_SOCKET', 'ptb-handoff.sock')
+
 # Logging
 if DEBUG:
     from rich.console import Console
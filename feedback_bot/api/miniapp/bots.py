@@ -6,7 +6,6 @@ from django.http import HttpRequest
 from django.utils.translation import gettext_lazy as _
 from ninja import Field, Schema
 from ninja.errors import ValidationError
-from telegram import Bot, Update
 from telegram.constants import MessageLimit
 from telegram.error import InvalidToken
 
@@ -28,7 +27,10 @@ from feedback_bot.crud import (
 )
 from feedback_bot.models import BannedUser, BotStats
 from feedback_bot.models import Bot as BotModel
+from feedback_bot.telegram.feedback_bot.bot import get_feedback_allowed_updates
+from feedback_bot.telegram.feedback_bot.pool import get_application_pool
 from feedback_bot.telegram.utils.cryptography import generate_bot_webhook_secret
+from feedback_bot.telegram.utils.http import build_bot
 
 BOT_TOKEN_PATTERN = r'^[0-9]{8,10}:[a-zA-Z0-9_-]{30,64}$'  # noqa: S105
 
@@ -83,6 +85,17 @@ class UpdateBotIn(Schema):
     antiflood_seconds: int | None = Field(default=None, ge=1, le=3600)
     communication_mode: Literal[*BotModel.CommunicationMode.values] | None = Field(default=None)
     use_topics: bool | None = Field(default=None)
+    retention_days: int | None = Field(
+        default=None,
+        ge=0,
+        le=3650,
+        description='Days message mappings are kept; 0 keeps them forever, null uses the default',
+    )
+    retention_max_mappings: int | None = Field(
+        default=None,
+        ge=0,
+        description='Message mappings kept per conversation; 0 keeps all, null uses the default',
+    )
 
 
 class TransferBotOwnerIn(Schema):
@@ -164,6 +177,8 @@ class BotOut(Schema):
     antiflood_enabled: bool
     antiflood_seconds: int
     communication_mode: Literal[*BotModel.CommunicationMode.values]
+    retention_days: int | None
+    retention_max_mappings: int | None
     created_at: str = Field(..., alias='created_at.isoformat')
     updated_at: str = Field(..., alias='updated_at.isoformat')
 
@@ -185,7 +200,7 @@ async def validate_bot_token(bot_token: str) -> dict[str, Any]:
         ValidationError: If the bot token is invalid
     """
     try:
-        bot = Bot(token=bot_token)
+        bot = build_bot(bot_token)
         await bot.get_me()
         return {
             'name': bot.first_name + (f' {bot.last_name}' if bot.last_name else ''),
@@ -244,11 +259,11 @@ async def add_bot(  # noqa: PLR0911
         return 200, {'status': 'success', 'bot': bot_info}
 
     try:
-        ptb_bot = Bot(token=bot.token)
+        ptb_bot = build_bot(bot.token)
         await ptb_bot.set_webhook(
             f'{settings.TELEGRAM_BUILDER_BOT_WEBHOOK_URL}/api/webhook/{bot.uuid}/',
             secret_token=generate_bot_webhook_secret(bot.uuid),
-            allowed_updates=Update.ALL_TYPES,
+            allowed_updates=get_feedback_allowed_updates(),
         )
     except Exception as err:  # noqa: BLE001
         return 400, {'status': 'error', 'message': f'Failed to set webhook: {err}'}
@@ -369,13 +384,13 @@ async def _sync_webhook_for_token_change(
     if not token_update.changed or not bot.enabled or not token_update.new_token:
         return None
 
-    ptb_bot = Bot(token=token_update.new_token)
+    ptb_bot = build_bot(token_update.new_token)
     webhook_url = f'{settings.TELEGRAM_BUILDER_BOT_WEBHOOK_URL}/api/webhook/{bot.uuid}/'
     try:
         await ptb_bot.set_webhook(
             webhook_url,
             secret_token=generate_bot_webhook_secret(str(bot.uuid)),
-            allowed_updates=Update.ALL_TYPES,
+            allowed_updates=get_feedback_allowed_updates(),
         )
     except Exception as err:  # noqa: BLE001
         if token_update.previous_token is not None:
@@ -407,14 +422,14 @@ async def _sync_webhook_for_enabled_change(
     if not bot_token:
         return 404, {'status': 'error', 'message': str(_('bot_not_found'))}
 
-    ptb_bot = Bot(token=bot_token)
+    ptb_bot = build_bot(bot_token)
     webhook_url = f'{settings.TELEGRAM_BUILDER_BOT_WEBHOOK_URL}/api/webhook/{bot.uuid}/'
     try:
         if bot.enabled:
             await ptb_bot.set_webhook(
                 webhook_url,
                 secret_token=generate_bot_webhook_secret(str(bot.uuid)),
-                allowed_updates=Update.ALL_TYPES,
+                allowed_updates=get_feedback_allowed_updates(),
             )
         else:
             await ptb_bot.delete_webhook()
@@ -477,6 +492,7 @@ async def update_bot(  # noqa: PLR0911
     if enabled_sync_error:
         return enabled_sync_error
 
+    get_application_pool().invalidate(bot_uuid)
     return 200, bot
 
 
@@ -552,6 +568,8 @@ async def remove_bot(request: HttpRequest, bot_uuid: UUID) -> tuple[int, dict[st
     if not deleted:
         return 404, {'status': 'error', 'message': str(_('bot_not_found'))}
 
+    get_application_pool().invalidate(bot_uuid)
+
     return 200, {'status': 'success', 'message': str(_('bot_deleted'))}
 
 
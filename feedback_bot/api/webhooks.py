@@ -1,4 +1,5 @@
 import logging
+from contextlib import nullcontext
 
 import orjson
 from django.conf import settings
@@ -11,11 +12,25 @@ from telegram import Update
 from telegram.ext import Application
 
 from feedback_bot.crud import get_bot_config
-from feedback_bot.telegram.feedback_bot.bot import build_feedback_bot_application
+from feedback_bot.telegram.feedback_bot.bot import get_feedback_update_types
+from feedback_bot.telegram.feedback_bot.dispatcher import (
+    get_update_dispatcher,
+    process_feedback_update,
+)
 from feedback_bot.telegram.utils.cryptography import (
     generate_bot_webhook_secret,
     verify_bot_webhook_secret,
 )
+from feedback_bot.telegram.utils.dedup import (
+    claim_update,
+    finish_update,
+    peek_update_id,
+    release_update,
+)
+from feedback_bot.telegram.utils.handoff import UpdateHandoffClient, UpdateRejectedError
+from feedback_bot.telegram.utils.journal import BUILDER_JOURNAL_KEY
+from feedback_bot.telegram.utils.update_types import peek_update_type
+from feedback_bot.telegram.utils.webhook_reply import capture_webhook_reply
 
 logger = logging.getLogger(__name__)
 
@@ -52,36 +67,103 @@ router = Router()
 @csrf_exempt
 async def telegram_webhook(request: HttpRequest) -> HttpResponse:
     """Handle incoming Telegram updates by putting them into the `update_queue`"""
+    update_id = peek_update_id(request.body)
+    if update_id is not None and not await claim_update(
+        BUILDER_JOURNAL_KEY, update_id, request.body
+    ):
+        logger.debug(f'Skipping redelivered builder update {update_id}')
+        return HttpResponse('OK')
+
+    ptb_application: Application | None = request.state.get('ptb_application')
+    if ptb_application is None:
+        return await _hand_off_builder_update(request, update_id)
+
     try:
-        ptb_application: Application = request.state['ptb_application']
         update = Update.de_json(data=orjson.loads(request.body), bot=ptb_application.bot)
         await ptb_application.update_queue.put(update)
         return HttpResponse('OK')
     except orjson.JSONDecodeError:
         logger.error('Failed to decode JSON from Telegram.')
+        if update_id is not None:
+            await finish_update(BUILDER_JOURNAL_KEY, update_id)
         return HttpResponseBadRequest('Invalid JSON')
 
 
+async def _hand_off_builder_update(request: HttpRequest, update_id: int | None) -> HttpResponse:
+    """Pass a builder update to the worker running the builder bot"""
+    handoff: UpdateHandoffClient = request.state['update_handoff']
+    try:
+        await handoff.forward(request.body)
+    except UpdateRejectedError:
+        if update_id is not None:
+            await finish_update(BUILDER_JOURNAL_KEY, update_id)
+        return HttpResponseBadRequest('Invalid update')
+    except OSError as err:
+        logger.error(f'Failed to hand off builder update {update_id}: {err}')
+        if update_id is not None:
+            await release_update(BUILDER_JOURNAL_KEY, update_id)
+        return HttpResponse('Builder bot unavailable', status=503)
+    return HttpResponse('OK')
+
+
+def _is_unhandled_feedback_update(body: bytes) -> bool:
+    """Whether no feedback bot handler can consume this update, judging by its type alone"""
+    update_type = peek_update_type(body)
+    handled_types = get_feedback_update_types()
+    return bool(update_type and handled_types is not None and update_type not in handled_types)
+
+
 @router.post('/{bot_uuid}/', url_name='feedback_bot_webhook', auth=telegram_auth)
 @csrf_exempt
-async def feedback_bot_webhook_handler(request: HttpRequest, bot_uuid: str) -> HttpResponse:
+async def feedback_bot_webhook_handler(request: HttpRequest, bot_uuid: str) -> HttpResponse:  # noqa: C901, PLR0911
     """Handle incoming Telegram updates for a feedback bot"""
+    if _is_unhandled_feedback_update(request.body):
+        return HttpResponse('OK')
+
     bot_config = await get_bot_config(bot_uuid)
     if not bot_config:
         return HttpResponseBadRequest('Bot not found or disabled')
 
-    ptb_application = build_feedback_bot_application(bot_config)
+    update_id = peek_update_id(request.body)
+    if update_id is None:
+        logger.error('Telegram webhook payload is not an update')
+        return HttpResponseBadRequest('Invalid update format')
+    if not await claim_update(bot_uuid, update_id, request.body):
+        logger.debug(f'Skipping redelivered update {update_id} for bot {bot_uuid}')
+        return HttpResponse('OK')
 
     try:
-        update = Update.de_json(data=orjson.loads(request.body), bot=ptb_application.bot)
+        payload = orjson.loads(request.body)
     except orjson.JSONDecodeError as e:
         logger.error(f'Failed to decode JSON from Telegram webhook: {e}')
+        await finish_update(bot_uuid, update_id)
         return HttpResponseBadRequest('Invalid JSON')
-    except (ValueError, TypeError) as e:
-        logger.error(f'Failed to parse Telegram update: {e}')
+
+    if not isinstance(payload, dict) or payload.get('update_id') != update_id:
+        logger.error('Telegram webhook payload is not an update')
+        await finish_update(bot_uuid, update_id)
         return HttpResponseBadRequest('Invalid update format')
 
-    async with ptb_application:
-        await ptb_application.process_update(update)
+    if settings.TELEGRAM_WEBHOOK_FAST_ACK and get_update_dispatcher().submit(
+        bot_uuid, bot_config, payload
+    ):
+        return HttpResponse('OK')
 
+    capture = (
+        capture_webhook_reply() if settings.TELEGRAM_WEBHOOK_REPLY_IN_RESPONSE else nullcontext({})
+    )
+    with capture as reply:
+        try:
+            await process_feedback_update(bot_uuid, bot_config, payload)
+        except (ValueError, TypeError) as e:
+            logger.error(f'Failed to parse Telegram update: {e}')
+            await finish_update(bot_uuid, update_id)
+            return HttpResponseBadRequest('Invalid update format')
+        except Exception:
+            # Let Telegram's redelivery of this update through the deduplication
+            await release_update(bot_uuid, update_id)
+            raise
+
+    if reply:
+        return HttpResponse(orjson.dumps(reply), content_type='application/json')
     return HttpResponse('OK')
@@ -1,10 +1,18 @@
-from collections.abc import Sequence
-from datetime import datetime
+import asyncio
+import logging
+from collections import Counter, defaultdict
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from datetime import UTC, datetime, timedelta
+from functools import cache
+from time import monotonic
 from typing import Any
 from uuid import UUID
 
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import F, Q
 
 from feedback_bot.models import (
     BannedUser,
@@ -16,6 +24,10 @@ from feedback_bot.models import (
     User,
 )
 from feedback_bot.telegram.utils.cryptography import decrypt_token, encrypt_token
+from feedback_bot.utils.cache import BloomFilter, TTLCache
+from feedback_bot.utils.flusher import get_flusher
+
+logger = logging.getLogger(__name__)
 
 BOT_MANAGEMENT_FIELDS = (
     'name',
@@ -34,6 +46,8 @@ BOT_MANAGEMENT_FIELDS = (
     'antiflood_enabled',
     'antiflood_seconds',
     'communication_mode',
+    'retention_days',
+    'retention_max_mappings',
     'forward_chat_id',
     'owner__username',
     'owner__telegram_id',
@@ -41,6 +55,143 @@ BOT_MANAGEMENT_FIELDS = (
     'updated_at',
 )
 
+BOT_CONFIG_FIELDS = (
+    'uuid',
+    'telegram_id',
+    'owner',
+    'start_message',
+    'feedback_received_message',
+    'allow_photo_messages',
+    'allow_video_messages',
+    'allow_voice_messages',
+    'allow_document_messages',
+    'allow_sticker_messages',
+    'use_topics',
+    'antiflood_enabled',
+    'antiflood_seconds',
+    'forward_chat_id',
+    'communication_mode',
+    '_token',
+)
+
+# Mapping columns read by the lookups, all in owner_message_mapping_idx so they skip the table
+MESSAGE_MAPPING_LOOKUP_FIELDS = (
+    'bot',
+    'owner_chat_id',
+    'owner_message_id',
+    'user_chat',
+    'user_message_id',
+)
+
+# Read-through cache for the webhook hot path; the TTL bounds staleness across workers.
+_bot_config_cache: TTLCache[str, Bot] = TTLCache(
+    settings.TELEGRAM_BOT_CONFIG_CACHE_SIZE, settings.TELEGRAM_BOT_CONFIG_CACHE_TTL
+)
+
+type BanIndex = frozenset[int] | BloomFilter
+
+
+@dataclass(slots=True)
+class BanIndexEntry:
+    """
+    Banned user IDs of a bot, loaded at the bot's `ban_list_version`.
+
+    `generation` counts ban changes made through this worker, so a load that raced one of them
+    isn't stored.
+    """
+
+    index: BanIndex | None = None
+    version: int | None = None
+    checked_at: float = 0.0
+    generation: int = 0
+
+
+# Cached ban lists, revalidated against the shared version every TELEGRAM_BAN_INDEX_TTL seconds
+_ban_index_cache: TTLCache[int, BanIndexEntry] = TTLCache(settings.TELEGRAM_BAN_INDEX_CACHE_SIZE)
+
+
+class RecentMappings:
+    """
+    LRU of the message mappings a bot wrote last, looked up from either side of the conversation.
+
+    Owners mostly reply to and react on recent messages, so those lookups skip the database.
+    """
+
+    __slots__ = ('_by_owner', '_by_user')
+
+    def __init__(self, maxsize: int) -> None:
+        self._by_owner: TTLCache[tuple[int, int], MessageMapping] = TTLCache(maxsize)
+        self._by_user: TTLCache[tuple[int, int], MessageMapping] = TTLCache(maxsize)
+
+    def get_by_owner(self, owner_chat_id: int, owner_message_id: int) -> MessageMapping | None:
+        return self._by_owner.get((owner_chat_id, owner_message_id))
+
+    def get_by_user(self, user_telegram_id: int, user_message_id: int) -> MessageMapping | None:
+        return self._by_user.get((user_telegram_id, user_message_id))
+
+    def add(self, mapping: MessageMapping) -> None:
+        # A user message mapped again no longer belongs to its previous owner message
+        self.discard(mapping)
+        self._by_user.set(self._user_key(mapping), mapping)
+        self._by_owner.set((mapping.owner_chat_id, mapping.owner_message_id), mapping)
+
+    def discard(self, mapping: MessageMapping) -> None:
+        if (previous := self._by_user.pop(self._user_key(mapping))) is not None:
+            self._by_owner.pop((previous.owner_chat_id, previous.owner_message_id))
+        self._by_owner.pop((mapping.owner_chat_id, mapping.owner_message_id))
+
+    def discard_chat(self, chat_id: int) -> None:
+        self._by_user.pop_where(lambda _, mapping: mapping.user_chat_id == chat_id)
+        self._by_owner.pop_where(lambda _, mapping: mapping.user_chat_id == chat_id)
+
+    @staticmethod
+    def _user_key(mapping: MessageMapping) -> tuple[int, int]:
+        return mapping.user_chat.user_telegram_id, mapping.user_message_id
+
+
+# Mappings written by this worker, per bot; mappings deleted by other workers can linger here, and
+# then resolve replies to messages that no longer exist, as the database would have before.
+_recent_mappings: TTLCache[int, RecentMappings] = TTLCache(
+    settings.TELEGRAM_MAPPING_CACHE_BOTS if settings.TELEGRAM_MAPPING_CACHE_SIZE > 0 else 0
+)
+
+
+def _remember_mappings(mappings: Sequence[MessageMapping]) -> None:
+    for mapping in mappings:
+        recent = _recent_mappings.get(mapping.bot_id)
+        if recent is None:
+            recent = RecentMappings(settings.TELEGRAM_MAPPING_CACHE_SIZE)
+            _recent_mappings.set(mapping.bot_id, recent)
+        recent.add(mapping)
+
+
+def _forget_mappings(mappings: Sequence[MessageMapping]) -> None:
+    for mapping in mappings:
+        if (recent := _recent_mappings.get(mapping.bot_id)) is not None:
+            recent.discard(mapping)
+
+
+# Feedback chats of returning users, keyed by (bot ID, user ID). Their field changes are written
+# behind by the feedback chat writer; the TTL bounds how long topic changes made by other workers
+# go unnoticed.
+_feedback_chats: TTLCache[tuple[int, int], FeedbackChat] = TTLCache(
+    settings.TELEGRAM_FEEDBACK_CHAT_CACHE_SIZE, settings.TELEGRAM_FEEDBACK_CHAT_CACHE_TTL
+)
+
+
+def _cache_feedback_chat(chat: FeedbackChat) -> FeedbackChat:
+    """Cache a chat read from the database, with the changes this worker hasn't written yet."""
+    chat = get_feedback_chat_writer().apply_pending(chat)
+    _feedback_chats.set((chat.bot_id, chat.user_telegram_id), chat)
+    return chat
+
+
+def invalidate_feedback_chat(chat: FeedbackChat) -> None:
+    """Drop the cached copy of a chat, unless it is the given instance."""
+    key = (chat.bot_id, chat.user_telegram_id)
+    if _feedback_chats.get(key) is not chat:
+        _feedback_chats.pop(key)
+
 
 async def create_user(user_data: dict[str, Any]) -> tuple[User, bool]:
     """Create a user or update the existing entry with the provided data."""
@@ -147,30 +298,71 @@ async def update_user_language(user_id: int, language_code: str) -> None:
 async def ensure_feedback_chat(
     bot: Bot, user_telegram_id: int, username: str | None
 ) -> tuple[FeedbackChat, bool]:
-    defaults = {'username': (username or '').strip()}
-    chat, created = await FeedbackChat.objects.aget_or_create(
-        bot=bot,
-        user_telegram_id=user_telegram_id,
-        defaults=defaults,
-    )
-    if not created and defaults['username'] and chat.username != defaults['username']:
-        chat.username = defaults['username']
-        await chat.asave(update_fields=['username'])
+    username = (username or '').strip()
+    chat = _feedback_chats.get((bot.pk, user_telegram_id))
+    created = False
+    if chat is None:
+        chat, created = await FeedbackChat.objects.aget_or_create(
+            bot=bot,
+            user_telegram_id=user_telegram_id,
+            defaults={'username': username},
+        )
+        chat = _cache_feedback_chat(chat)
+    if not created and username and chat.username != username:
+        chat.username = username
+        await get_feedback_chat_writer().save(chat, ['username'])
     return chat, created
 
 
 async def set_feedback_chat_topic(chat: FeedbackChat, topic_id: int | None) -> FeedbackChat:
     chat.topic_id = topic_id
     await chat.asave(update_fields=['topic_id'])
+    invalidate_feedback_chat(chat)
     return chat
 
 
+async def claim_feedback_chat_topic(chat: FeedbackChat, *, stale_after: float) -> bool:
+    """
+    Claim the creation of a chat's forum topic across workers.
+
+    Fails while the chat has a topic, or another claim is younger than `stale_after` seconds.
+    """
+    now = datetime.now(UTC)
+    return bool(
+        await FeedbackChat.objects.filter(pk=chat.pk, topic_id__isnull=True)
+        .filter(
+            Q(topic_claimed_at__isnull=True)
+            | Q(topic_claimed_at__lt=now - timedelta(seconds=stale_after))
+        )
+        .aupdate(topic_claimed_at=now)
+    )
+
+
+async def release_feedback_chat_topic(chat: FeedbackChat) -> None:
+    await FeedbackChat.objects.filter(pk=chat.pk).aupdate(topic_claimed_at=None)
+
+
+async def get_feedback_chat_topic(chat: FeedbackChat) -> int | None:
+    return await FeedbackChat.objects.filter(pk=chat.pk).values_list('topic_id', flat=True).afirst()
+
+
 async def set_feedback_chat_last_feedback(chat: FeedbackChat, timestamp: datetime) -> FeedbackChat:
     chat.last_feedback_at = timestamp
     await chat.asave(update_fields=['last_feedback_at'])
     return chat
 
 
+async def save_feedback_warnings(warnings: dict[int, datetime]) -> None:
+    """Store the last antiflood warning time of several feedback chats, keyed by chat ID."""
+    await FeedbackChat.objects.abulk_update(
+        [
+            FeedbackChat(pk=chat_id, last_warning_at=warned_at)
+            for chat_id, warned_at in warnings.items()
+        ],
+        ['last_warning_at'],
+    )
+
+
 async def set_feedback_chat_last_warning(
     chat: FeedbackChat, timestamp: datetime | None
 ) -> FeedbackChat:
@@ -180,16 +372,25 @@ async def set_feedback_chat_last_warning(
 
 
 async def clear_feedback_chat_mappings(bot: Bot, chat: FeedbackChat) -> None:
+    invalidate_feedback_chat(chat)
+    if (recent := _recent_mappings.get(bot.pk)) is not None:
+        recent.discard_chat(chat.pk)
     await MessageMapping.objects.filter(bot=bot, user_chat=chat).adelete()
 
 
 async def get_user_message_mapping(
     bot: Bot, user_telegram_id: int, user_message_id: int
 ) -> MessageMapping | None:
+    recent = _recent_mappings.get(bot.pk)
+    if recent is not None and (mapping := recent.get_by_user(user_telegram_id, user_message_id)):
+        return mapping
     return (
         await MessageMapping.objects.select_related('user_chat')
+        .only(*MESSAGE_MAPPING_LOOKUP_FIELDS)
         .filter(
             bot=bot,
+            # Resolves the chat through its (bot, user) key, so both unique indexes are used
+            user_chat__bot=bot,
             user_chat__user_telegram_id=user_telegram_id,
             user_message_id=user_message_id,
         )
@@ -198,38 +399,49 @@ async def get_user_message_mapping(
 
 
 async def get_owner_message_mapping(bot: Bot, owner_message_id: int) -> MessageMapping | None:
+    recent = _recent_mappings.get(bot.pk)
+    if recent is not None and (
+        mapping := recent.get_by_owner(bot.destination_chat_id, owner_message_id)
+    ):
+        return mapping
     return (
         await MessageMapping.objects.select_related('user_chat')
-        .filter(bot=bot, owner_message_id=owner_message_id)
+        .only(*MESSAGE_MAPPING_LOOKUP_FIELDS)
+        .filter(bot=bot, owner_chat_id=bot.destination_chat_id, owner_message_id=owner_message_id)
         .afirst()
     )
 
 
-async def save_incoming_mapping(
-    bot: Bot, chat: FeedbackChat, user_message_id: int, owner_message_id: int
-) -> None:
-    await MessageMapping.objects.aupdate_or_create(
-        bot=bot,
-        user_message_id=user_message_id,
-        defaults={'user_chat': chat, 'owner_message_id': owner_message_id},
-    )
-
-
-async def save_outgoing_mapping(
+async def save_message_mapping(
     bot: Bot, chat: FeedbackChat, user_message_id: int, owner_message_id: int
 ) -> None:
-    await MessageMapping.objects.aupdate_or_create(
+    """Map a message of the user's chat to its counterpart in the bot's destination chat."""
+    mapping, _ = await MessageMapping.objects.aupdate_or_create(
         bot=bot,
+        user_chat=chat,
         user_message_id=user_message_id,
-        defaults={'user_chat': chat, 'owner_message_id': owner_message_id},
+        defaults={
+            'owner_chat_id': bot.destination_chat_id,
+            'owner_message_id': owner_message_id,
+        },
     )
+    # An existing row is fetched without its chat, which the mapping cache keys on
+    mapping.user_chat = chat
+    _remember_mappings([mapping])
 
 
 async def delete_message_mapping(mapping: MessageMapping) -> None:
-    await MessageMapping.objects.filter(pk=mapping.pk).adelete()
+    _forget_mappings([mapping])
+    # Mappings remembered from bulk upserts may lack a primary key on some databases
+    await MessageMapping.objects.filter(
+        bot_id=mapping.bot_id,
+        user_chat_id=mapping.user_chat_id,
+        user_message_id=mapping.user_message_id,
+    ).adelete()
 
 
 async def delete_message_mappings(mappings: Sequence[MessageMapping]) -> None:
+    _forget_mappings(mappings)
     ids = [mapping.pk for mapping in mappings if mapping.pk]
     if ids:
         await MessageMapping.objects.filter(pk__in=ids).adelete()
@@ -244,16 +456,247 @@ async def list_chat_message_mappings(bot: Bot, chat: FeedbackChat) -> list[Messa
     ]
 
 
+def _increment_bot_stats(bot_id: int, **amounts: int) -> None:
+    """Add to the counters of a bot's stats row, creating the row if needed."""
+    increments = {field: F(field) + amount for field, amount in amounts.items()}
+    if not BotStats.objects.filter(bot_id=bot_id).update(**increments):
+        BotStats.objects.bulk_create([BotStats(bot_id=bot_id)], ignore_conflicts=True)
+        BotStats.objects.filter(bot_id=bot_id).update(**increments)
+
+
+class BotStatsAggregator:
+    """
+    Buffers `BotStats` counter increments per bot and writes them with `F()` updates.
+
+    Counters only ever receive positive increments, and a failed flush puts its increments back
+    into the buffer, so stored counters never lose counts or go backwards. Increments are written
+    right away while the process-wide flusher isn't running. Once `flush_threshold` increments
+    are buffered, they are flushed without waiting for the flusher, so a crash loses at most that
+    many counts or those of one flush interval, whichever is fewer.
+    """
+
+    def __init__(self, flush_threshold: int = 0) -> None:
+        self.flush_threshold = flush_threshold
+        self._pending: defaultdict[int, Counter[str]] = defaultdict(Counter)
+        self._buffered = 0
+        self._early_flush: asyncio.Task | None = None
+
+    def buffer(self, bot_id: int, **amounts: int) -> bool:
+        """Buffer increments for the next flush; returns False if they must be written now."""
+        if not get_flusher().running:
+            return False
+        self._pending[bot_id].update(amounts)
+        self._buffered += sum(amounts.values())
+        if (
+            self.flush_threshold
+            and self._buffered >= self.flush_threshold
+            and (self._early_flush is None or self._early_flush.done())
+        ):
+            self._early_flush = asyncio.create_task(self._flush_early(), name='bot-stats-flush')
+        return True
+
+    async def add(self, bot_id: int, **amounts: int) -> None:
+        if not self.buffer(bot_id, **amounts):
+            await sync_to_async(_increment_bot_stats)(bot_id, **amounts)
+
+    def pending(self, bot_id: int) -> Counter[str]:
+        return Counter(self._pending.get(bot_id, ()))
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, defaultdict(Counter)
+        buffered, self._buffered = self._buffered, 0
+        if not pending:
+            return
+        try:
+            await sync_to_async(self._write)(pending)
+        except Exception:
+            for bot_id, amounts in pending.items():
+                self._pending[bot_id].update(amounts)
+            self._buffered += buffered
+            raise
+
+    async def _flush_early(self) -> None:
+        try:
+            await self.flush()
+        except Exception:
+            logger.exception('Failed to flush bot stats past the buffer threshold')
+
+    @staticmethod
+    def _write(pending: dict[int, Counter[str]]) -> None:
+        with transaction.atomic():
+            for bot_id, amounts in pending.items():
+                _increment_bot_stats(bot_id, **amounts)
+
+
+@cache
+def get_stats_aggregator() -> BotStatsAggregator:
+    aggregator = BotStatsAggregator(settings.TELEGRAM_STATS_FLUSH_THRESHOLD)
+    get_flusher().register(aggregator.flush)
+    return aggregator
+
+
+def _with_pending_stats(stats: BotStats) -> BotStats:
+    """Add the increments this process hasn't flushed yet to a stats row read from the database."""
+    for field, amount in get_stats_aggregator().pending(stats.bot_id).items():
+        setattr(stats, field, getattr(stats, field) + amount)
+    return stats
+
+
+class FeedbackChatWriter:
+    """
+    Buffers changed fields of feedback chats and writes them in batches with `bulk_update`.
+
+    A field changed again before the flush only keeps its latest value, so an active conversation
+    costs one write per flush. A failed flush puts its values back unless newer ones were buffered
+    meanwhile. Changes are written right away while the process-wide flusher isn't running.
+    """
+
+    def __init__(self) -> None:
+        self._pending: dict[int, dict[str, Any]] = {}
+
+    def buffer(self, chat: FeedbackChat, fields: Iterable[str]) -> bool:
+        """Buffer the chat's current field values; returns False if they must be written now."""
+        if not get_flusher().running:
+            return False
+        self._pending.setdefault(chat.pk, {}).update(
+            {field: getattr(chat, field) for field in fields}
+        )
+        return True
+
+    async def save(self, chat: FeedbackChat, fields: Sequence[str]) -> None:
+        if not self.buffer(chat, fields):
+            await chat.asave(update_fields=fields)
+
+    def apply_pending(self, chat: FeedbackChat) -> FeedbackChat:
+        for field, value in self._pending.get(chat.pk, {}).items():
+            setattr(chat, field, value)
+        return chat
+
+    async def flush(self) -> None:
+        pending, self._pending = self._pending, {}
+        if not pending:
+            return
+        try:
+            await sync_to_async(self._write)(pending)
+        except Exception:
+            for chat_id, values in pending.items():
+                self._pending[chat_id] = values | self._pending.get(chat_id, {})
+            raise
+
+    @staticmethod
+    def _write(pending: dict[int, dict[str, Any]]) -> None:
+        batches: defaultdict[tuple[str, ...], list[FeedbackChat]] = defaultdict(list)
+        for chat_id, values in pending.items():
+            batches[tuple(sorted(values))].append(FeedbackChat(pk=chat_id, **values))
+        with transaction.atomic():
+            for fields, chats in batches.items():
+                FeedbackChat.objects.bulk_update(chats, fields)
+
+
+@cache
+def get_feedback_chat_writer() -> FeedbackChatWriter:
+    writer = FeedbackChatWriter()
+    get_flusher().register(writer.flush)
+    return writer
+
+
+async def get_feedback_sender(bot: Bot, user_telegram_id: int) -> tuple[bool, FeedbackChat | None]:
+    """Whether a user is banned from a bot, and their feedback chat if they aren't."""
+    if await is_user_banned(bot.pk, user_telegram_id):
+        return True, None
+    if (chat := _feedback_chats.get((bot.pk, user_telegram_id))) is not None:
+        return False, chat
+    chat = await FeedbackChat.objects.filter(bot=bot, user_telegram_id=user_telegram_id).afirst()
+    return False, None if chat is None else _cache_feedback_chat(chat)
+
+
+class FeedbackUnitOfWork:
+    """
+    Database changes caused by one incoming feedback message.
+
+    Changes are collected while the message is handled, then :meth:`commit` writes what the
+    write-behind buffers didn't take in one transaction: an update of the chat's changed fields,
+    one bulk_create(update_conflicts=True) upsert of the mappings and the `F()` update of the
+    bot's stats, each its own query.
+    """
+
+    __slots__ = ('_chat_fields', '_incoming_messages', '_mappings', 'bot', 'chat')
+
+    def __init__(self, bot: Bot, chat: FeedbackChat) -> None:
+        self.bot = bot
+        self.chat = chat
+        self._chat_fields: set[str] = set()
+        self._mappings: dict[int, int] = {}
+        self._incoming_messages = 0
+
+    def _set_chat_field(self, field: str, value: object) -> None:
+        if getattr(self.chat, field) != value:
+            setattr(self.chat, field, value)
+            self._chat_fields.add(field)
+
+    def set_username(self, username: str | None) -> None:
+        if username := (username or '').strip():
+            self._set_chat_field('username', username)
+
+    def set_last_feedback(self, timestamp: datetime) -> None:
+        self._set_chat_field('last_feedback_at', timestamp)
+
+    def set_last_warning(self, timestamp: datetime | None) -> None:
+        self._set_chat_field('last_warning_at', timestamp)
+
+    def save_incoming_mapping(self, user_message_id: int, owner_message_id: int) -> None:
+        self._mappings[user_message_id] = owner_message_id
+
+    def bump_incoming_messages(self) -> None:
+        self._incoming_messages += 1
+
+    async def commit(self) -> None:
+        if self._incoming_messages and get_stats_aggregator().buffer(
+            self.bot.pk, incoming_messages=self._incoming_messages
+        ):
+            self._incoming_messages = 0
+        if self._chat_fields and get_feedback_chat_writer().buffer(self.chat, self._chat_fields):
+            self._chat_fields.clear()
+        if self._chat_fields or self._mappings or self._incoming_messages:
+            _remember_mappings(await sync_to_async(self._commit)())
+
+    def _commit(self) -> list[MessageMapping]:
+        mappings = []
+        with transaction.atomic():
+            if self._chat_fields:
+                FeedbackChat.objects.filter(pk=self.chat.pk).update(
+                    **{field: getattr(self.chat, field) for field in self._chat_fields}
+                )
+            if self._mappings:
+                mappings = MessageMapping.objects.bulk_create(
+                    [
+                        MessageMapping(
+                            bot=self.bot,
+                            user_chat=self.chat,
+                            user_message_id=user_message_id,
+                            owner_chat_id=self.bot.destination_chat_id,
+                            owner_message_id=owner_message_id,
+                        )
+                        for user_message_id, owner_message_id in self._mappings.items()
+                    ],
+                    update_conflicts=True,
+                    unique_fields=['bot', 'user_chat', 'user_message_id'],
+                    update_fields=['owner_chat_id', 'owner_message_id'],
+                )
+            if self._incoming_messages:
+                _increment_bot_stats(self.bot.pk, incoming_messages=self._incoming_messages)
+        self._chat_fields.clear()
+        self._mappings.clear()
+        self._incoming_messages = 0
+        return mappings
+
+
 async def bump_incoming_messages(bot: Bot) -> None:
-    stats, _ = await BotStats.objects.aget_or_create(bot=bot)
-    stats.incoming_messages += 1
-    await stats.asave(update_fields=['incoming_messages'])
+    await get_stats_aggregator().add(bot.pk, incoming_messages=1)
 
 
 async def bump_outgoing_messages(bot: Bot) -> None:
-    stats, _ = await BotStats.objects.aget_or_create(bot=bot)
-    stats.outgoing_messages += 1
-    await stats.asave(update_fields=['outgoing_messages'])
+    await get_stats_aggregator().add(bot.pk, outgoing_messages=1)
 
 
 async def get_feedback_chat_count(bot: Bot) -> int:
@@ -262,7 +705,7 @@ async def get_feedback_chat_count(bot: Bot) -> int:
 
 async def ensure_bot_stats(bot: Bot) -> BotStats:
     stats, _ = await BotStats.objects.aget_or_create(bot=bot)
-    return stats
+    return _with_pending_stats(stats)
 
 
 async def create_bot(
@@ -305,34 +748,39 @@ async def get_bots_keys():
     ]
 
 
-async def get_bots_tokens() -> list[str]:
+async def get_bots_webhook_keys() -> list[tuple[UUID, str, str]]:
+    """Get all enabled bots with their UUID, token and the hash of their last webhook secret."""
     return [
-        decrypt_token(bot_token)
-        async for bot_token in Bot.objects.filter(enabled=True).values_list('_token', flat=True)
+        (bot_uuid, decrypt_token(bot_token), secret_hash)
+        async for bot_uuid, bot_token, secret_hash in Bot.objects.filter(enabled=True).values_list(
+            'uuid', '_token', 'webhook_secret_hash'
+        )
     ]
 
 
-async def get_bot_config(uuid: str) -> Bot:
-    return (
-        await Bot.objects.filter(uuid=uuid, enabled=True)
-        .only(
-            'owner',
-            'start_message',
-            'feedback_received_message',
-            'allow_photo_messages',
-            'allow_video_messages',
-            'allow_voice_messages',
-            'allow_document_messages',
-            'allow_sticker_messages',
-            'use_topics',
-            'antiflood_enabled',
-            'antiflood_seconds',
-            'forward_chat_id',
-            'communication_mode',
-            '_token',
-        )
-        .afirst()
-    )
+async def save_webhook_secret_hash(bot_uuid: UUID | str, secret_hash: str) -> None:
+    await Bot.objects.filter(uuid=bot_uuid).aupdate(webhook_secret_hash=secret_hash)
+
+
+async def get_bot_config(uuid: UUID | str) -> Bot | None:
+    key = str(uuid)
+    if (bot := _bot_config_cache.get(key)) is not None:
+        return bot
+
+    bot = await Bot.objects.filter(uuid=uuid, enabled=True).only(*BOT_CONFIG_FIELDS).afirst()
+    if bot is not None:
+        _bot_config_cache.set(key, bot)
+    return bot
+
+
+def invalidate_bot_config(
+    bot_uuid: UUID | str | None = None, *, telegram_id: int | None = None
+) -> None:
+    """Drop cached bot configs by UUID or Telegram ID after the bot row changed."""
+    if bot_uuid is not None:
+        _bot_config_cache.pop(str(bot_uuid))
+    if telegram_id is not None:
+        _bot_config_cache.pop_where(lambda _, bot: bot.telegram_id == telegram_id)
 
 
 async def get_bots(owner: int) -> list[Bot]:
@@ -456,6 +904,7 @@ async def update_bot_settings(bot_uuid: UUID | str, owner: int, data: dict[str,
         return None
 
     updated = await Bot.objects.filter(_bot_owner_filter(bot_uuid, owner)).aupdate(**update_payload)
+    invalidate_bot_config(bot_uuid)
     if not updated:
         return None
 
@@ -470,11 +919,18 @@ async def update_bot_forward_chat_by_telegram_id(
     updated = await Bot.objects.filter(telegram_id=telegram_id).aupdate(
         forward_chat_id=forward_chat_id
     )
+    invalidate_bot_config(telegram_id=telegram_id)
     return bool(updated)
 
 
 async def delete_bot(bot_uuid: UUID | str, owner: int) -> bool:
-    deleted, _ = await Bot.objects.filter(_bot_owner_filter(bot_uuid, owner)).adelete()
+    bots = Bot.objects.filter(_bot_owner_filter(bot_uuid, owner))
+    bot_ids = {bot_id async for bot_id in bots.values_list('pk', flat=True)}
+    deleted, _ = await bots.adelete()
+    invalidate_bot_config(bot_uuid)
+    for bot_id in bot_ids:
+        _recent_mappings.pop(bot_id)
+    _feedback_chats.pop_where(lambda key, _: key[0] in bot_ids)
     return bool(deleted)
 
 
@@ -506,7 +962,7 @@ async def get_bot_stats(bot_uuid: UUID | str, owner: int) -> BotStats | None:
         return None
 
     stats, _ = await BotStats.objects.aget_or_create(bot_id=bot_id)
-    return stats
+    return _with_pending_stats(stats)
 
 
 async def ensure_user_ban(
@@ -523,6 +979,8 @@ async def ensure_user_ban(
         defaults=defaults,
     )
 
+    if created:
+        await _bump_ban_list_version(bot_id)
     if not created and normalized_reason and banned_user.reason != normalized_reason:
         await BannedUser.objects.filter(pk=banned_user.pk).aupdate(reason=normalized_reason)
         banned_user.reason = normalized_reason
@@ -535,17 +993,79 @@ async def lift_user_ban(bot_id: int, user_telegram_id: int) -> bool:
         bot_id=bot_id,
         user_telegram_id=user_telegram_id,
     ).adelete()
+    if deleted:
+        await _bump_ban_list_version(bot_id)
     return bool(deleted)
 
 
+async def _bump_ban_list_version(bot_id: int) -> None:
+    """Tell every worker that the bot's bans changed; this worker's index is dropped right away."""
+    invalidate_ban_index(bot_id)
+    await Bot.objects.filter(pk=bot_id).aupdate(ban_list_version=F('ban_list_version') + 1)
+
+
 async def list_banned_users(bot_id: int) -> list[BannedUser]:
     qs = BannedUser.objects.filter(bot_id=bot_id).order_by('user_telegram_id')
     return [banned async for banned in qs]
 
 
 async def is_user_banned(bot_id: int, user_telegram_id: int) -> bool:
+    index = await _get_ban_index(bot_id)
+    if user_telegram_id not in index:
+        return False
+    if isinstance(index, frozenset):
+        return True
+    return await _query_user_banned(bot_id, user_telegram_id)
+
+
+async def _query_user_banned(bot_id: int, user_telegram_id: int) -> bool:
     return bool(
         await BannedUser.objects.filter(bot_id=bot_id, user_telegram_id=user_telegram_id)
         .values_list('pk', flat=True)
         .afirst()
     )
+
+
+async def _get_ban_index(bot_id: int) -> BanIndex:
+    """
+    Load the banned user IDs of a bot once, so checking a user who isn't banned costs no query.
+
+    Every `TELEGRAM_BAN_INDEX_TTL` seconds, the bot's `ban_list_version` is read to find out
+    whether another worker changed its bans, and the list is only reloaded if one did.
+    Bots with more than `TELEGRAM_BAN_INDEX_BLOOM_THRESHOLD` bans get a bloom filter instead of
+    a set, and its hits are confirmed with a query.
+    """
+    entry = _ban_index_cache.get(bot_id)
+    if entry is None:
+        entry = BanIndexEntry()
+        _ban_index_cache.set(bot_id, entry)
+    now = monotonic()
+    if entry.index is not None and now - entry.checked_at < settings.TELEGRAM_BAN_INDEX_TTL:
+        return entry.index
+
+    def load(version: int | None) -> tuple[int | None, BanIndex | None]:
+        # The version is read first, so bans made during the load only cause another reload
+        current = Bot.objects.filter(pk=bot_id).values_list('ban_list_version', flat=True).first()
+        if version is not None and current == version:
+            return current, None
+        user_ids = frozenset(
+            BannedUser.objects.filter(bot_id=bot_id).values_list('user_telegram_id', flat=True)
+        )
+        if len(user_ids) > settings.TELEGRAM_BAN_INDEX_BLOOM_THRESHOLD:
+            return current, BloomFilter(user_ids)
+        return current, user_ids
+
+    generation = entry.generation
+    cached = entry.index
+    version, index = await sync_to_async(load)(entry.version if cached is not None else None)
+    index = cached if index is None else index
+    # A ban changed through this worker while loading, so the loaded index may already be outdated
+    if entry.generation == generation:
+        entry.index, entry.version, entry.checked_at = index, version, now
+    return index
+
+
+def invalidate_ban_index(bot_id: int) -> None:
+    if (entry := _ban_index_cache.get(bot_id)) is not None:
+        entry.generation += 1
+        entry.index = None
@@ -0,0 +1,167 @@
+"""Benchmark message mapping lookups as the mappings table grows."""
+
+from __future__ import annotations
+
+import asyncio
+import random
+from statistics import median, quantiles
+from time import perf_counter
+from uuid import uuid4
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from feedback_bot.crud import (
+    MESSAGE_MAPPING_LOOKUP_FIELDS,
+    get_owner_message_mapping,
+    get_user_message_mapping,
+)
+from feedback_bot.models import Bot, FeedbackChat, MessageMapping, User
+
+BENCHMARK_OWNER_ID = -1
+BENCHMARK_CHAT_ID = -1_000_000_000_001
+
+
+class Command(BaseCommand):
+    help = (
+        'Fill a scratch bot with message mappings and time reply and reaction lookups '
+        'at every tenfold table size. The scratch bot is deleted afterwards.'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=10_000_000,
+            help='Mappings to insert in total (default: 10000000)',
+        )
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=10_000,
+            help='Feedback chats the mappings are spread over (default: 10000)',
+        )
+        parser.add_argument(
+            '--lookups',
+            type=int,
+            default=1_000,
+            help='Lookups of each kind timed at every table size (default: 1000)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50_000,
+            help='Mappings inserted per query (default: 50000)',
+        )
+        parser.add_argument(
+            '--keep',
+            action='store_true',
+            help='Keep the scratch bot and its mappings for manual inspection',
+        )
+
+    def handle(self, *args, **options) -> None:
+        rows, users = options['rows'], options['users']
+        if rows < 1 or users < 1 or options['lookups'] < 1 or options['batch_size'] < 1:
+            raise CommandError('--rows, --users, --lookups and --batch-size must be positive')
+
+        bot, chats = self._create_scratch_bot(users)
+        try:
+            inserted = 0
+            for size in self._checkpoints(rows):
+                inserted = self._insert(bot, chats, inserted, size, options['batch_size'])
+                owner_times, user_times = asyncio.run(
+                    self._time_lookups(bot, chats, inserted, options['lookups'])
+                )
+                self.stdout.write(
+                    f'{inserted:>12,} rows  '
+                    f'owner lookup {self._summary(owner_times)}  '
+                    f'user lookup {self._summary(user_times)}'
+                )
+            self._explain(bot, chats[0])
+        finally:
+            if not options['keep']:
+                MessageMapping.objects.filter(bot=bot).delete()
+                bot.delete()
+                User.objects.filter(telegram_id=BENCHMARK_OWNER_ID, bots__isnull=True).delete()
+
+    @staticmethod
+    def _checkpoints(rows: int) -> list[int]:
+        sizes = []
+        size = 10_000
+        while size < rows:
+            sizes.append(size)
+            size *= 10
+        return [*sizes, rows]
+
+    @staticmethod
+    def _create_scratch_bot(users: int) -> tuple[Bot, list[FeedbackChat]]:
+        owner, _ = User.objects.get_or_create(telegram_id=BENCHMARK_OWNER_ID)
+        suffix = uuid4().hex[:12]
+        with transaction.atomic():
+            bot = Bot.objects.create(
+                owner=owner,
+                name='Mapping benchmark',
+                username=f'benchmark_{suffix}_bot',
+                telegram_id=-int(suffix, 16),
+                _token=f'benchmark-{suffix}',
+                forward_chat_id=BENCHMARK_CHAT_ID,
+                enabled=False,
+            )
+            chats = FeedbackChat.objects.bulk_create(
+                FeedbackChat(bot=bot, user_telegram_id=user_id) for user_id in range(1, users + 1)
+            )
+        return bot, chats
+
+    @staticmethod
+    def _insert(bot: Bot, chats: list[FeedbackChat], start: int, end: int, batch_size: int) -> int:
+        """Insert mappings `start` to `end`, spread round-robin over the chats."""
+        for batch_start in range(start, end, batch_size):
+            MessageMapping.objects.bulk_create(
+                MessageMapping(
+                    bot=bot,
+                    user_chat=chats[index % len(chats)],
+                    user_message_id=index // len(chats) + 1,
+                    owner_chat_id=BENCHMARK_CHAT_ID,
+                    owner_message_id=index + 1,
+                )
+                for index in range(batch_start, min(batch_start + batch_size, end))
+            )
+        return end
+
+    @staticmethod
+    async def _time_lookups(
+        bot: Bot, chats: list[FeedbackChat], rows: int, lookups: int
+    ) -> tuple[list[float], list[float]]:
+        owner_times: list[float] = []
+        user_times: list[float] = []
+        for index in random.sample(range(rows), min(lookups, rows)):
+            started = perf_counter()
+            await get_owner_message_mapping(bot, index + 1)
+            owner_times.append(perf_counter() - started)
+
+            chat = chats[index % len(chats)]
+            started = perf_counter()
+            await get_user_message_mapping(bot, chat.user_telegram_id, index // len(chats) + 1)
+            user_times.append(perf_counter() - started)
+        return owner_times, user_times
+
+    @staticmethod
+    def _summary(times: list[float]) -> str:
+        p99 = quantiles(times, n=100)[98] if len(times) > 1 else times[0]
+        return f'p50 {median(times) * 1e6:>8.0f} us  p99 {p99 * 1e6:>8.0f} us'
+
+    def _explain(self, bot: Bot, chat: FeedbackChat) -> None:
+        mappings = MessageMapping.objects.select_related('user_chat').only(
+            *MESSAGE_MAPPING_LOOKUP_FIELDS
+        )
+        owner_lookup = mappings.filter(
+            bot=bot, owner_chat_id=bot.destination_chat_id, owner_message_id=1
+        )
+        user_lookup = mappings.filter(
+            bot=bot,
+            user_chat__bot=bot,
+            user_chat__user_telegram_id=chat.user_telegram_id,
+            user_message_id=1,
+        )
+        for name, queryset in (('Owner lookup', owner_lookup), ('User lookup', user_lookup)):
+            self.stdout.write(f'\n{name} plan:\n{queryset.explain()}')
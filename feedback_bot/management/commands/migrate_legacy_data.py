@@ -271,6 +271,7 @@ class Command(BaseCommand):
                     bot=bot,
                     user_chat=chat,
                     user_message_id=user_message_id,
+                    owner_chat_id=bot.destination_chat_id,
                     owner_message_id=owner_message_id,
                 )
                 mappings_migrated += 1
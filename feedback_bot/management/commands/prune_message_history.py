@@ -0,0 +1,140 @@
+"""Delete message mappings and broadcast copies that fall outside each bot's retention policy."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from time import sleep
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, QuerySet
+
+from feedback_bot.models import Bot, BroadcastMessage, MessageMapping
+
+
+class Command(BaseCommand):
+    help = (
+        'Delete message mappings older than the retention period or beyond the per-conversation '
+        'limit, and broadcast copies older than the retention period. Rows are deleted in small '
+        'batches, each in its own short transaction, so the job can run next to live traffic.'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=settings.TELEGRAM_RETENTION_BATCH_SIZE,
+            help=(
+                'Rows deleted per query '
+                f'(default: TELEGRAM_RETENTION_BATCH_SIZE, {settings.TELEGRAM_RETENTION_BATCH_SIZE})'
+            ),
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Seconds to sleep between batches, to spread the load (default: 0)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the rows that would be deleted',
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be positive')
+        if options['pause'] < 0:
+            raise CommandError('--pause must not be negative')
+        self.batch_size = options['batch_size']
+        self.pause = options['pause']
+        self.dry_run = options['dry_run']
+
+        now = datetime.now(UTC)
+        total_mappings = total_broadcasts = 0
+        bots = Bot.objects.only('pk', 'username', 'retention_days', 'retention_max_mappings')
+        for bot in bots.order_by('pk').iterator():
+            days = self._setting(bot.retention_days, settings.TELEGRAM_RETENTION_DAYS)
+            max_mappings = self._setting(
+                bot.retention_max_mappings, settings.TELEGRAM_RETENTION_MAX_MAPPINGS
+            )
+            mappings = broadcasts = 0
+            cutoff = now - timedelta(days=days) if days else None
+            if cutoff is not None:
+                mappings += self._delete(
+                    MessageMapping.objects.filter(bot=bot, created_at__lt=cutoff)
+                )
+                broadcasts += self._delete(
+                    BroadcastMessage.objects.filter(bot=bot, created_at__lt=cutoff)
+                )
+            if max_mappings:
+                mappings += self._trim_conversations(bot, max_mappings, cutoff)
+            if mappings or broadcasts:
+                self.stdout.write(
+                    f'@{bot.username}: {mappings} mappings, {broadcasts} broadcast copies'
+                )
+            total_mappings += mappings
+            total_broadcasts += broadcasts
+
+        # Broadcasts sent by the builder bot itself follow the global retention period
+        if settings.TELEGRAM_RETENTION_DAYS:
+            cutoff = now - timedelta(days=settings.TELEGRAM_RETENTION_DAYS)
+            builder_broadcasts = self._delete(
+                BroadcastMessage.objects.filter(bot__isnull=True, created_at__lt=cutoff)
+            )
+            if builder_broadcasts:
+                self.stdout.write(f'builder: {builder_broadcasts} broadcast copies')
+            total_broadcasts += builder_broadcasts
+
+        verb = 'Would delete' if self.dry_run else 'Deleted'
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{verb} {total_mappings} message mappings and {total_broadcasts} broadcast copies'
+            )
+        )
+
+    @staticmethod
+    def _setting(value: int | None, default: int) -> int:
+        return default if value is None else value
+
+    def _trim_conversations(self, bot: Bot, max_mappings: int, cutoff: datetime | None) -> int:
+        """
+        Delete all but the newest `max_mappings` mappings of every conversation of the bot.
+
+        Mappings older than `cutoff` were already deleted, or are only counted in a dry run, so
+        they are left out here.
+        """
+        mappings = MessageMapping.objects.filter(bot=bot)
+        if cutoff is not None:
+            mappings = mappings.filter(created_at__gte=cutoff)
+        chat_ids = (
+            mappings.values('user_chat')
+            .annotate(rows=Count('pk'))
+            .filter(rows__gt=max_mappings)
+            .order_by()
+            .values_list('user_chat', flat=True)
+        )
+        deleted = 0
+        for chat_id in list(chat_ids):
+            conversation = mappings.filter(user_chat_id=chat_id)
+            # Mapping IDs grow with every message, so the newest mappings have the highest IDs
+            oldest_kept = conversation.order_by('-pk').values_list('pk', flat=True)[
+                max_mappings - 1
+            ]
+            deleted += self._delete(conversation.filter(pk__lt=oldest_kept))
+        return deleted
+
+    def _delete(self, queryset: QuerySet) -> int:
+        """Delete the matching rows `batch_size` at a time, returning how many were deleted."""
+        if self.dry_run:
+            return queryset.count()
+        model = queryset.model
+        deleted = 0
+        while batch := list(queryset.order_by().values_list('pk', flat=True)[: self.batch_size]):
+            count, _ = model.objects.filter(pk__in=batch).delete()
+            deleted += count
+            if len(batch) < self.batch_size:
+                break
+            if self.pause:
+                sleep(self.pause)
+        return deleted
@@ -1,13 +1,36 @@
 import asyncio
 
+from django.conf import settings
 from django.core.management.base import BaseCommand
 
 from feedback_bot.telegram.feedback_bot.bot import remove_bots_webhooks
+from feedback_bot.telegram.utils.http import build_bot, close_shared_request
+
+
+async def remove_webhooks(*, builder: bool) -> None:
+    try:
+        await remove_bots_webhooks()
+        if builder:
+            await build_bot(settings.TELEGRAM_BUILDER_BOT_TOKEN).delete_webhook()
+    finally:
+        await close_shared_request()
 
 
 class Command(BaseCommand):
-    help = 'Remove webhooks for all feedback bots.'
+    help = (
+        'Remove webhooks for all feedback bots. Webhooks are kept across restarts, '
+        'so this is the way to stop Telegram from delivering updates.'
+    )
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--builder',
+            action='store_true',
+            help='Also remove the webhook of the builder bot',
+        )
 
     def handle(self, *args, **options) -> None:
-        asyncio.run(remove_bots_webhooks())
+        asyncio.run(remove_webhooks(builder=options['builder']))
         self.stdout.write(self.style.SUCCESS('Removed webhooks for all feedback bots'))
+        if options['builder']:
+            self.stdout.write(self.style.SUCCESS('Removed the builder bot webhook'))
@@ -0,0 +1,49 @@
+import asyncio
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from feedback_bot.telegram.polling import run_polling
+
+
+class Command(BaseCommand):
+    help = 'Serve the builder bot and all enabled feedback bots with long polling.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--base-url',
+            help='Bot API endpoint to poll instead of TELEGRAM_BOT_API_URL',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=settings.TELEGRAM_POLLING_CONCURRENCY,
+            help='getUpdates requests in flight at once',
+        )
+        parser.add_argument(
+            '--timeout',
+            type=int,
+            default=settings.TELEGRAM_POLLING_TIMEOUT,
+            help='Long-poll timeout in seconds',
+        )
+        parser.add_argument(
+            '--no-builder',
+            action='store_true',
+            help='Only poll feedback bots',
+        )
+
+    def handle(self, *args, **options) -> None:
+        if options['base_url']:
+            # Bots are built lazily, so this applies to every bot created from here on
+            settings.TELEGRAM_BOT_API_URL = options['base_url']
+
+        try:
+            asyncio.run(
+                run_polling(
+                    concurrency=options['concurrency'],
+                    timeout=options['timeout'],
+                    builder=not options['no_builder'],
+                )
+            )
+        except KeyboardInterrupt:
+            self.stdout.write(self.style.SUCCESS('Stopped polling'))
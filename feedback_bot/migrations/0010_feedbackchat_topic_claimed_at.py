@@ -0,0 +1,22 @@
+from typing import ClassVar
+
+from django.db import migrations, models
+from django.db.migrations.operations.base import Operation
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar[list[tuple[str, str]]] = [
+        ('feedback_bot', '0009_bot_use_topics'),
+    ]
+
+    operations: ClassVar[list[Operation]] = [
+        migrations.AddField(
+            model_name='feedbackchat',
+            name='topic_claimed_at',
+            field=models.DateTimeField(
+                blank=True,
+                help_text='When a worker started creating the forum topic, so others wait for it.',
+                null=True,
+            ),
+        ),
+    ]
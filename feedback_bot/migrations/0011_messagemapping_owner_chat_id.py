@@ -0,0 +1,64 @@
+from typing import ClassVar
+
+from django.db import migrations, models
+from django.db.migrations.operations.base import Operation
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def backfill_owner_chat_id(apps, schema_editor) -> None:
+    """Existing mappings were forwarded to each bot's current destination chat."""
+    bot_model = apps.get_model('feedback_bot', 'Bot')
+    mapping_model = apps.get_model('feedback_bot', 'MessageMapping')
+    bots = bot_model.objects.filter(pk=OuterRef('bot_id'))
+    mapping_model.objects.filter(owner_chat_id__isnull=True).update(
+        owner_chat_id=Coalesce(
+            Subquery(bots.values('forward_chat_id')[:1]),
+            Subquery(bots.values('owner_id')[:1]),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar[list[tuple[str, str]]] = [
+        ('feedback_bot', '0010_feedbackchat_topic_claimed_at'),
+    ]
+
+    operations: ClassVar[list[Operation]] = [
+        migrations.AddField(
+            model_name='messagemapping',
+            name='owner_chat_id',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.RunPython(backfill_owner_chat_id, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='messagemapping',
+            name='owner_chat_id',
+            field=models.BigIntegerField(),
+        ),
+        migrations.AlterUniqueTogether(
+            name='messagemapping',
+            unique_together=set(),
+        ),
+        migrations.AddConstraint(
+            model_name='messagemapping',
+            constraint=models.UniqueConstraint(
+                fields=('bot', 'user_chat', 'user_message_id'),
+                name='unique_user_message_mapping',
+            ),
+        ),
+        migrations.AddIndex(
+            model_name='messagemapping',
+            index=models.Index(
+                fields=[
+                    'bot',
+                    'owner_chat_id',
+                    'owner_message_id',
+                    'user_chat',
+                    'user_message_id',
+                    'id',
+                ],
+                name='owner_message_mapping_idx',
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+from typing import ClassVar
+
+from django.db import migrations, models
+from django.db.migrations.operations.base import Operation
+from django.utils import timezone
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar[list[tuple[str, str]]] = [
+        ('feedback_bot', '0011_messagemapping_owner_chat_id'),
+    ]
+
+    operations: ClassVar[list[Operation]] = [
+        migrations.AddField(
+            model_name='bot',
+            name='retention_days',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bot',
+            name='retention_max_mappings',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='messagemapping',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddIndex(
+            model_name='messagemapping',
+            index=models.Index(fields=['bot', 'created_at'], name='mapping_bot_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='broadcastmessage',
+            index=models.Index(fields=['bot', 'created_at'], name='broadcast_bot_created_idx'),
+        ),
+    ]
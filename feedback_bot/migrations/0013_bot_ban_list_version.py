@@ -0,0 +1,18 @@
+from typing import ClassVar
+
+from django.db import migrations, models
+from django.db.migrations.operations.base import Operation
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar[list[tuple[str, str]]] = [
+        ('feedback_bot', '0012_retention'),
+    ]
+
+    operations: ClassVar[list[Operation]] = [
+        migrations.AddField(
+            model_name='bot',
+            name='ban_list_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
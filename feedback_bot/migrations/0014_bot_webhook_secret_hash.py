@@ -0,0 +1,18 @@
+from typing import ClassVar
+
+from django.db import migrations, models
+from django.db.migrations.operations.base import Operation
+
+
+class Migration(migrations.Migration):
+    dependencies: ClassVar[list[tuple[str, str]]] = [
+        ('feedback_bot', '0013_bot_ban_list_version'),
+    ]
+
+    operations: ClassVar[list[Operation]] = [
+        migrations.AddField(
+            model_name='bot',
+            name='webhook_secret_hash',
+            field=models.CharField(blank=True, default='', editable=False, max_length=64),
+        ),
+    ]
@@ -88,6 +88,18 @@ class Bot(TimestampedModel):
         choices=CommunicationMode.choices,
         default=CommunicationMode.STANDARD,
     )
+    # Retention of message mappings and broadcast copies; unset falls back to the global setting
+    retention_days = models.PositiveIntegerField(blank=True, null=True)
+    retention_max_mappings = models.PositiveIntegerField(blank=True, null=True)
+    # Bumped on every ban change, so workers know when to reload their cached ban list
+    ban_list_version = models.PositiveIntegerField(default=0, editable=False)
+    # SHA-256 of the webhook secret last set at startup; Telegram doesn't return the secret
+    webhook_secret_hash = models.CharField(max_length=64, blank=True, default='', editable=False)
+
+    @property
+    def destination_chat_id(self) -> int | None:
+        """The chat feedback is forwarded to and the owner replies from."""
+        return self.forward_chat_id or self.owner_id
 
     def __str__(self) -> str:
         return f'@{self.username}'
@@ -107,6 +119,11 @@ class FeedbackChat(TimestampedModel):
         blank=True,
         help_text='The ID of the forum topic for this user in the forward_chat_id group.',
     )
+    topic_claimed_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text='When a worker started creating the forum topic, so others wait for it.',
+    )
     last_feedback_at = models.DateTimeField(null=True, blank=True)
     last_warning_at = models.DateTimeField(null=True, blank=True)
 
@@ -128,12 +145,40 @@ class MessageMapping(models.Model):
 
     # Message ID in the user's private chat with the bot
     user_message_id = models.BigIntegerField()
-    # Message ID of the forwarded message in the owner's chat/group
+    # Chat the message was forwarded to, and the forwarded message's ID there
+    owner_chat_id = models.BigIntegerField()
     owner_message_id = models.BigIntegerField()
+    created_at = models.DateTimeField(auto_now_add=True)
 
     class Meta:
-        # Each message from the user can only be mapped once
-        unique_together = ('bot', 'user_message_id')
+        constraints: ClassVar[list[models.BaseConstraint]] = [
+            # Message IDs of private chats are only unique per user
+            models.UniqueConstraint(
+                fields=['bot', 'user_chat', 'user_message_id'],
+                name='unique_user_message_mapping',
+            ),
+        ]
+        indexes: ClassVar[list[models.Index]] = [
+            # Reply, edit and reaction lookups of the owner side. The trailing columns make the
+            # index covering on every backend, unlike INCLUDE, which only PostgreSQL supports
+            models.Index(
+                fields=[
+                    'bot',
+                    'owner_chat_id',
+                    'owner_message_id',
+                    'user_chat',
+                    'user_message_id',
+                    'id',
+                ],
+                name='owner_message_mapping_idx',
+            ),
+            models.Index(fields=['bot', 'created_at'], name='mapping_bot_created_idx'),
+        ]
+
+    def save(self, *args, **kwargs) -> None:
+        if self.owner_chat_id is None:
+            self.owner_chat_id = self.bot.destination_chat_id
+        super().save(*args, **kwargs)
 
 
 class BotStats(models.Model):
@@ -184,7 +229,8 @@ class BroadcastMessage(models.Model):
     class Meta:
         ordering: ClassVar[list[str]] = ['-created_at']
         indexes: ClassVar[list[models.Index]] = [
-            models.Index(fields=['bot', 'chat_id'], name='broadcast_bot_chat_idx')
+            models.Index(fields=['bot', 'chat_id'], name='broadcast_bot_chat_idx'),
+            models.Index(fields=['bot', 'created_at'], name='broadcast_bot_created_idx'),
         ]
 
     def __str__(self) -> str:
@@ -1,5 +1,6 @@
 import logging
 from functools import cache
+from time import perf_counter
 
 from django.conf import settings
 from telegram import BotCommand
@@ -8,7 +9,9 @@ from telegram.ext import Application, CommandHandler
 
 from feedback_bot.telegram.builder.modules import ALL_MODULES
 from feedback_bot.telegram.utils.errors import report_error
-from feedback_bot.utils.modules_loader import load_modules
+from feedback_bot.telegram.utils.journal import mark_builder_update_done
+from feedback_bot.telegram.utils.update_processor import ConversationUpdateProcessor
+from feedback_bot.utils.modules_loader import HandlerRegistry, load_modules
 
 logging.getLogger('httpx').setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
@@ -21,20 +24,34 @@ def get_ptb_application() -> Application:
         raise InvalidToken('TELEGRAM_BUILDER_BOT_TOKEN is not configured')
     # Here we set updater to None because we want our custom webhook server to handle the updates
     # and hence we don't need an Updater instance
-    application = Application.builder().token(token).updater(None).build()
+    application = (
+        Application.builder()
+        .token(token)
+        .base_url(settings.TELEGRAM_BOT_API_URL)
+        .updater(None)
+        .concurrent_updates(
+            ConversationUpdateProcessor(
+                settings.TELEGRAM_CONCURRENT_UPDATES, on_processed=mark_builder_update_done
+            )
+        )
+        .build()
+    )
     application.add_error_handler(report_error)
     return application
 
 
 def load_builder_modules() -> list[BotCommand]:
-    commands = []
     ptb_application = get_ptb_application()
-    for module in load_modules(ALL_MODULES):
-        if not hasattr(module, 'HANDLERS'):
-            continue
-        for handler in module.HANDLERS:
-            ptb_application.add_handler(handler)
-            if isinstance(handler, CommandHandler):
-                for command in handler.commands:
-                    commands.append(BotCommand(command, handler.callback.__doc__))
-    return commands
+    registry = HandlerRegistry.from_modules(load_modules(ALL_MODULES))
+    started = perf_counter()
+    registry.register(ptb_application)
+    logger.info(
+        f'Registered {len(registry.handlers)} builder handlers '
+        f'({(perf_counter() - started) * 1000:.1f} ms)'
+    )
+    return [
+        BotCommand(command, handler.callback.__doc__)
+        for handler, _ in registry.handlers
+        if isinstance(handler, CommandHandler)
+        for command in handler.commands
+    ]
@@ -1,9 +1,8 @@
 """Modules loader"""
 
-from collections.abc import Iterator
 from pathlib import Path
 from pkgutil import ModuleInfo
 
 from feedback_bot.utils.modules_loader import get_modules
 
-ALL_MODULES: Iterator[ModuleInfo] = get_modules(Path(__file__).parent)
+ALL_MODULES: tuple[ModuleInfo, ...] = tuple(get_modules(Path(__file__).parent))
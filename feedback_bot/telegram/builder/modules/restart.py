@@ -8,6 +8,7 @@ from telegram import Update
 from telegram.ext import CommandHandler, ContextTypes
 
 from feedback_bot.telegram.builder.filters import is_admin
+from feedback_bot.telegram.utils.journal import mark_builder_update_done
 
 
 async def restart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -18,6 +19,8 @@ async def restart(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
     )
     chat_info = {'chat': restart_message.chat_id, 'message': restart_message.message_id}
     (settings.BASE_DIR / 'restart.json').write_bytes(orjson.dumps(chat_info))
+    # The process is replaced before this update is marked done, so don't replay it after restart
+    await mark_builder_update_done(update)
     execlp('uv', 'uv', 'run', 'granian', '--interface', 'asgi', 'config.asgi:application')  # noqa: S606, S607
 
 
@@ -0,0 +1,119 @@
+"""
+Buffering of album (media group) messages, so an album is forwarded with one Bot API call.
+
+Telegram delivers every item of an album as its own update. The first item starts a pending
+album for its chat, items with the same `media_group_id` join it, and the album is delivered in
+the background once no item arrived for `TELEGRAM_MEDIA_GROUP_WINDOW` seconds. Any other message
+of the chat delivers the pending album first, so a user's messages still arrive in order.
+Albums still pending when the worker stops are delivered on shutdown. With the update journal
+enabled, the updates of an album are only marked done once the album was delivered.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable
+from dataclasses import dataclass, field
+from functools import cache
+from time import monotonic
+
+from django.conf import settings
+from telegram import Message
+
+from feedback_bot.telegram.utils.journal import defer_update_done
+from feedback_bot.telegram.utils.webhook_reply import without_webhook_reply
+
+logger = logging.getLogger(__name__)
+
+type DeliverAlbum = Callable[[list[Message]], Awaitable[None]]
+
+
+@dataclass(slots=True)
+class PendingAlbum:
+    media_group_id: str
+    deliver: DeliverAlbum
+    deadline: float
+    messages: list[Message] = field(default_factory=list)
+    task: asyncio.Task | None = None
+    finish_updates: list[Callable[[], Awaitable[None]]] = field(default_factory=list)
+
+    def hold_update(self) -> None:
+        """Keep the update being processed unfinished in the journal until delivery."""
+        if (finish := defer_update_done()) is not None:
+            self.finish_updates.append(finish)
+
+
+class AlbumBuffer:
+    """Pending albums keyed by conversation; at most one per conversation at a time."""
+
+    def __init__(self, window: float) -> None:
+        self.window = window
+        self._pending: dict[Hashable, PendingAlbum] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    @property
+    def enabled(self) -> bool:
+        return self.window > 0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, key: Hashable, message: Message) -> bool:
+        """Add a message to the conversation's pending album; False if it doesn't belong to it."""
+        album = self._pending.get(key)
+        if album is None or album.media_group_id != message.media_group_id:
+            return False
+        album.messages.append(message)
+        album.deadline = monotonic() + self.window
+        album.hold_update()
+        return True
+
+    def start(self, key: Hashable, message: Message, deliver: DeliverAlbum) -> None:
+        album = PendingAlbum(message.media_group_id, deliver, monotonic() + self.window, [message])
+        album.hold_update()
+        album.task = asyncio.create_task(self._deliver_later(key, album), name=f'album-{key}')
+        self._tasks.add(album.task)
+        album.task.add_done_callback(self._tasks.discard)
+        self._pending[key] = album
+
+    async def flush(self, key: Hashable) -> None:
+        """Deliver the conversation's pending album now, ahead of a later message."""
+        if (album := self._pending.pop(key, None)) is None:
+            return
+        if album.task is not None:
+            album.task.cancel()
+        await self._deliver(album)
+
+    async def close(self) -> None:
+        """Deliver every pending album and wait for deliveries already in progress."""
+        for key in list(self._pending):
+            await self.flush(key)
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _deliver_later(self, key: Hashable, album: PendingAlbum) -> None:
+        while (delay := album.deadline - monotonic()) > 0:
+            await asyncio.sleep(delay)
+        # Popped before delivering, so flush() can only cancel this task while it sleeps
+        if self._pending.get(key) is album:
+            del self._pending[key]
+            await self._deliver(album)
+
+    @staticmethod
+    async def _deliver(album: PendingAlbum) -> None:
+        # The update that started the album may have been answered long ago, and a flushing
+        # update answers for itself, so the album is acknowledged with its own request
+        try:
+            with without_webhook_reply():
+                await album.deliver(album.messages)
+        except Exception:
+            logger.exception(f'Failed to deliver album {album.media_group_id}')
+        # Failed albums count as handled too, like updates whose handler raised
+        for finish in album.finish_updates:
+            try:
+                await finish()
+            except Exception:
+                logger.exception(f'Failed to mark album {album.media_group_id} done')
+
+
+@cache
+def get_album_buffer() -> AlbumBuffer:
+    return AlbumBuffer(settings.TELEGRAM_MEDIA_GROUP_WINDOW)
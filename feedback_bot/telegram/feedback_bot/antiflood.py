@@ -0,0 +1,117 @@
+"""
+Token-bucket antiflood for feedback bots, held in worker memory.
+
+Each bot and user pair gets a bucket of `TELEGRAM_ANTIFLOOD_BURST` messages that refills one
+message every `antiflood_seconds`. Messages dropped by the antiflood never touch the database:
+only warnings are stored, in batches by the process-wide flusher, so that buckets evicted or
+lost on restart can be seeded again from the feedback chat.
+"""
+
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum, auto
+from functools import cache
+
+from django.conf import settings
+
+from feedback_bot.crud import save_feedback_warnings
+from feedback_bot.models import Bot, FeedbackChat
+from feedback_bot.utils.cache import TTLCache
+from feedback_bot.utils.flusher import get_flusher
+
+
+class FloodVerdict(Enum):
+    ALLOW = auto()
+    WARN = auto()
+    DROP = auto()
+
+
+@dataclass(slots=True)
+class TokenBucket:
+    tokens: float
+    updated_at: datetime
+    warned_at: datetime | None = None
+
+    def refill(self, now: datetime, period: int, burst: int) -> None:
+        if now > self.updated_at:
+            elapsed = (now - self.updated_at).total_seconds()
+            self.tokens = min(self.tokens + elapsed / period, burst)
+            self.updated_at = now
+
+
+class AntifloodEngine:
+    """
+    Decides whether a feedback message is forwarded, answered with a warning, or dropped.
+
+    Time is taken from message dates, so buckets follow the order users sent their messages in.
+    Buckets are kept per worker: a user whose updates are spread over several workers gets a
+    bucket in each of them.
+    """
+
+    def __init__(self, maxsize: int, burst: int) -> None:
+        self.burst = max(burst, 1)
+        self._buckets: TTLCache[tuple[int, int], TokenBucket] = TTLCache(maxsize)
+        self._warnings: dict[int, datetime] = {}
+
+    def check(
+        self, bot: Bot, user_telegram_id: int, chat: FeedbackChat | None, now: datetime
+    ) -> FloodVerdict:
+        period = max(bot.antiflood_seconds or 60, 1)
+        key = (bot.pk, user_telegram_id)
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._seed(chat, now, period)
+            self._buckets.set(key, bucket)
+        bucket.refill(now, period, self.burst)
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            bucket.warned_at = None
+            if chat is not None:
+                # The allowed message clears the stored warning itself
+                self._warnings.pop(chat.pk, None)
+            return FloodVerdict.ALLOW
+        if bucket.warned_at is None or (now - bucket.warned_at).total_seconds() >= period:
+            bucket.warned_at = now
+            return FloodVerdict.WARN
+        return FloodVerdict.DROP
+
+    def _seed(self, chat: FeedbackChat | None, now: datetime, period: int) -> TokenBucket:
+        """Start a bucket as if it was full when the chat's last message was forwarded."""
+        if chat is None or chat.last_feedback_at is None:
+            return TokenBucket(self.burst, now)
+        elapsed = max((now - chat.last_feedback_at).total_seconds(), 0)
+        tokens = min(self.burst - 1 + elapsed / period, self.burst)
+        return TokenBucket(tokens, now, chat.last_warning_at)
+
+    async def save_warning(self, chat: FeedbackChat | None, now: datetime) -> None:
+        """Store a warning with the next flush, or right away while the flusher isn't running."""
+        if chat is None:
+            return
+        chat.last_warning_at = now
+        self._warnings[chat.pk] = now
+        if not get_flusher().running:
+            await self.flush()
+
+    async def flush(self) -> None:
+        warnings, self._warnings = self._warnings, {}
+        if not warnings:
+            return
+        try:
+            await save_feedback_warnings(warnings)
+        except Exception:
+            self._warnings = warnings | self._warnings
+            raise
+
+    def clear(self) -> None:
+        self._buckets.clear()
+        self._warnings.clear()
+
+
+@cache
+def get_antiflood() -> AntifloodEngine:
+    engine = AntifloodEngine(
+        settings.TELEGRAM_ANTIFLOOD_CACHE_SIZE, settings.TELEGRAM_ANTIFLOOD_BURST
+    )
+    get_flusher().register(engine.flush)
+    return engine
@@ -1,81 +1,158 @@
+import asyncio
 import logging
+from collections import Counter
+from functools import cache
 from pathlib import Path
+from uuid import UUID
 
 from django.conf import settings
-from telegram import Bot, Update
+from telegram import WebhookInfo
+from telegram.error import RetryAfter
 from telegram.ext import Application
 
-from feedback_bot.crud import get_bots_keys, get_bots_tokens
+from feedback_bot.crud import get_bots_keys, get_bots_webhook_keys, save_webhook_secret_hash
 from feedback_bot.models import Bot as BotConfig
-from feedback_bot.telegram.utils.cryptography import generate_bot_webhook_secret
+from feedback_bot.telegram.utils.cryptography import (
+    generate_bot_webhook_secret,
+    hash_bot_webhook_secret,
+)
 from feedback_bot.telegram.utils.errors import report_error
-from feedback_bot.utils.modules_loader import get_modules, load_modules
+from feedback_bot.telegram.utils.http import build_bot, get_shared_request
+from feedback_bot.telegram.utils.update_processor import ConversationUpdateProcessor
+from feedback_bot.telegram.utils.update_types import allowed_updates, handlers_update_types
+from feedback_bot.utils.modules_loader import HandlerRegistry, get_modules, load_modules
 
 logger = logging.getLogger(__name__)
+WEBHOOK_SETUP_ATTEMPTS = 3
+WEBHOOK_SETUP_PROGRESS_INTERVAL = 100
+
+
+@cache
+def get_feedback_bot_handlers() -> HandlerRegistry:
+    """Import the feedback bot modules once per process and collect their handlers."""
+    return HandlerRegistry.from_modules(
+        load_modules(get_modules(Path(__file__).parent / 'modules'))
+    )
+
+
+@cache
+def get_feedback_update_types() -> frozenset[str] | None:
+    """Update types some feedback bot handler may consume; None if it can't be determined."""
+    return handlers_update_types(handler for handler, _ in get_feedback_bot_handlers().handlers)
+
+
+def get_feedback_allowed_updates() -> list[str]:
+    """`allowed_updates` for feedback bot webhooks, derived from the registered handlers."""
+    return allowed_updates(handler for handler, _ in get_feedback_bot_handlers().handlers)
 
 
 def build_feedback_bot_application(bot_config: BotConfig) -> Application:
     """
-    Builds and configures a lightweight, request-scoped PTB Application
-    for a feedback bot.
+    Builds and configures a lightweight PTB Application for a feedback bot.
+    Applications are kept warm by the pool in `feedback_bot.telegram.feedback_bot.pool`.
+    Updates of the same conversation are processed in order, different conversations in parallel.
     """
     application = (
         Application.builder()
         .updater(None)
         .job_queue(None)
         .rate_limiter(None)
-        .concurrent_updates(1)
+        .concurrent_updates(ConversationUpdateProcessor(settings.TELEGRAM_CONCURRENT_UPDATES))
+        .request(get_shared_request())
+        .get_updates_request(get_shared_request())
         .token(bot_config.token)
+        .base_url(settings.TELEGRAM_BOT_API_URL)
         .build()
     )
 
     application.bot_data['bot_config'] = bot_config
+    get_feedback_bot_handlers().register(application)
+    application.add_error_handler(report_error)
 
-    for module in load_modules(get_modules(Path(__file__).parent / 'modules')):
-        if not hasattr(module, 'HANDLERS'):
-            continue
+    return application
 
-        for handler_spec in module.HANDLERS:
-            if isinstance(handler_spec, tuple):
-                handler, group = handler_spec
-                application.add_handler(handler, group)
-                continue
 
-            application.add_handler(handler_spec)
+def _is_webhook_current(info: WebhookInfo, webhook_url: str, update_types: list[str]) -> bool:
+    """Whether Telegram already delivers the right updates to the right URL."""
+    return info.url == webhook_url and set(info.allowed_updates or ()) == set(update_types)
 
-    application.add_error_handler(report_error)
 
-    return application
+async def _ensure_bot_webhook(
+    bot_uuid: UUID, bot_token: str, secret_hash: str, update_types: list[str]
+) -> bool:
+    """
+    Set the webhook of a bot unless it's already current; returns whether it was set.
+
+    Telegram doesn't return the secret token, so the hash of the secret set last is stored, and a
+    webhook whose secret can't be verified that way, e.g. after SECRET_KEY changed, is set again.
+    """
+    ptb_bot = build_bot(bot_token)
+    webhook_url = f'{settings.TELEGRAM_BUILDER_BOT_WEBHOOK_URL}/api/webhook/{bot_uuid}/'
+    secret = generate_bot_webhook_secret(str(bot_uuid))
+    current_hash = hash_bot_webhook_secret(secret)
+    for attempt in range(WEBHOOK_SETUP_ATTEMPTS):
+        try:
+            if secret_hash == current_hash and _is_webhook_current(
+                await ptb_bot.get_webhook_info(), webhook_url, update_types
+            ):
+                return False
+            await ptb_bot.set_webhook(
+                webhook_url, secret_token=secret, allowed_updates=update_types
+            )
+        except RetryAfter as err:
+            if attempt + 1 == WEBHOOK_SETUP_ATTEMPTS:
+                raise
+            await asyncio.sleep(err.retry_after + 1)
+        else:
+            await save_webhook_secret_hash(bot_uuid, current_hash)
+            return True
+    return False
 
 
 async def setup_bots_webhooks() -> None:
-    """Setup webhooks for bots."""
+    """
+    Setup webhooks for bots, `TELEGRAM_WEBHOOK_SETUP_CONCURRENCY` at a time.
+
+    Bots whose webhook is already current are left alone, so restarts only touch changed bots.
+    """
     logger.info('Bots webhooks setup...')
 
-    bots_keys = await get_bots_keys()
-    for bot_uuid, bot_token in bots_keys:
-        ptb_bot = Bot(token=bot_token)
-        webhook_url = f'{settings.TELEGRAM_BUILDER_BOT_WEBHOOK_URL}/api/webhook/{bot_uuid}/'
-        try:
-            await ptb_bot.set_webhook(
-                webhook_url,
-                secret_token=generate_bot_webhook_secret(str(bot_uuid)),
-                allowed_updates=Update.ALL_TYPES,
-            )
-        except Exception as err:  # noqa: BLE001
-            logger.error(f'Failed to set webhook for bot {bot_uuid}: {err}')
-    logger.info(f'Bots webhooks setup done for {len(bots_keys)} bots.')
+    bots_keys = await get_bots_webhook_keys()
+    update_types = get_feedback_allowed_updates()
+    semaphore = asyncio.Semaphore(max(settings.TELEGRAM_WEBHOOK_SETUP_CONCURRENCY, 1))
+    outcomes: Counter[str] = Counter()
+
+    async def setup(bot_uuid: UUID, bot_token: str, secret_hash: str) -> None:
+        async with semaphore:
+            try:
+                changed = await _ensure_bot_webhook(bot_uuid, bot_token, secret_hash, update_types)
+                outcomes['set' if changed else 'unchanged'] += 1
+            except Exception as err:  # noqa: BLE001
+                outcomes['failed'] += 1
+                logger.error(f'Failed to set webhook for bot {bot_uuid}: {err}')
+        if (done := outcomes.total()) % WEBHOOK_SETUP_PROGRESS_INTERVAL == 0:
+            logger.info(f'Bots webhooks setup: {done}/{len(bots_keys)} bots processed.')
+
+    await asyncio.gather(*(setup(*bot_keys) for bot_keys in bots_keys))
+    logger.info(
+        f'Bots webhooks setup done for {len(bots_keys)} bots: {outcomes["set"]} set, '
+        f'{outcomes["unchanged"]} already up to date, {outcomes["failed"]} failed.'
+    )
 
 
 async def remove_bots_webhooks() -> None:
-    """Remove webhooks for bots."""
+    """Remove webhooks for bots, `TELEGRAM_WEBHOOK_SETUP_CONCURRENCY` at a time."""
     logger.info('Removing bots webhooks...')
 
-    bots_tokens = await get_bots_tokens()
-    for bot_token in bots_tokens:
-        ptb_bot = Bot(token=bot_token)
-        try:
-            await ptb_bot.delete_webhook()
-        except Exception as err:  # noqa: BLE001
-            logger.error(f'Failed to remove webhook for bot {bot_token}: {err}')
-    logger.info(f'Bots webhooks removed for {len(bots_tokens)} bots.')
+    bots_keys = await get_bots_keys()
+    semaphore = asyncio.Semaphore(max(settings.TELEGRAM_WEBHOOK_SETUP_CONCURRENCY, 1))
+
+    async def remove(bot_uuid: UUID, bot_token: str) -> None:
+        async with semaphore:
+            try:
+                await build_bot(bot_token).delete_webhook()
+            except Exception as err:  # noqa: BLE001
+                logger.error(f'Failed to remove webhook for bot {bot_uuid}: {err}')
+
+    await asyncio.gather(*(remove(bot_uuid, bot_token) for bot_uuid, bot_token in bots_keys))
+    logger.info(f'Bots webhooks removed for {len(bots_keys)} bots.')
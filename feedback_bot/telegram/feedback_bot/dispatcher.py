@@ -0,0 +1,118 @@
+"""Processing of feedback bot webhook updates, inline or through a worker pool."""
+
+import asyncio
+import logging
+from contextlib import suppress
+from functools import cache
+from typing import Any
+
+from django.conf import settings
+from telegram import Update
+
+from feedback_bot.models import Bot as BotConfig
+from feedback_bot.telegram.feedback_bot.pool import get_application_pool
+from feedback_bot.telegram.utils.journal import get_update_journal, processing_update
+from feedback_bot.telegram.utils.update_processor import payload_conversation_key
+
+logger = logging.getLogger(__name__)
+
+
+async def process_feedback_update(
+    bot_uuid: str, bot_config: BotConfig, payload: dict[str, Any]
+) -> None:
+    """
+    Run a decoded webhook payload through the bot's pooled application.
+    Goes through the application's update processor, so updates of one conversation stay serialized.
+    The update is marked done in the journal once processed, or once found to be invalid,
+    unless a handler deferred that until its background work is over.
+
+    :raises ValueError, TypeError: If the payload is not a valid Telegram update.
+    """
+    journal = get_update_journal()
+    try:
+        with processing_update(bot_uuid, payload['update_id']) as processing:
+            async with get_application_pool().application(bot_uuid, bot_config) as ptb_application:
+                update = Update.de_json(data=payload, bot=ptb_application.bot)
+                await ptb_application.update_processor.process_update(
+                    update, ptb_application.process_update(update)
+                )
+    except ValueError, TypeError:
+        if journal:
+            await journal.mark_done(bot_uuid, payload['update_id'])
+        raise
+    if journal and not processing.deferred:
+        await journal.mark_done(bot_uuid, payload['update_id'])
+
+
+class UpdateDispatcher:
+    """
+    Bounded queues drained by a pool of asyncio workers, used to acknowledge webhooks early.
+
+    Updates are sharded by (bot, conversation) so each conversation is always handled by the same
+    worker in arrival order, while different conversations are spread over all workers.
+    Workers are started lazily on the running loop the first time an update is submitted.
+    """
+
+    def __init__(self, workers: int, queue_size: int) -> None:
+        self.workers = max(workers, 1)
+        shard_size = max(queue_size // self.workers, 1)
+        self._queues: list[asyncio.Queue[tuple[str, BotConfig, dict[str, Any]]]] = [
+            asyncio.Queue(maxsize=shard_size) for _ in range(self.workers)
+        ]
+        self._tasks: list[asyncio.Task] = []
+
+    @property
+    def pending(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def submit(self, bot_uuid: str, bot_config: BotConfig, payload: dict[str, Any]) -> bool:
+        """Queue an update; returns False when its shard is full and the caller must process it."""
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(queue), name=f'feedback-update-worker-{index}')
+                for index, queue in enumerate(self._queues)
+            ]
+        key = (bot_uuid, payload_conversation_key(payload))
+        queue = self._queues[hash(key) % self.workers]
+        try:
+            queue.put_nowait((bot_uuid, bot_config, payload))
+        except asyncio.QueueFull:
+            logger.debug(f'Update queue is full, processing update for bot {bot_uuid} inline.')
+            return False
+        return True
+
+    async def stop(self, timeout: float = 30) -> None:
+        """Wait for queued updates to be processed, then stop the workers."""
+        if not self._tasks:
+            return
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in self._queues)), timeout
+            )
+        except TimeoutError:
+            logger.warning(f'Dropping {self.pending} queued updates after {timeout}s drain.')
+        for task in self._tasks:
+            task.cancel()
+        for task in self._tasks:
+            with suppress(asyncio.CancelledError):
+                await task
+        self._tasks = []
+
+    @staticmethod
+    async def _worker(queue: asyncio.Queue[tuple[str, BotConfig, dict[str, Any]]]) -> None:
+        while True:
+            bot_uuid, bot_config, payload = await queue.get()
+            try:
+                await process_feedback_update(bot_uuid, bot_config, payload)
+            except Exception:
+                logger.exception(f'Failed to process queued update for bot {bot_uuid}')
+            finally:
+                queue.task_done()
+
+
+@cache
+def get_update_dispatcher() -> UpdateDispatcher:
+    return UpdateDispatcher(
+        workers=settings.TELEGRAM_WEBHOOK_WORKERS,
+        queue_size=settings.TELEGRAM_WEBHOOK_QUEUE_SIZE,
+    )
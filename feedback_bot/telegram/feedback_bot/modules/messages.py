@@ -2,7 +2,10 @@
 
 from __future__ import annotations
 
+import asyncio
+from collections.abc import Sequence
 from datetime import UTC, datetime
+from functools import partial
 from html import escape
 
 from django.utils.translation import gettext as _
@@ -12,6 +15,7 @@ from telegram import (
     InputMediaPhoto,
     InputMediaVideo,
     Message,
+    MessageId,
     Update,
 )
 from telegram.constants import ChatType, ParseMode
@@ -19,21 +23,31 @@ from telegram.error import BadRequest, Forbidden
 from telegram.ext import ContextTypes, MessageHandler, MessageReactionHandler, filters
 
 from feedback_bot.crud import (
-    bump_incoming_messages,
+    FeedbackUnitOfWork,
     bump_outgoing_messages,
+    claim_feedback_chat_topic,
     clear_feedback_chat_mappings,
     ensure_feedback_chat,
+    get_feedback_chat_topic,
+    get_feedback_sender,
     get_owner_message_mapping,
     get_user_message_mapping,
     is_user_banned,
-    save_incoming_mapping,
-    save_outgoing_mapping,
-    set_feedback_chat_last_feedback,
-    set_feedback_chat_last_warning,
+    release_feedback_chat_topic,
+    save_message_mapping,
     set_feedback_chat_topic,
     update_bot_settings,
 )
 from feedback_bot.models import Bot, FeedbackChat, MessageMapping
+from feedback_bot.telegram.feedback_bot.albums import get_album_buffer
+from feedback_bot.telegram.feedback_bot.antiflood import FloodVerdict, get_antiflood
+from feedback_bot.telegram.utils.webhook_reply import defer_to_webhook_response
+from feedback_bot.utils.single_flight import SingleFlight
+
+TOPIC_CLAIM_TIMEOUT = 30
+TOPIC_CLAIM_POLL_INTERVAL = 0.5
+
+_topic_creations: SingleFlight[tuple[int, int], int | None] = SingleFlight()
 
 
 def _is_owner_chat_topic_mode(bot_config: Bot) -> bool:
@@ -67,6 +81,48 @@ async def _create_topic(
     bot_config: Bot,
     message: Message,
     feedback_chat: FeedbackChat,
+) -> int | None:
+    """
+    Create the conversation's forum topic once, even when several of its messages need it at once.
+
+    Concurrent calls in this worker share one creation, and a claim on the feedback chat row makes
+    other workers wait for the topic instead of creating their own.
+    """
+    topic_id = await _topic_creations.run(
+        (bot_config.pk, feedback_chat.user_telegram_id),
+        partial(_claim_and_create_topic, context, bot_config, message, feedback_chat),
+    )
+    feedback_chat.topic_id = topic_id
+    return topic_id
+
+
+async def _claim_and_create_topic(
+    context: ContextTypes.DEFAULT_TYPE,
+    bot_config: Bot,
+    message: Message,
+    feedback_chat: FeedbackChat,
+) -> int | None:
+    waited = 0.0
+    while not await claim_feedback_chat_topic(feedback_chat, stale_after=TOPIC_CLAIM_TIMEOUT):
+        if (topic_id := await get_feedback_chat_topic(feedback_chat)) is not None:
+            return topic_id
+        # Claims expire after the timeout, so only a deleted chat keeps failing past it
+        if waited > TOPIC_CLAIM_TIMEOUT:
+            break
+        await asyncio.sleep(TOPIC_CLAIM_POLL_INTERVAL)
+        waited += TOPIC_CLAIM_POLL_INTERVAL
+
+    try:
+        return await _create_forum_topic(context, bot_config, message, feedback_chat)
+    finally:
+        await release_feedback_chat_topic(feedback_chat)
+
+
+async def _create_forum_topic(
+    context: ContextTypes.DEFAULT_TYPE,
+    bot_config: Bot,
+    message: Message,
+    feedback_chat: FeedbackChat,
 ) -> int | None:
     topic_chat_id = _topic_destination_chat_id(bot_config)
     if topic_chat_id is None:
@@ -84,6 +140,9 @@ async def _create_topic(
             return None
         raise
 
+    # Stored before the intro, so a failed intro doesn't lead to a second topic
+    await set_feedback_chat_topic(feedback_chat, topic.message_thread_id)
+
     await _send_intro_message(
         context,
         bot_config,
@@ -92,8 +151,6 @@ async def _create_topic(
         feedback_chat,
         thread_id=topic.message_thread_id,
     )
-
-    await set_feedback_chat_topic(feedback_chat, topic.message_thread_id)
     return topic.message_thread_id
 
 
@@ -144,41 +201,80 @@ async def _deliver_incoming_message(
     return await message.forward(**kwargs)
 
 
+async def _deliver_incoming_messages(
+    context: ContextTypes.DEFAULT_TYPE,
+    bot_config: Bot,
+    messages: Sequence[Message],
+    destination_chat_id: int,
+    topic_id: int | None,
+    *,
+    use_copy: bool,
+) -> Sequence[Message | MessageId]:
+    """Deliver a single message, or all messages of an album with one Bot API call."""
+    if len(messages) == 1:
+        return [
+            await _deliver_incoming_message(
+                context, bot_config, messages[0], destination_chat_id, topic_id, use_copy
+            )
+        ]
+
+    kwargs: dict[str, object] = {
+        'chat_id': destination_chat_id,
+        'from_chat_id': messages[0].chat_id,
+        'message_ids': [message.message_id for message in messages],
+    }
+    if topic_id is not None:
+        kwargs['message_thread_id'] = topic_id
+    if use_copy:
+        return await context.bot.copy_messages(**kwargs)
+    try:
+        return await context.bot.forward_messages(**kwargs)
+    except BadRequest as exc:
+        if _is_message_not_forwardable(exc):
+            return await context.bot.copy_messages(**kwargs)
+        raise
+
+
 async def _forward_with_topic_fallback(
     context: ContextTypes.DEFAULT_TYPE,
     bot_config: Bot,
-    message: Message,
+    messages: Sequence[Message],
     feedback_chat: FeedbackChat,
     destination_chat_id: int,
     topic_id: int | None,
-) -> tuple[Message, int | None]:
+) -> tuple[Sequence[Message | MessageId], int | None]:
     use_copy = _should_copy_incoming(bot_config)
     try:
-        forwarded = await _deliver_incoming_message(
+        forwarded = await _deliver_incoming_messages(
             context,
             bot_config,
-            message,
+            messages,
             destination_chat_id,
             topic_id,
-            use_copy,
+            use_copy=use_copy,
         )
         return forwarded, topic_id
-    except BadRequest as exc:  # pragma: no cover - topic recreation path
+    except BadRequest as exc:
         if not _is_topic_missing(exc):
             raise
         topic_chat_id = _topic_destination_chat_id(bot_config)
         if topic_chat_id is None or destination_chat_id != topic_chat_id:
             raise
-        await clear_feedback_chat_mappings(bot_config, feedback_chat)
-        await set_feedback_chat_topic(feedback_chat, None)
-        new_topic = await _create_topic(context, bot_config, message, feedback_chat)
-        forwarded = await _deliver_incoming_message(
+        # The cached chat may be stale: another worker may have replaced the topic already
+        stored_topic = await get_feedback_chat_topic(feedback_chat)
+        if stored_topic is not None and stored_topic != topic_id:
+            feedback_chat.topic_id = new_topic = stored_topic
+        else:
+            await clear_feedback_chat_mappings(bot_config, feedback_chat)
+            await set_feedback_chat_topic(feedback_chat, None)
+            new_topic = await _create_topic(context, bot_config, messages[0], feedback_chat)
+        forwarded = await _deliver_incoming_messages(
             context,
             bot_config,
-            message,
+            messages,
             destination_chat_id,
             new_topic,
-            use_copy,
+            use_copy=use_copy,
         )
         return forwarded, new_topic
 
@@ -371,7 +467,15 @@ async def forward_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -
 
     bot_config: Bot = context.bot_data['bot_config']
 
-    if await is_user_banned(bot_config.id, message.from_user.id):
+    albums = get_album_buffer()
+    album_key = (bot_config.pk, message.chat_id)
+    if not _media_block_message(bot_config, message) and albums.add(album_key, message):
+        # The first message of the album already went through the checks below
+        return
+    await albums.flush(album_key)
+
+    banned, feedback_chat = await get_feedback_sender(bot_config, message.from_user.id)
+    if banned:
         return
 
     destination_chat_id = bot_config.forward_chat_id or bot_config.owner_id
@@ -386,29 +490,82 @@ async def forward_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -
         await message.reply_text(block_text, reply_to_message_id=message.message_id)
         return
 
-    feedback_chat, created = await ensure_feedback_chat(
-        bot_config, message.from_user.id, message.from_user.username
-    )
-
     now = message.date or datetime.now(UTC)
     now = now.replace(tzinfo=UTC) if now.tzinfo is None else now.astimezone(UTC)
-    cooldown_seconds = max(getattr(bot_config, 'antiflood_seconds', 60) or 60, 1)
 
-    if (
-        bot_config.antiflood_enabled
-        and feedback_chat.last_feedback_at
-        and (now - feedback_chat.last_feedback_at).total_seconds() < cooldown_seconds
-    ):
-        if (
-            feedback_chat.last_warning_at is None
-            or (now - feedback_chat.last_warning_at).total_seconds() >= cooldown_seconds
-        ):
+    if bot_config.antiflood_enabled:
+        antiflood = get_antiflood()
+        verdict = antiflood.check(bot_config, message.from_user.id, feedback_chat, now)
+        if verdict is FloodVerdict.WARN:
+            cooldown_seconds = max(bot_config.antiflood_seconds or 60, 1)
             text = _(
                 'Too many messages. Please wait {seconds} seconds before sending again.'
             ).format(seconds=cooldown_seconds)
             await message.reply_text(text, reply_to_message_id=message.message_id)
-            await set_feedback_chat_last_warning(feedback_chat, now)
+            await antiflood.save_warning(feedback_chat, now)
+        if verdict is not FloodVerdict.ALLOW:
+            return
+
+    if message.media_group_id and albums.enabled:
+        albums.start(
+            album_key,
+            message,
+            partial(
+                _forward_album,
+                update,
+                context,
+                bot_config,
+                feedback_chat=feedback_chat,
+                destination_chat_id=destination_chat_id,
+                now=now,
+            ),
+        )
         return
+
+    await _forward_incoming_feedback(
+        context,
+        bot_config,
+        [message],
+        feedback_chat=feedback_chat,
+        destination_chat_id=destination_chat_id,
+        now=now,
+    )
+
+
+async def _forward_album(
+    update: Update,
+    context: ContextTypes.DEFAULT_TYPE,
+    bot_config: Bot,
+    messages: Sequence[Message],
+    **kwargs,
+) -> None:
+    """Forward a buffered album; runs after the handler returned, so errors are reported here."""
+    try:
+        await _forward_incoming_feedback(context, bot_config, messages, **kwargs)
+    except Exception as exc:  # noqa: BLE001
+        await context.application.process_error(update, exc)
+
+
+async def _forward_incoming_feedback(
+    context: ContextTypes.DEFAULT_TYPE,
+    bot_config: Bot,
+    messages: Sequence[Message],
+    *,
+    feedback_chat: FeedbackChat | None,
+    destination_chat_id: int,
+    now: datetime,
+) -> None:
+    """Forward a message, or the messages of an album, and acknowledge them with one reply."""
+    message = messages[0]
+    created = False
+    if feedback_chat is None:
+        # Topics and intro messages refer to the chat, so a new one is stored right away
+        feedback_chat, created = await ensure_feedback_chat(
+            bot_config, message.from_user.id, message.from_user.username
+        )
+    changes = FeedbackUnitOfWork(bot_config, feedback_chat)
+    changes.set_username(message.from_user.username)
+
     topic_id = await _ensure_topic(context, bot_config, message, feedback_chat)
     if created and not bot_config.forward_chat_id and topic_id is None:
         await _send_intro_message(
@@ -422,20 +579,30 @@ async def forward_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -
     forwarded, topic_id = await _forward_with_topic_fallback(
         context,
         bot_config,
-        message,
+        messages,
         feedback_chat,
         destination_chat_id,
         topic_id,
     )
 
-    await save_incoming_mapping(bot_config, feedback_chat, message.message_id, forwarded.message_id)
-    await set_feedback_chat_last_feedback(feedback_chat, now)
-    if feedback_chat.last_warning_at is not None:
-        await set_feedback_chat_last_warning(feedback_chat, None)
-    await bump_incoming_messages(bot_config)
+    # forwardMessages skips messages that can't be found, so only a full batch maps one to one
+    if len(forwarded) == len(messages):
+        for incoming, delivered in zip(messages, forwarded, strict=True):
+            changes.save_incoming_mapping(incoming.message_id, delivered.message_id)
+    for _incoming in messages:
+        changes.bump_incoming_messages()
+    changes.set_last_feedback(now)
+    changes.set_last_warning(None)
+    await changes.commit()
 
     text = bot_config.feedback_received_message or _('Thanks for your feedback!')
-    await message.reply_text(text, reply_to_message_id=message.message_id)
+    if not defer_to_webhook_response(
+        'sendMessage',
+        chat_id=message.chat_id,
+        text=text,
+        reply_parameters={'message_id': message.message_id},
+    ):
+        await message.reply_text(text, reply_to_message_id=message.message_id)
 
 
 async def edit_forwarded_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
@@ -464,16 +631,16 @@ async def edit_forwarded_feedback(update: Update, context: ContextTypes.DEFAULT_
     feedback_chat = mapping.user_chat
     topic_id = feedback_chat.topic_id
 
-    forwarded, topic_id = await _forward_with_topic_fallback(
+    (forwarded,), topic_id = await _forward_with_topic_fallback(
         context,
         bot_config,
-        message,
+        [message],
         feedback_chat,
         destination_chat_id,
         topic_id,
     )
 
-    await save_incoming_mapping(bot_config, feedback_chat, message.message_id, forwarded.message_id)
+    await save_message_mapping(bot_config, feedback_chat, message.message_id, forwarded.message_id)
 
     message_kwargs: dict[str, object] = {
         'chat_id': destination_chat_id,
@@ -519,10 +686,16 @@ async def reply_to_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE)
         allow_sending_without_reply=True,
     )
 
-    await save_outgoing_mapping(bot_config, feedback_chat, result.message_id, message.message_id)
+    await save_message_mapping(bot_config, feedback_chat, result.message_id, message.message_id)
     await bump_outgoing_messages(bot_config)
 
-    await message.set_reaction('👍')
+    if not defer_to_webhook_response(
+        'setMessageReaction',
+        chat_id=message.chat_id,
+        message_id=message.message_id,
+        reaction=[{'type': 'emoji', 'emoji': '👍'}],
+    ):
+        await message.set_reaction('👍')
 
 
 async def edit_reply_to_feedback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
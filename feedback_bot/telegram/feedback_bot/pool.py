@@ -0,0 +1,148 @@
+"""Pool of initialized feedback bot applications shared across webhook requests."""
+
+import asyncio
+import logging
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from functools import cache
+from time import monotonic
+
+from django.conf import settings
+from telegram.ext import Application
+
+from feedback_bot.models import Bot as BotConfig
+from feedback_bot.telegram.feedback_bot.bot import build_feedback_bot_application
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class PoolEntry:
+    application: Application
+    token: str
+    last_used: float
+    in_use: int = 0
+    evicted: bool = False
+
+
+class ApplicationPool:
+    """
+    Bounded LRU pool of initialized PTB applications keyed by bot UUID.
+
+    The bot config passed on every acquire replaces ``bot_data['bot_config']``, so settings
+    changes are picked up without rebuilding. A changed (encrypted) token rebuilds the
+    application, which keeps workers that missed an explicit invalidation correct.
+    """
+
+    def __init__(self, max_size: int, idle_timeout: float) -> None:
+        self.max_size = max(max_size, 1)
+        self.idle_timeout = idle_timeout
+        self._entries: OrderedDict[str, PoolEntry] = OrderedDict()
+        self._pending: dict[str, asyncio.Future[PoolEntry]] = {}
+        self._closing: set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, bot_uuid: object) -> bool:
+        return str(bot_uuid) in self._entries
+
+    @asynccontextmanager
+    async def application(self, bot_uuid: str, bot_config: BotConfig) -> AsyncIterator[Application]:
+        """Yield a warm application for the bot, building it on first use."""
+        entry = await self._acquire(str(bot_uuid), bot_config)
+        try:
+            yield entry.application
+        finally:
+            entry.in_use -= 1
+            entry.last_used = monotonic()
+            if entry.evicted and not entry.in_use:
+                self._schedule_shutdown(entry)
+
+    def invalidate(self, bot_uuid: object) -> None:
+        """Drop the pooled application so the next update rebuilds it."""
+        entry = self._entries.pop(str(bot_uuid), None)
+        if entry is not None:
+            self._evict(entry)
+
+    async def close(self) -> None:
+        """Shut down every pooled application."""
+        while self._entries:
+            _, entry = self._entries.popitem(last=False)
+            self._evict(entry)
+        if self._closing:
+            await asyncio.gather(*self._closing, return_exceptions=True)
+
+    async def _acquire(self, key: str, bot_config: BotConfig) -> PoolEntry:
+        self._sweep_idle()
+
+        entry = self._entries.get(key)
+        if entry is not None and entry.token != bot_config._token:
+            logger.info(f'Bot {key} token changed, rebuilding its application.')
+            self.invalidate(key)
+            entry = None
+
+        if entry is None:
+            pending = self._pending.get(key)
+            if pending is None:
+                pending = asyncio.ensure_future(self._create(key, bot_config))
+                self._pending[key] = pending
+            try:
+                entry = await asyncio.shield(pending)
+            finally:
+                if pending.done() and self._pending.get(key) is pending:
+                    del self._pending[key]
+            if entry.evicted:
+                return await self._acquire(key, bot_config)
+
+        self._entries.move_to_end(key)
+        entry.in_use += 1
+        entry.application.bot_data['bot_config'] = bot_config
+        return entry
+
+    async def _create(self, key: str, bot_config: BotConfig) -> PoolEntry:
+        application = build_feedback_bot_application(bot_config)
+        await application.initialize()
+        entry = PoolEntry(application=application, token=bot_config._token, last_used=monotonic())
+        self._entries[key] = entry
+        while len(self._entries) > self.max_size:
+            _, oldest = self._entries.popitem(last=False)
+            self._evict(oldest)
+        return entry
+
+    def _sweep_idle(self) -> None:
+        if self.idle_timeout <= 0:
+            return
+        deadline = monotonic() - self.idle_timeout
+        while self._entries:
+            key, oldest = next(iter(self._entries.items()))
+            if oldest.in_use or oldest.last_used > deadline:
+                return
+            del self._entries[key]
+            self._evict(oldest)
+
+    def _evict(self, entry: PoolEntry) -> None:
+        entry.evicted = True
+        if not entry.in_use:
+            self._schedule_shutdown(entry)
+
+    def _schedule_shutdown(self, entry: PoolEntry) -> None:
+        task = asyncio.create_task(self._shutdown(entry))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _shutdown(self, entry: PoolEntry) -> None:
+        try:
+            await entry.application.shutdown()
+        except Exception as err:  # noqa: BLE001
+            logger.warning(f'Failed to shut down pooled application: {err}')
+
+
+@cache
+def get_application_pool() -> ApplicationPool:
+    return ApplicationPool(
+        max_size=settings.TELEGRAM_BOT_POOL_SIZE,
+        idle_timeout=settings.TELEGRAM_BOT_POOL_IDLE_TIMEOUT,
+    )
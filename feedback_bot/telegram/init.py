@@ -1,19 +1,113 @@
+import asyncio
 import fcntl
 import logging
 import os
 from contextlib import asynccontextmanager
+from itertools import chain
 from pathlib import Path
+from time import time
 
+import orjson
 from django.conf import settings
 from django_asgi_lifespan.types import LifespanManager
 from telegram import BotCommandScopeAllPrivateChats, Update
+from telegram.ext import Application
 
 from feedback_bot.telegram.builder.bot import get_ptb_application, load_builder_modules
 from feedback_bot.telegram.utils.cryptography import generate_bot_webhook_secret
+from feedback_bot.telegram.utils.handoff import UpdateHandoffClient, UpdateHandoffServer
+from feedback_bot.telegram.utils.http import close_shared_request
+from feedback_bot.telegram.utils.journal import BUILDER_JOURNAL_KEY, get_update_journal
 from feedback_bot.telegram.utils.restart import handle_restart
+from feedback_bot.telegram.utils.update_types import allowed_updates
+from feedback_bot.utils.flusher import get_flusher
 
 logger = logging.getLogger(__name__)
 LOCK_PATH = Path(os.getenv('PTB_WEBHOOK_LOCK', 'ptb-webhook.lock'))
+JOURNAL_PRUNE_INTERVAL = 3600
+
+
+async def close_feedback_runtime() -> None:
+    from feedback_bot.telegram.feedback_bot.albums import get_album_buffer  # noqa: PLC0415
+    from feedback_bot.telegram.feedback_bot.dispatcher import get_update_dispatcher  # noqa: PLC0415
+    from feedback_bot.telegram.feedback_bot.pool import get_application_pool  # noqa: PLC0415
+
+    await get_update_dispatcher().stop()
+    await get_album_buffer().close()
+    await get_flusher().stop()
+    await get_application_pool().close()
+    await close_shared_request()
+    if journal := get_update_journal():
+        journal.close()
+    logger.info('ASGI Lifespan: Feedback bots runtime closed.')
+
+
+def warn_about_per_worker_dedup() -> None:
+    """
+    Warn a worker that found others running that, without the update journal, each worker only
+    deduplicates the redeliveries it receives itself.
+    """
+    if get_update_journal() is None:
+        logger.warning(
+            'ASGI Lifespan: Several workers are running with TELEGRAM_UPDATE_JOURNAL_PATH empty, '
+            'so updates redelivered by Telegram to another worker are processed twice.'
+        )
+
+
+async def release_webhooks(ptb_application: Application) -> None:
+    """
+    Keep webhooks registered on shutdown, so Telegram holds updates until the next start,
+    unless `TELEGRAM_WEBHOOK_TEARDOWN_ON_SHUTDOWN` asks for them to be removed.
+    """
+    if not settings.TELEGRAM_WEBHOOK_TEARDOWN_ON_SHUTDOWN:
+        logger.info('ASGI Lifespan: Leaving webhooks registered for the next start.')
+        return
+
+    from feedback_bot.telegram.feedback_bot.bot import remove_bots_webhooks  # noqa: PLC0415
+
+    await remove_bots_webhooks()
+    await ptb_application.bot.delete_webhook()
+    logger.info('ASGI Lifespan: Main bot webhook removed.')
+
+
+async def maintain_update_journal(ptb_application: Application) -> None:
+    """
+    Reprocess journaled updates that were received before startup but never finished,
+    then keep pruning finished updates older than `TELEGRAM_UPDATE_JOURNAL_RETENTION`.
+
+    Replay waits `TELEGRAM_UPDATE_JOURNAL_REPLAY_DELAY` seconds first, so that workers still
+    running can finish the updates they are processing.
+    """
+    from feedback_bot.crud import get_bot_config  # noqa: PLC0415
+    from feedback_bot.telegram.feedback_bot.dispatcher import process_feedback_update  # noqa: PLC0415
+
+    journal = get_update_journal()
+    if journal is None:
+        return
+    started_at = time()
+    await asyncio.sleep(settings.TELEGRAM_UPDATE_JOURNAL_REPLAY_DELAY)
+    entries = await journal.unfinished(received_before=started_at)
+    for entry in entries:
+        try:
+            payload = orjson.loads(entry.payload)
+            if entry.bot_key == BUILDER_JOURNAL_KEY:
+                update = Update.de_json(data=payload, bot=ptb_application.bot)
+                await ptb_application.update_queue.put(update)
+            elif bot_config := await get_bot_config(entry.bot_key):
+                await process_feedback_update(entry.bot_key, bot_config, payload)
+            else:
+                await journal.mark_done(entry.bot_key, entry.update_id)
+        except Exception as err:  # noqa: BLE001
+            logger.error(f'Failed to replay update {entry.update_id} of {entry.bot_key}: {err}')
+    logger.info(f'ASGI Lifespan: Replayed {len(entries)} unfinished updates.')
+
+    while True:
+        try:
+            pruned = await journal.prune(time() - settings.TELEGRAM_UPDATE_JOURNAL_RETENTION)
+            logger.debug(f'Pruned {pruned} finished updates from the journal.')
+        except Exception as err:  # noqa: BLE001
+            logger.error(f'Failed to prune the update journal: {err}')
+        await asyncio.sleep(JOURNAL_PRUNE_INTERVAL)
 
 
 @asynccontextmanager
@@ -34,27 +128,49 @@ async def ptb_lifespan_manager() -> LifespanManager:  # noqa: PLR0915
         logger.warning('ASGI Lifespan: Failed to lock PTB startup: %s', exc)
         lock_acquired = False
 
+    from feedback_bot.telegram.feedback_bot.bot import get_feedback_bot_handlers  # noqa: PLC0415
+
+    feedback_handlers = get_feedback_bot_handlers()
+    get_flusher().start()
+    logger.info(
+        f'ASGI Lifespan: Feedback bot handler registry ready '
+        f'({len(feedback_handlers.handlers)} handlers).'
+    )
+
     if not lock_acquired:
+        warn_about_per_worker_dedup()
+        handoff_client = UpdateHandoffClient(Path(settings.TELEGRAM_BUILDER_HANDOFF_SOCKET))
         try:
-            yield {}
+            yield {'update_handoff': handoff_client}
         finally:
+            await handoff_client.close()
+            await close_feedback_runtime()
             if lock_fd is not None:
                 os.close(lock_fd)
         return
 
     ptb_application = get_ptb_application()
     state = {'ptb_application': ptb_application, 'lock_fd': lock_fd}
+    journal_task: asyncio.Task | None = None
+    webhooks_task: asyncio.Task | None = None
+    handoff_server = UpdateHandoffServer(
+        Path(settings.TELEGRAM_BUILDER_HANDOFF_SOCKET), ptb_application
+    )
 
     try:
         commands = load_builder_modules()
         async with ptb_application:
             await ptb_application.start()
+            await handoff_server.start()
+            logger.info('ASGI Lifespan: Accepting builder updates from other workers.')
             await ptb_application.bot.set_webhook(
                 url=f'{settings.TELEGRAM_BUILDER_BOT_WEBHOOK_URL}/api/webhook/{settings.TELEGRAM_BUILDER_BOT_WEBHOOK_PATH}',
                 secret_token=generate_bot_webhook_secret(
                     settings.TELEGRAM_BUILDER_BOT_WEBHOOK_PATH
                 ),
-                allowed_updates=Update.ALL_TYPES,
+                allowed_updates=allowed_updates(
+                    chain.from_iterable(ptb_application.handlers.values())
+                ),
             )
             logger.info('ASGI Lifespan: Main bot webhook is set.')
             await handle_restart(ptb_application)
@@ -64,16 +180,20 @@ async def ptb_lifespan_manager() -> LifespanManager:  # noqa: PLR0915
             logger.info('ASGI Lifespan: Setting up webhooks for bots...')
             from feedback_bot.telegram.feedback_bot.bot import setup_bots_webhooks  # noqa: PLC0415
 
-            await setup_bots_webhooks()
-            logger.info('ASGI Lifespan: PTB application started and all webhooks are set.')
+            # Bots keep receiving updates through their existing webhooks meanwhile
+            webhooks_task = asyncio.create_task(setup_bots_webhooks())
+            logger.info('ASGI Lifespan: PTB application started.')
+            journal_task = asyncio.create_task(maintain_update_journal(ptb_application))
             yield state
 
     finally:
-        from feedback_bot.telegram.feedback_bot.bot import remove_bots_webhooks  # noqa: PLC0415
+        for task in (journal_task, webhooks_task):
+            if task is not None:
+                task.cancel()
+        await handoff_server.close()
 
-        await remove_bots_webhooks()
-        await state['ptb_application'].bot.delete_webhook()
-        logger.info('ASGI Lifespan: Main bot webhook removed.')
+        await release_webhooks(state['ptb_application'])
+        await close_feedback_runtime()
         await state['ptb_application'].stop()
         await state['ptb_application'].shutdown()
         logger.info('ASGI Lifespan: PTB application stopped.')
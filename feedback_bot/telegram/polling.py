@@ -0,0 +1,287 @@
+"""
+Long polling for the builder bot and every enabled feedback bot, as an alternative to webhooks.
+
+One asyncio loop polls all bots, `TELEGRAM_POLLING_CONCURRENCY` getUpdates requests at a time.
+Updates go through the same processing as webhook updates, and the next offset of every bot is
+saved to `TELEGRAM_POLLING_OFFSETS_PATH`, so a restart continues where polling stopped.
+"""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable, Hashable, Sequence
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from time import monotonic
+from typing import Any
+
+import orjson
+from django.conf import settings
+from telegram import Bot, BotCommandScopeAllPrivateChats, Update
+from telegram.error import Conflict, Forbidden, InvalidToken, RetryAfter, TelegramError
+from telegram.ext import Application
+
+from feedback_bot.crud import get_bot_config, get_bots_keys
+from feedback_bot.models import Bot as BotConfig
+from feedback_bot.telegram.builder.bot import get_ptb_application, load_builder_modules
+from feedback_bot.telegram.feedback_bot.bot import get_feedback_allowed_updates
+from feedback_bot.telegram.feedback_bot.dispatcher import process_feedback_update
+from feedback_bot.telegram.utils.dedup import claim_update, release_update
+from feedback_bot.telegram.utils.http import build_bot
+from feedback_bot.telegram.utils.journal import BUILDER_JOURNAL_KEY
+from feedback_bot.telegram.utils.update_processor import payload_conversation_key
+from feedback_bot.telegram.utils.update_types import allowed_updates
+from feedback_bot.utils.flusher import get_flusher
+
+logger = logging.getLogger(__name__)
+
+MAX_BACKOFF = 60
+OFFSETS_SAVE_INTERVAL = 5
+BOTS_REFRESH_INTERVAL = 60
+
+type UpdatesHandler = Callable[[Sequence[Update]], Awaitable[None]]
+
+
+class OffsetStore:
+    """Next getUpdates offset of every bot, kept in a JSON object on disk."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self._offsets: dict[str, int] = {}
+        self._dirty = False
+        try:
+            self._offsets = {
+                key: int(offset) for key, offset in orjson.loads(path.read_bytes()).items()
+            }
+        except FileNotFoundError:
+            pass
+        except (ValueError, TypeError, AttributeError) as err:
+            logger.warning(f'Ignoring unreadable polling offsets in {path}: {err}')
+
+    def get(self, key: str) -> int | None:
+        return self._offsets.get(key)
+
+    def advance(self, key: str, offset: int) -> None:
+        if offset > self._offsets.get(key, 0):
+            self._offsets[key] = offset
+            self._dirty = True
+
+    def save(self) -> None:
+        """Write the offsets if they changed, replacing the file atomically."""
+        if not self._dirty:
+            return
+        temporary = self.path.with_name(f'{self.path.name}.tmp')
+        temporary.write_bytes(orjson.dumps(self._offsets))
+        temporary.replace(self.path)
+        self._dirty = False
+
+
+class PollingEngine:
+    """
+    Polls the builder bot and the enabled feedback bots until cancelled.
+
+    The long-poll timeout shrinks as more bots compete for the `concurrency` request slots, so
+    idle bots don't hold a slot for long, and bots whose requests fail back off exponentially.
+    Enabled bots are reloaded every `BOTS_REFRESH_INTERVAL` seconds.
+    """
+
+    def __init__(
+        self,
+        builder: Application | None,
+        offsets: OffsetStore,
+        *,
+        concurrency: int,
+        timeout: int,
+    ) -> None:
+        self.builder = builder
+        self.offsets = offsets
+        self.concurrency = max(concurrency, 1)
+        self.timeout = max(timeout, 1)
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._tasks: dict[tuple[str, str], asyncio.Task] = {}
+
+    @property
+    def poll_timeout(self) -> int:
+        pollers = max(sum(not task.done() for task in self._tasks.values()), 1)
+        return max(int(self.timeout * min(self.concurrency / pollers, 1)), 1)
+
+    async def run(self) -> None:
+        refreshed_at = None
+        try:
+            while True:
+                if refreshed_at is None or monotonic() - refreshed_at >= BOTS_REFRESH_INTERVAL:
+                    await self._refresh()
+                    refreshed_at = monotonic()
+                self.offsets.save()
+                await asyncio.sleep(OFFSETS_SAVE_INTERVAL)
+        finally:
+            await self.stop()
+
+    async def stop(self) -> None:
+        tasks = list(self._tasks.values())
+        self._tasks.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.offsets.save()
+
+    async def _refresh(self) -> None:
+        """
+        Start polling newly enabled bots and stop polling disabled ones.
+
+        Pollers that stopped, after an invalid token or an unexpected error, are started again.
+        """
+        for key, task in list(self._tasks.items()):
+            if task.done():
+                del self._tasks[key]
+                if not task.cancelled() and (err := task.exception()):
+                    logger.error(f'Polling of bot {key[0]} crashed: {err!r}')
+        if (
+            self.builder is not None
+            and (BUILDER_JOURNAL_KEY, self.builder.bot.token) not in self._tasks
+        ):
+            self._start(
+                BUILDER_JOURNAL_KEY,
+                self.builder.bot,
+                allowed_updates(chain.from_iterable(self.builder.handlers.values())),
+                self._handle_builder_updates,
+            )
+        try:
+            wanted = {(str(bot_uuid), bot_token) for bot_uuid, bot_token in await get_bots_keys()}
+        except Exception as err:  # noqa: BLE001
+            logger.error(f'Failed to load bots for polling: {err}')
+            return
+        for key in [key for key in self._tasks if key[0] != BUILDER_JOURNAL_KEY]:
+            if key not in wanted:
+                self._tasks.pop(key).cancel()
+        update_types = get_feedback_allowed_updates()
+        for bot_uuid, bot_token in wanted - self._tasks.keys():
+            self._start(
+                bot_uuid,
+                build_bot(bot_token),
+                update_types,
+                partial(self._handle_feedback_updates, bot_uuid),
+            )
+        logger.debug(f'Polling {len(self._tasks)} bots.')
+
+    def _start(self, key: str, bot: Bot, update_types: list[str], handle: UpdatesHandler) -> None:
+        self._tasks[key, bot.token] = asyncio.create_task(
+            self._poll(key, bot, update_types, handle), name=f'polling-{key}'
+        )
+
+    async def _poll(
+        self, key: str, bot: Bot, update_types: list[str], handle: UpdatesHandler
+    ) -> None:
+        backoff = 0
+        while True:
+            try:
+                async with self._slots:
+                    updates = await bot.get_updates(
+                        offset=self.offsets.get(key),
+                        timeout=self.poll_timeout,
+                        allowed_updates=update_types,
+                    )
+            except RetryAfter as err:
+                await asyncio.sleep(err.retry_after + 1)
+                continue
+            except (InvalidToken, Forbidden) as err:
+                logger.error(f'Stopped polling bot {key}: {err}')
+                return
+            except Conflict as err:
+                # Set while the bot was served through webhooks, or polled elsewhere
+                logger.warning(f'Polling conflict for bot {key}, removing its webhook: {err}')
+                try:
+                    await bot.delete_webhook()
+                except TelegramError as delete_err:
+                    logger.error(f'Failed to remove webhook for bot {key}: {delete_err}')
+            except TelegramError as err:
+                logger.warning(f'Failed to get updates for bot {key}: {err}')
+            else:
+                if await self._handle_batch(key, updates, handle):
+                    backoff = 0
+                    continue
+            backoff = min(max(backoff * 2, 1), MAX_BACKOFF)
+            await asyncio.sleep(backoff)
+
+    async def _handle_batch(
+        self, key: str, updates: Sequence[Update], handle: UpdatesHandler
+    ) -> bool:
+        """Handle polled updates and move past them; on failure the batch is polled again."""
+        if not updates:
+            return True
+        try:
+            await handle(updates)
+        except Exception:
+            logger.exception(f'Failed to handle polled updates for bot {key}')
+            return False
+        self.offsets.advance(key, updates[-1].update_id + 1)
+        return True
+
+    async def _handle_builder_updates(self, updates: Sequence[Update]) -> None:
+        for update in updates:
+            body = orjson.dumps(update.to_dict())
+            if await claim_update(BUILDER_JOURNAL_KEY, update.update_id, body):
+                await self.builder.update_queue.put(update)
+
+    async def _handle_feedback_updates(self, bot_uuid: str, updates: Sequence[Update]) -> None:
+        """
+        Process a batch like the webhook view would, one conversation at a time in order.
+
+        Updates are decoded again by the bot's pooled application, as webhook payloads are.
+        """
+        bot_config = await get_bot_config(bot_uuid)
+        if bot_config is None:
+            return
+        conversations: dict[Hashable, list[dict[str, Any]]] = {}
+        claimed: list[int] = []
+        try:
+            for update in updates:
+                payload = update.to_dict()
+                if await claim_update(bot_uuid, update.update_id, orjson.dumps(payload)):
+                    claimed.append(update.update_id)
+                    conversations.setdefault(payload_conversation_key(payload), []).append(payload)
+        except Exception:
+            # Nothing was processed yet, so the retried batch must not be skipped as redelivered
+            for update_id in claimed:
+                await release_update(bot_uuid, update_id)
+            raise
+        await asyncio.gather(
+            *(
+                self._process_conversation(bot_uuid, bot_config, payloads)
+                for payloads in conversations.values()
+            )
+        )
+
+    @staticmethod
+    async def _process_conversation(
+        bot_uuid: str, bot_config: BotConfig, payloads: list[dict[str, Any]]
+    ) -> None:
+        for payload in payloads:
+            try:
+                await process_feedback_update(bot_uuid, bot_config, payload)
+            except Exception:
+                logger.exception(f'Failed to process polled update for bot {bot_uuid}')
+
+
+async def run_polling(*, concurrency: int, timeout: int, builder: bool = True) -> None:
+    """Serve the builder bot and all enabled feedback bots through long polling until cancelled."""
+    from feedback_bot.telegram.init import close_feedback_runtime  # noqa: PLC0415
+
+    offsets = OffsetStore(Path(settings.TELEGRAM_POLLING_OFFSETS_PATH))
+    ptb_application = get_ptb_application() if builder else None
+    if ptb_application is not None:
+        commands = load_builder_modules()
+        await ptb_application.initialize()
+        await ptb_application.start()
+        await ptb_application.bot.set_my_commands(commands, scope=BotCommandScopeAllPrivateChats())
+
+    engine = PollingEngine(ptb_application, offsets, concurrency=concurrency, timeout=timeout)
+    get_flusher().start()
+    logger.info('Polling for updates...')
+    try:
+        await engine.run()
+    finally:
+        await close_feedback_runtime()
+        if ptb_application is not None:
+            await ptb_application.stop()
+            await ptb_application.shutdown()
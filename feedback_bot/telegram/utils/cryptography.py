@@ -62,3 +62,14 @@ def verify_bot_webhook_secret(bot_uuid: str, provided_secret: str) -> bool:
     """
     expected_secret = generate_bot_webhook_secret(bot_uuid)
     return hmac.compare_digest(expected_secret, provided_secret)
+
+
+def hash_bot_webhook_secret(secret: str) -> str:
+    """
+    Hash a webhook secret, to tell later whether the secret set on a webhook is still current.
+
+    :param secret: The secret passed to setWebhook
+
+    :return: Hex-encoded SHA-256 hash
+    """
+    return hashlib.sha256(secret.encode()).hexdigest()
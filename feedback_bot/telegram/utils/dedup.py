@@ -0,0 +1,61 @@
+"""
+Deduplication of webhook updates redelivered by Telegram.
+
+Claims are stored in the update journal, which is enabled by default and makes them visible to
+every worker process. With `TELEGRAM_UPDATE_JOURNAL_PATH` emptied, each worker remembers the
+updates it has seen recently, so a redelivery that reaches another worker is processed again;
+workers warn at startup when several of them run that way.
+"""
+
+import re
+from functools import cache
+
+from django.conf import settings
+
+from feedback_bot.telegram.utils.journal import get_update_journal
+from feedback_bot.utils.cache import TTLCache
+
+_UPDATE_ID_PATTERN = re.compile(rb'"update_id"\s*:\s*(\d+)')
+
+
+def peek_update_id(body: bytes) -> int | None:
+    """Find the update_id of a raw webhook body without decoding the JSON."""
+    match = _UPDATE_ID_PATTERN.search(body)
+    return int(match.group(1)) if match else None
+
+
+@cache
+def _seen_updates() -> TTLCache[tuple[str, int], bool]:
+    return TTLCache(
+        settings.TELEGRAM_UPDATE_DEDUP_CACHE_SIZE, settings.TELEGRAM_UPDATE_DEDUP_WINDOW
+    )
+
+
+async def claim_update(bot_key: str, update_id: int, body: bytes) -> bool:
+    """
+    Claim an update for processing; returns False if it was already received.
+
+    With the journal enabled, this also records the update for replay.
+    """
+    if journal := get_update_journal():
+        return await journal.record(bot_key, update_id, body)
+
+    seen = _seen_updates()
+    if (bot_key, update_id) in seen:
+        return False
+    seen.set((bot_key, update_id), True)
+    return True
+
+
+async def release_update(bot_key: str, update_id: int) -> None:
+    """Give up a claim on an update that failed, so Telegram's redelivery gets processed."""
+    if journal := get_update_journal():
+        await journal.forget(bot_key, update_id)
+        return
+    _seen_updates().pop((bot_key, update_id))
+
+
+async def finish_update(bot_key: str, update_id: int) -> None:
+    """Mark a claimed update as handled, even if it turned out to be invalid."""
+    if journal := get_update_journal():
+        await journal.mark_done(bot_key, update_id)
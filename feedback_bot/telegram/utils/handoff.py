@@ -0,0 +1,163 @@
+"""
+Hand-off of builder bot updates between Granian workers.
+
+Only the worker holding the PTB lock runs the builder application. It listens on a local Unix
+socket, and every other worker forwards the raw builder updates it receives there instead of
+processing them itself. Each frame is a header (body length, send timestamp) followed by the body,
+answered with a one-byte acknowledgement once the update is queued.
+"""
+
+import asyncio
+import contextlib
+import logging
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from time import perf_counter, time
+
+import orjson
+from telegram import Update
+from telegram.ext import Application
+
+logger = logging.getLogger(__name__)
+
+_HEADER = struct.Struct('!Id')
+_ACCEPTED = b'\x01'
+_REJECTED = b'\x00'
+STATS_LOG_INTERVAL = 1000
+
+
+class UpdateRejectedError(ValueError):
+    """The lock holder could not decode a handed-off update."""
+
+
+@dataclass(slots=True)
+class LatencyStats:
+    """Running count, mean and maximum of a latency, logged every `STATS_LOG_INTERVAL` samples."""
+
+    name: str
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def observe(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        if self.count % STATS_LOG_INTERVAL == 0:
+            logger.info(self.summary())
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def summary(self) -> str:
+        return (
+            f'{self.name}: {self.count} updates, '
+            f'mean {self.mean * 1000:.2f} ms, max {self.max * 1000:.2f} ms'
+        )
+
+
+class UpdateHandoffServer:
+    """Accepts builder updates from other workers and queues them on the builder application."""
+
+    def __init__(self, path: Path, application: Application) -> None:
+        self.path = path
+        self.application = application
+        self.stats = LatencyStats('Builder update hand-off latency')
+        self._server: asyncio.Server | None = None
+
+    async def start(self) -> None:
+        # A socket left behind by a previous lock holder would make binding fail
+        self.path.unlink(missing_ok=True)
+        self._server = await asyncio.start_unix_server(self._serve, path=self.path)
+
+    async def _serve(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                length, sent_at = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+                body = await reader.readexactly(length)
+                writer.write(await self._enqueue(body))
+                self.stats.observe(max(time() - sent_at, 0.0))
+                await writer.drain()
+        except asyncio.IncompleteReadError, ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _enqueue(self, body: bytes) -> bytes:
+        try:
+            update = Update.de_json(data=orjson.loads(body), bot=self.application.bot)
+        except (ValueError, TypeError, KeyError) as err:
+            logger.error(f'Rejected a handed-off builder update: {err}')
+            return _REJECTED
+        await self.application.update_queue.put(update)
+        return _ACCEPTED
+
+    async def close(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server.close_clients()
+            await self._server.wait_closed()
+            self._server = None
+        self.path.unlink(missing_ok=True)
+        if self.stats.count:
+            logger.info(self.stats.summary())
+
+
+class UpdateHandoffClient:
+    """
+    Forwards builder updates to the lock holder over one persistent connection per worker.
+
+    A reused connection that fails while sending is reopened once; any other failure raises
+    `OSError`, so the caller can let Telegram redeliver the update.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+        self.stats = LatencyStats('Builder update hand-off round trip')
+        self._lock = asyncio.Lock()
+        self._reader: asyncio.StreamReader | None = None
+        self._writer: asyncio.StreamWriter | None = None
+
+    async def forward(self, body: bytes) -> None:
+        started = perf_counter()
+        async with self._lock:
+            reused = self._writer is not None
+            try:
+                await self._send(body)
+            except OSError:
+                await self._disconnect()
+                if not reused:
+                    raise
+                await self._send(body)
+            try:
+                reply = await self._reader.readexactly(1)
+            except (asyncio.IncompleteReadError, OSError) as err:
+                await self._disconnect()
+                raise ConnectionError('Builder update hand-off was not acknowledged') from err
+        self.stats.observe(perf_counter() - started)
+        if reply != _ACCEPTED:
+            raise UpdateRejectedError('Builder update was rejected by the lock holder')
+
+    async def _send(self, body: bytes) -> None:
+        if self._writer is not None and (self._reader.at_eof() or self._writer.is_closing()):
+            # The lock holder went away since the last update
+            await self._disconnect()
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_unix_connection(self.path)
+        self._writer.write(_HEADER.pack(len(body), time()) + body)
+        await self._writer.drain()
+
+    async def _disconnect(self) -> None:
+        writer, self._reader, self._writer = self._writer, None, None
+        if writer is not None:
+            writer.close()
+            with contextlib.suppress(OSError):
+                await writer.wait_closed()
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._disconnect()
+        if self.stats.count:
+            logger.info(self.stats.summary())
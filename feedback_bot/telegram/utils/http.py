@@ -0,0 +1,65 @@
+"""Process-wide HTTP connection pool for feedback bot clients."""
+
+import logging
+from functools import cache
+
+import httpx
+from django.conf import settings
+from telegram import Bot
+from telegram.request import HTTPXRequest
+
+logger = logging.getLogger(__name__)
+
+
+class SharedHTTPXRequest(HTTPXRequest):
+    """
+    HTTPXRequest shared by many bots, so connections and TLS sessions are reused across tokens.
+
+    Shutting down a bot or application leaves the client open; it's closed by :meth:`close`.
+    """
+
+    __slots__ = ()
+
+    async def shutdown(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        await super().shutdown()
+
+
+@cache
+def get_shared_request() -> SharedHTTPXRequest:
+    kwargs = {
+        'connection_pool_size': settings.TELEGRAM_HTTP_POOL_SIZE,
+        'pool_timeout': settings.TELEGRAM_HTTP_POOL_TIMEOUT,
+        'httpx_kwargs': {
+            'limits': httpx.Limits(
+                max_connections=settings.TELEGRAM_HTTP_POOL_SIZE,
+                max_keepalive_connections=settings.TELEGRAM_HTTP_POOL_SIZE,
+                keepalive_expiry=settings.TELEGRAM_HTTP_KEEPALIVE_EXPIRY,
+            )
+        },
+    }
+    try:
+        return SharedHTTPXRequest(http_version=settings.TELEGRAM_HTTP_VERSION, **kwargs)
+    except RuntimeError as err:
+        # HTTP/2 needs the optional `h2` package
+        logger.warning(f'Falling back to HTTP/1.1 for Telegram requests: {err}')
+        return SharedHTTPXRequest(http_version='1.1', **kwargs)
+
+
+def build_bot(token: str) -> Bot:
+    """Create a `telegram.Bot` that sends its requests through the shared connection pool."""
+    request = get_shared_request()
+    return Bot(
+        token=token,
+        base_url=settings.TELEGRAM_BOT_API_URL,
+        request=request,
+        get_updates_request=request,
+    )
+
+
+async def close_shared_request() -> None:
+    if get_shared_request.cache_info().currsize:
+        await get_shared_request().close()
+        get_shared_request.cache_clear()
@@ -0,0 +1,227 @@
+"""
+Durable journal of received webhook updates.
+
+Webhook views record the raw update before processing it and mark it done afterwards, so updates
+that were acknowledged but never finished (a crashed worker, `/restart`) can be replayed on the
+next startup. The journal is a SQLite database in WAL mode shared by every worker process.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from collections.abc import Awaitable, Callable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from functools import cache, partial
+from pathlib import Path
+from time import time
+
+from django.conf import settings
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+BUILDER_JOURNAL_KEY = 'builder'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS updates (
+    bot_key TEXT NOT NULL,
+    update_id INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    received_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    done_at REAL,
+    PRIMARY KEY (bot_key, update_id)
+);
+CREATE INDEX IF NOT EXISTS updates_unfinished ON updates (received_at) WHERE done_at IS NULL;
+CREATE INDEX IF NOT EXISTS updates_done ON updates (done_at) WHERE done_at IS NOT NULL;
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class JournalEntry:
+    bot_key: str
+    update_id: int
+    payload: bytes
+
+
+@dataclass(slots=True)
+class ProcessingUpdate:
+    bot_key: str
+    update_id: int
+    deferred: bool = False
+
+
+_processing_update: ContextVar[ProcessingUpdate | None] = ContextVar(
+    'processing_update', default=None
+)
+
+
+class UpdateJournal:
+    """
+    Append-only record of updates keyed by `(bot_key, update_id)`.
+
+    `bot_key` is the feedback bot UUID, or :data:`BUILDER_JOURNAL_KEY` for the builder bot.
+    An unfinished update is considered abandoned `stale_after` seconds after it was received.
+    Queries run in a thread so the event loop never waits on disk I/O.
+    """
+
+    def __init__(self, path: Path, max_attempts: int = 3, stale_after: float = 60) -> None:
+        self.path = path
+        self.max_attempts = max(max_attempts, 1)
+        self.stale_after = stale_after
+        self._lock = threading.Lock()
+        self._connection: sqlite3.Connection | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._connection is None:
+            connection = sqlite3.connect(
+                self.path, timeout=5, isolation_level=None, check_same_thread=False
+            )
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            connection.executescript(_SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def _execute(self, query: str, parameters: tuple = ()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._connect().execute(query, parameters)
+
+    async def record(self, bot_key: str, update_id: int, payload: bytes) -> bool:
+        """
+        Store a received update and claim it for processing.
+
+        Returns False for a redelivered update that is already done or still being processed.
+        An abandoned unfinished update is claimed again, counting as another attempt.
+        """
+        now = time()
+        cursor = await asyncio.to_thread(
+            self._execute,
+            'INSERT INTO updates (bot_key, update_id, payload, received_at) VALUES (?, ?, ?, ?) '
+            'ON CONFLICT (bot_key, update_id) DO UPDATE '
+            'SET received_at = excluded.received_at, attempts = attempts + 1 '
+            'WHERE done_at IS NULL AND received_at < ?',
+            (bot_key, update_id, payload, now, now - self.stale_after),
+        )
+        return cursor.rowcount == 1
+
+    async def forget(self, bot_key: str, update_id: int) -> None:
+        """Drop an unfinished update so that its redelivery is processed again."""
+        await asyncio.to_thread(
+            self._execute,
+            'DELETE FROM updates WHERE bot_key = ? AND update_id = ? AND done_at IS NULL',
+            (bot_key, update_id),
+        )
+
+    async def mark_done(self, bot_key: str, update_id: int) -> None:
+        await asyncio.to_thread(
+            self._execute,
+            'UPDATE updates SET done_at = ? WHERE bot_key = ? AND update_id = ? AND done_at IS NULL',
+            (time(), bot_key, update_id),
+        )
+
+    async def unfinished(self, received_before: float) -> list[JournalEntry]:
+        """
+        Claim unfinished updates received before `received_before` for another attempt.
+
+        An update is marked done when claimed for the `max_attempts`-th time, so an update that
+        keeps crashing the process is not replayed forever.
+        """
+
+        def claim() -> list[JournalEntry]:
+            with self._lock:
+                connection = self._connect()
+                connection.execute('BEGIN IMMEDIATE')
+                try:
+                    rows = connection.execute(
+                        'SELECT bot_key, update_id, payload, attempts FROM updates '
+                        'WHERE done_at IS NULL AND received_at < ? ORDER BY received_at',
+                        (received_before,),
+                    ).fetchall()
+                    connection.executemany(
+                        'UPDATE updates SET attempts = attempts + 1, done_at = ? '
+                        'WHERE bot_key = ? AND update_id = ?',
+                        [
+                            (time() if attempts + 1 >= self.max_attempts else None, key, update_id)
+                            for key, update_id, _, attempts in rows
+                        ],
+                    )
+                    connection.execute('COMMIT')
+                except BaseException:
+                    connection.execute('ROLLBACK')
+                    raise
+            for key, update_id, _, attempts in rows:
+                if attempts + 1 >= self.max_attempts:
+                    logger.warning(f'Last replay attempt for update {update_id} of {key}.')
+            return [
+                JournalEntry(key, update_id, bytes(payload))
+                for key, update_id, payload, attempts in rows
+                if attempts < self.max_attempts
+            ]
+
+        return await asyncio.to_thread(claim)
+
+    async def prune(self, done_before: float) -> int:
+        """Delete finished updates older than `done_before`; returns how many were removed."""
+        cursor = await asyncio.to_thread(
+            self._execute, 'DELETE FROM updates WHERE done_at < ?', (done_before,)
+        )
+        return cursor.rowcount
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+@cache
+def get_update_journal() -> UpdateJournal | None:
+    """Return the process-wide journal, or None when `TELEGRAM_UPDATE_JOURNAL_PATH` is empty."""
+    if not settings.TELEGRAM_UPDATE_JOURNAL_PATH:
+        return None
+    return UpdateJournal(
+        Path(settings.TELEGRAM_UPDATE_JOURNAL_PATH),
+        max_attempts=settings.TELEGRAM_UPDATE_JOURNAL_MAX_ATTEMPTS,
+        stale_after=settings.TELEGRAM_UPDATE_JOURNAL_REPLAY_DELAY,
+    )
+
+
+@contextmanager
+def processing_update(bot_key: str, update_id: int) -> Iterator[ProcessingUpdate]:
+    """
+    Track the journaled update processed in the current context.
+
+    The yielded object's `deferred` flag tells whether a handler took over marking it done.
+    """
+    update = ProcessingUpdate(bot_key, update_id)
+    token = _processing_update.set(update)
+    try:
+        yield update
+    finally:
+        _processing_update.reset(token)
+
+
+def defer_update_done() -> Callable[[], Awaitable[None]] | None:
+    """
+    Keep the update being processed unfinished after its handlers return.
+
+    For handlers that leave part of the update to a background task: the returned callable marks
+    the update done and must be awaited once that work is over, so a crash in between replays the
+    update. Returns None when the journal is disabled or no journaled update is being processed.
+    """
+    update = _processing_update.get()
+    journal = get_update_journal()
+    if update is None or journal is None:
+        return None
+    update.deferred = True
+    return partial(journal.mark_done, update.bot_key, update.update_id)
+
+
+async def mark_builder_update_done(update: object) -> None:
+    """Mark a processed builder bot update done; used as the builder's `on_processed` hook."""
+    if isinstance(update, Update) and (journal := get_update_journal()):
+        await journal.mark_done(BUILDER_JOURNAL_KEY, update.update_id)
@@ -0,0 +1,98 @@
+"""Update processing that keeps each conversation ordered while others run in parallel."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+
+def conversation_key(update: object) -> Hashable | None:
+    """
+    Key of the conversation an update belongs to.
+
+    Forum topic messages are keyed by (chat, topic) so owners replying in different topics don't
+    wait on each other; everything else is keyed by chat, falling back to the sender.
+    """
+    if not isinstance(update, Update):
+        return None
+    if (message := update.effective_message) and message.is_topic_message:
+        return message.chat_id, message.message_thread_id
+    if chat := update.effective_chat:
+        return chat.id
+    if user := update.effective_user:
+        return user.id
+    return None
+
+
+def payload_conversation_key(payload: dict[str, Any]) -> Hashable | None:
+    """Cheap approximation of :func:`conversation_key` for a raw, undecoded update payload."""
+    for key, value in payload.items():
+        if key == 'update_id' or not isinstance(value, dict):
+            continue
+        message = value.get('message') if isinstance(value.get('message'), dict) else value
+        chat = message.get('chat')
+        if isinstance(chat, dict) and 'id' in chat:
+            if message.get('is_topic_message'):
+                return chat['id'], message.get('message_thread_id')
+            return chat['id']
+        for sender_key in ('from', 'user'):
+            sender = value.get(sender_key)
+            if isinstance(sender, dict) and 'id' in sender:
+                return sender['id']
+        return None
+    return None
+
+
+class ConversationUpdateProcessor(BaseUpdateProcessor):
+    """
+    Processes updates concurrently, but one at a time per conversation.
+
+    Updates of the same conversation wait on a shared lock in arrival order, so a user's messages
+    are never reordered or handled in parallel, while different conversations don't block each other.
+    `on_processed` is awaited after each update, whether or not its handlers succeeded.
+    """
+
+    __slots__ = ('_locks', '_on_processed', '_waiters')
+
+    def __init__(
+        self,
+        max_concurrent_updates: int,
+        on_processed: Callable[[object], Awaitable[None]] | None = None,
+    ) -> None:
+        super().__init__(max(max_concurrent_updates, 1))
+        self._locks: dict[Hashable, asyncio.Lock] = {}
+        self._waiters: dict[Hashable, int] = {}
+        self._on_processed = on_processed
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]) -> None:
+        try:
+            await self._process_in_order(update, coroutine)
+        finally:
+            if self._on_processed is not None:
+                await self._on_processed(update)
+
+    async def _process_in_order(self, update: object, coroutine: Awaitable[Any]) -> None:
+        key = conversation_key(update)
+        if key is None:
+            await coroutine
+            return
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                await coroutine
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+    async def initialize(self) -> None:
+        pass
+
+    async def shutdown(self) -> None:
+        self._locks.clear()
+        self._waiters.clear()
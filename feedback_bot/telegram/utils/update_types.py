@@ -0,0 +1,140 @@
+"""Which update types registered handlers can consume"""
+
+import re
+from collections.abc import Iterable
+
+from telegram import Update
+from telegram.constants import UpdateType
+from telegram.ext import (
+    BaseHandler,
+    BusinessConnectionHandler,
+    BusinessMessagesDeletedHandler,
+    CallbackQueryHandler,
+    ChatBoostHandler,
+    ChatJoinRequestHandler,
+    ChatMemberHandler,
+    ChosenInlineResultHandler,
+    CommandHandler,
+    ConversationHandler,
+    InlineQueryHandler,
+    MessageHandler,
+    MessageReactionHandler,
+    PaidMediaPurchasedHandler,
+    PollAnswerHandler,
+    PollHandler,
+    PreCheckoutQueryHandler,
+    PrefixHandler,
+    ShippingQueryHandler,
+)
+
+# Updates carrying an `effective_message` that message filters can see
+MESSAGE_UPDATE_TYPES = frozenset(
+    {
+        UpdateType.MESSAGE,
+        UpdateType.EDITED_MESSAGE,
+        UpdateType.CHANNEL_POST,
+        UpdateType.EDITED_CHANNEL_POST,
+        UpdateType.BUSINESS_MESSAGE,
+        UpdateType.EDITED_BUSINESS_MESSAGE,
+    }
+)
+
+_SINGLE_TYPE_HANDLERS: dict[type[BaseHandler], str] = {
+    BusinessConnectionHandler: UpdateType.BUSINESS_CONNECTION,
+    BusinessMessagesDeletedHandler: UpdateType.DELETED_BUSINESS_MESSAGES,
+    CallbackQueryHandler: UpdateType.CALLBACK_QUERY,
+    ChatJoinRequestHandler: UpdateType.CHAT_JOIN_REQUEST,
+    ChosenInlineResultHandler: UpdateType.CHOSEN_INLINE_RESULT,
+    InlineQueryHandler: UpdateType.INLINE_QUERY,
+    PaidMediaPurchasedHandler: UpdateType.PURCHASED_PAID_MEDIA,
+    PollAnswerHandler: UpdateType.POLL_ANSWER,
+    PollHandler: UpdateType.POLL,
+    PreCheckoutQueryHandler: UpdateType.PRE_CHECKOUT_QUERY,
+    ShippingQueryHandler: UpdateType.SHIPPING_QUERY,
+}
+
+# Handlers selecting one or both of two update types through an attribute; any attribute value
+# missing from the mapping selects both
+_PAIRED_TYPE_HANDLERS: dict[type[BaseHandler], tuple[str, dict[int, str]]] = {
+    ChatBoostHandler: (
+        'chat_boost_types',
+        {
+            ChatBoostHandler.CHAT_BOOST: UpdateType.CHAT_BOOST,
+            ChatBoostHandler.REMOVED_CHAT_BOOST: UpdateType.REMOVED_CHAT_BOOST,
+        },
+    ),
+    ChatMemberHandler: (
+        'chat_member_types',
+        {
+            ChatMemberHandler.MY_CHAT_MEMBER: UpdateType.MY_CHAT_MEMBER,
+            ChatMemberHandler.CHAT_MEMBER: UpdateType.CHAT_MEMBER,
+        },
+    ),
+    MessageReactionHandler: (
+        'message_reaction_types',
+        {
+            MessageReactionHandler.MESSAGE_REACTION_UPDATED: UpdateType.MESSAGE_REACTION,
+            MessageReactionHandler.MESSAGE_REACTION_COUNT_UPDATED: (
+                UpdateType.MESSAGE_REACTION_COUNT
+            ),
+        },
+    ),
+}
+
+_UPDATE_TYPE_PATTERN = re.compile(rb'^\s*\{\s*"update_id"\s*:\s*\d+\s*,\s*"(\w+)"')
+
+
+def handler_update_types(handler: object) -> frozenset[str] | None:
+    """
+    Update types `handler` may handle, or None when it can't be determined.
+
+    The result is an upper bound: filters are not inspected, so a MessageHandler counts for every
+    kind of message update.
+    """
+    if isinstance(handler, MessageHandler | CommandHandler | PrefixHandler):
+        return MESSAGE_UPDATE_TYPES
+    if isinstance(handler, ConversationHandler):
+        return handlers_update_types(
+            [
+                *handler.entry_points,
+                *(nested for handlers in handler.states.values() for nested in handlers),
+                *handler.fallbacks,
+            ]
+        )
+    for handler_class, (attribute, choices) in _PAIRED_TYPE_HANDLERS.items():
+        if isinstance(handler, handler_class):
+            selected = choices.get(getattr(handler, attribute))
+            return frozenset({selected} if selected else choices.values())
+    for handler_class, update_type in _SINGLE_TYPE_HANDLERS.items():
+        if isinstance(handler, handler_class):
+            return frozenset({update_type})
+    return None
+
+
+def handlers_update_types(handlers: Iterable[object]) -> frozenset[str] | None:
+    """Union of :func:`handler_update_types`; None if any handler accepts unknown types."""
+    update_types: set[str] = set()
+    for handler in handlers:
+        handler_types = handler_update_types(handler)
+        if handler_types is None:
+            return None
+        update_types |= handler_types
+    return frozenset(update_types)
+
+
+def allowed_updates(handlers: Iterable[object]) -> list[str]:
+    """Value for `allowed_updates` when setting a webhook, falling back to every update type."""
+    update_types = handlers_update_types(handlers)
+    if update_types is None:
+        return Update.ALL_TYPES
+    return sorted(str(update_type) for update_type in update_types)
+
+
+def peek_update_type(body: bytes) -> str | None:
+    """
+    Read the update type of a raw webhook body without decoding the JSON.
+
+    Relies on Telegram sending `update_id` first; returns None for any other layout.
+    """
+    match = _UPDATE_TYPE_PATTERN.match(body)
+    return match.group(1).decode() if match else None
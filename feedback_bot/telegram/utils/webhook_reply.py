@@ -0,0 +1,58 @@
+"""
+Returning a handler's final Bot API call as the webhook response body.
+
+Telegram executes a method sent back in the body of a webhook response, which saves one outbound
+request per update. Telegram doesn't report the result, so only calls whose result is not needed
+should be deferred, and only as the last call of a handler.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any
+
+_webhook_reply: ContextVar[dict[str, Any] | None] = ContextVar('webhook_reply', default=None)
+
+
+@contextmanager
+def capture_webhook_reply() -> Iterator[dict[str, Any]]:
+    """
+    Collect the method call deferred while processing an update in the current context.
+
+    The yielded dict stays empty when nothing was deferred.
+    """
+    reply: dict[str, Any] = {}
+    token = _webhook_reply.set(reply)
+    try:
+        yield reply
+    finally:
+        _webhook_reply.reset(token)
+
+
+@contextmanager
+def without_webhook_reply() -> Iterator[None]:
+    """
+    Make calls in the current context ignore the webhook response being captured, if any.
+
+    For work that outlives the handler, like a background task or a task started from it, since
+    the response may be returned before that work defers its call.
+    """
+    token = _webhook_reply.set(None)
+    try:
+        yield
+    finally:
+        _webhook_reply.reset(token)
+
+
+def defer_to_webhook_response(method: str, **params: Any) -> bool:
+    """
+    Defer a Bot API call to the webhook response of the update being processed.
+
+    Returns False when the update isn't answered through a webhook response or another call was
+    already deferred, in which case the caller must make the request itself.
+    """
+    reply = _webhook_reply.get()
+    if reply is None or reply:
+        return False
+    reply.update(params, method=method)
+    return True
@@ -0,0 +1,91 @@
+"""Small in-process caches for hot paths"""
+
+from collections import OrderedDict
+from collections.abc import Callable, Collection, Hashable, Iterator
+from hashlib import blake2b
+from math import log
+from time import monotonic
+
+
+class TTLCache[K: Hashable, V]:
+    """
+    Bounded LRU mapping whose entries expire ``ttl`` seconds after they were stored.
+
+    A ``maxsize`` of 0 disables the cache and a ``ttl`` of 0 keeps entries until evicted.
+    """
+
+    def __init__(self, maxsize: int, ttl: float = 0) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: OrderedDict[K, tuple[float, V]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __contains__(self, key: object) -> bool:
+        return self.get(key) is not None  # type: ignore[arg-type]
+
+    def get(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at and expires_at <= monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: K, value: V) -> None:
+        if self.maxsize <= 0:
+            return
+        expires_at = monotonic() + self.ttl if self.ttl > 0 else 0.0
+        self._data[key] = (expires_at, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: K, default: V | None = None) -> V | None:
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def pop_where(self, predicate: Callable[[K, V], bool]) -> int:
+        """Drop every entry matching ``predicate`` and return how many were removed."""
+        keys = [key for key, (_, value) in self._data.items() if predicate(key, value)]
+        for key in keys:
+            del self._data[key]
+        return len(keys)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class BloomFilter:
+    """
+    Compact membership test for a fixed collection of 64-bit integers.
+
+    Lookups never miss a member, but report a non-member as present with a probability of about
+    ``false_positive_rate``, so hits must be confirmed against the source of truth.
+    """
+
+    __slots__ = ('_bits', '_hashes', '_size')
+
+    def __init__(self, items: Collection[int], false_positive_rate: float = 0.01) -> None:
+        count = max(len(items), 1)
+        self._size = max(int(-count * log(false_positive_rate) / log(2) ** 2), 64)
+        self._hashes = max(round(self._size / count * log(2)), 1)
+        self._bits = bytearray((self._size + 7) // 8)
+        for item in items:
+            for position in self._positions(item):
+                self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: int) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item)
+        )
+
+    def _positions(self, item: int) -> Iterator[int]:
+        digest = blake2b(item.to_bytes(8, 'big', signed=True), digest_size=16).digest()
+        first = int.from_bytes(digest[:8])
+        second = int.from_bytes(digest[8:]) | 1
+        return ((first + index * second) % self._size for index in range(self._hashes))
@@ -0,0 +1,67 @@
+"""Periodic flushing of write-behind buffers kept in process memory."""
+
+import asyncio
+import logging
+from collections.abc import Awaitable, Callable
+from contextlib import suppress
+from functools import cache
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+type FlushCallback = Callable[[], Awaitable[None]]
+
+
+class PeriodicFlusher:
+    """
+    Awaits every registered callback each `interval` seconds, and once more when stopped.
+
+    Buffers check :attr:`running` and write through directly while no flusher loop is running,
+    e.g. in management commands and tests.
+    """
+
+    def __init__(self, interval: float) -> None:
+        self.interval = max(interval, 0.1)
+        self._callbacks: list[FlushCallback] = []
+        self._task: asyncio.Task | None = None
+        self._stopping = asyncio.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def register(self, callback: FlushCallback) -> None:
+        self._callbacks.append(callback)
+
+    def start(self) -> None:
+        if not self.running:
+            self._stopping.clear()
+            self._task = asyncio.create_task(self._run(), name='periodic-flusher')
+
+    async def flush(self) -> None:
+        for callback in self._callbacks:
+            try:
+                await callback()
+            except Exception:
+                logger.exception(f'Failed to flush {callback.__qualname__}')
+
+    async def stop(self) -> None:
+        """Stop the loop once its current flush is done, then flush what is still buffered."""
+        if self._task is not None:
+            self._stopping.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        # Flushes are never cancelled halfway, so a buffer can't lose track of a write
+        while not self._stopping.is_set():
+            with suppress(TimeoutError):
+                await asyncio.wait_for(self._stopping.wait(), self.interval)
+            await self.flush()
+
+
+@cache
+def get_flusher() -> PeriodicFlusher:
+    return PeriodicFlusher(settings.TELEGRAM_FLUSH_INTERVAL)
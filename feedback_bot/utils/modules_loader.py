@@ -1,13 +1,17 @@
 """Bot modules dynamic loader"""
 
 import logging
-from collections.abc import Iterator
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
 from importlib import import_module
 from pathlib import Path
 from pkgutil import ModuleInfo, iter_modules
+from time import perf_counter
 from types import ModuleType
+from typing import Any
 
 from django.conf import settings
+from telegram.ext import Application
 
 logger = logging.getLogger(__name__)
 
@@ -23,13 +27,49 @@ def get_modules(modules_path: Path) -> Iterator[ModuleInfo]:
     return iter_modules([modules_path], prefix=prefix)
 
 
-def load_modules(modules: Iterator[ModuleInfo]) -> list[ModuleType]:
-    """Load all modules in modules list"""
+def load_modules(modules: Iterable[ModuleInfo]) -> list[ModuleType]:
+    """Load all modules in modules list, logging how long each import took"""
     loaded_modules = []
+    started = perf_counter()
     for module_info in modules:
         module_name = module_info.name
+        import_started = perf_counter()
         loaded_module = import_module(module_name)
         loaded_modules.append(loaded_module)
-        logger.info(f'Loaded module: {module_name.split(".")[-1]}')
-    logger.info(f'Total loaded modules: {len(loaded_modules)}')
+        logger.info(
+            f'Loaded module: {module_name.split(".")[-1]} '
+            f'({(perf_counter() - import_started) * 1000:.1f} ms)'
+        )
+    logger.info(
+        f'Total loaded modules: {len(loaded_modules)} ({(perf_counter() - started) * 1000:.1f} ms)'
+    )
     return loaded_modules
+
+
+@dataclass(frozen=True, slots=True)
+class HandlerRegistry:
+    """
+    Handlers declared in the `HANDLERS` lists of bot modules, collected once per process.
+
+    Entries are `(handler, group)` pairs; `group` is None for handlers added to the default group.
+    """
+
+    handlers: tuple[tuple[Any, int | None], ...]
+
+    @classmethod
+    def from_modules(cls, modules: Iterable[ModuleType]) -> HandlerRegistry:
+        handlers: list[tuple[Any, int | None]] = []
+        for module in modules:
+            for handler_spec in getattr(module, 'HANDLERS', ()):
+                handlers.append(
+                    handler_spec if isinstance(handler_spec, tuple) else (handler_spec, None)
+                )
+        return cls(tuple(handlers))
+
+    def register(self, application: Application) -> None:
+        """Add every handler to `application`, in declaration order."""
+        for handler, group in self.handlers:
+            if group is None:
+                application.add_handler(handler)
+            else:
+                application.add_handler(handler, group)
@@ -0,0 +1,41 @@
+"""Deduplication of concurrent async calls."""
+
+import asyncio
+from collections.abc import Awaitable, Callable, Hashable
+
+
+class SingleFlight[K: Hashable, V]:
+    """
+    Runs at most one call per key at a time.
+
+    Callers arriving while the call for their key is in flight await its result, or its
+    exception, instead of making their own call. The next caller after it finished starts anew.
+    """
+
+    def __init__(self) -> None:
+        self._calls: dict[K, asyncio.Future[V]] = {}
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._calls
+
+    async def run(self, key: K, call: Callable[[], Awaitable[V]]) -> V:
+        if (future := self._calls.get(key)) is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        # Consume the exception, so it isn't reported as never retrieved when no one else waited
+        future.add_done_callback(lambda done: done.cancelled() or done.exception())
+        self._calls[key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as err:
+            future.set_exception(err)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
@@ -5,8 +5,8 @@ from uuid import UUID, uuid4
 
 import pytest
 from feedback_bot import crud
+from feedback_bot.telegram.feedback_bot.bot import get_feedback_allowed_updates
 from feedback_bot.telegram.utils.cryptography import generate_bot_webhook_secret
-from telegram import Update
 
 BOT_TOKEN = '12345678:abcdefghijklmnopqrstuvwxyzABCD12345'  # noqa: S105
 NEW_BOT_TOKEN = '23456789:bcdefghijklmnopqrstuvwxyzABCDE12345'  # noqa: S105
@@ -152,18 +152,21 @@ async def test_list_and_update_bot(miniapp_client, monkeypatch):
     update_response = await client.put(
         f'/bot/{uuid_str}/',
         headers=headers,
-        json={'start_message': 'updated text', 'use_topics': True},
+        json={'start_message': 'updated text', 'use_topics': True, 'retention_days': 30},
     )
 
     assert update_response.status_code == 200
     updated_payload = update_response.json()
     assert updated_payload['start_message'] == 'updated text'
     assert updated_payload['use_topics'] is True
+    assert updated_payload['retention_days'] == 30
+    assert updated_payload['retention_max_mappings'] is None
 
     updated = await crud.get_bot(UUID(uuid_str), auth_state['user']['id'])
     assert updated is not None
     assert updated.start_message == 'updated text'
     assert updated.use_topics is True
+    assert updated.retention_days == 30
 
 
 @pytest.mark.api
@@ -417,7 +420,7 @@ async def test_update_bot_token_rotates_successfully(miniapp_client, monkeypatch
         assert self.token == NEW_BOT_TOKEN
         assert url == f'https://builder.example/api/webhook/{bot.uuid}/'
         assert secret_token == generate_bot_webhook_secret(str(bot.uuid))
-        assert allowed_updates == Update.ALL_TYPES
+        assert allowed_updates == get_feedback_allowed_updates()
 
     monkeypatch.setattr(
         'feedback_bot.api.miniapp.bots.validate_bot_token',
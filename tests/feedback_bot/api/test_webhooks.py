@@ -0,0 +1,240 @@
+"""API tests for the Telegram webhook endpoints."""
+
+import os
+from types import SimpleNamespace
+from unittest.mock import AsyncMock
+
+import pytest
+from config.urls import api
+from django.conf import settings as django_settings
+from feedback_bot.api import webhooks as webhooks_module
+from feedback_bot.telegram.utils import dedup as dedup_module
+from feedback_bot.telegram.utils import journal as journal_module
+from feedback_bot.telegram.utils.cryptography import generate_bot_webhook_secret
+from feedback_bot.telegram.utils.handoff import UpdateRejectedError
+from feedback_bot.telegram.utils.webhook_reply import defer_to_webhook_response
+from ninja.testing import TestAsyncClient
+
+BOT_UUID = '0b9d6f6e-3c1a-4f7e-9a41-5d2b8c7e1f00'
+BOT_PATH = f'/webhook/{BOT_UUID}/'
+BUILDER_PATH = f'/webhook/{django_settings.TELEGRAM_BUILDER_BOT_WEBHOOK_PATH}'
+
+
+def _message_update(update_id: int) -> dict:
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': 10,
+            'date': 1735689600,
+            'chat': {'id': 999, 'type': 'private', 'first_name': 'User'},
+            'from': {'id': 999, 'is_bot': False, 'first_name': 'User'},
+            'text': 'hello',
+        },
+    }
+
+
+@pytest.fixture
+def webhook_client(monkeypatch, settings):
+    settings.DEBUG = False
+    settings.TELEGRAM_UPDATE_JOURNAL_PATH = ''
+    settings.TELEGRAM_WEBHOOK_FAST_ACK = False
+    settings.TELEGRAM_WEBHOOK_REPLY_IN_RESPONSE = False
+    os.environ.setdefault('NINJA_SKIP_REGISTRY', '1')
+    journal_module.get_update_journal.cache_clear()
+    dedup_module._seen_updates.cache_clear()
+
+    bot_config = SimpleNamespace(pk=1)
+    process = AsyncMock()
+
+    async def fake_get_bot_config(bot_uuid):
+        return bot_config if bot_uuid == BOT_UUID else None
+
+    monkeypatch.setattr(webhooks_module, 'get_bot_config', fake_get_bot_config)
+    monkeypatch.setattr(webhooks_module, 'process_feedback_update', process)
+
+    headers = {'X-Telegram-Bot-Api-Secret-Token': generate_bot_webhook_secret(BOT_UUID)}
+    yield TestAsyncClient(api), headers, process
+    dedup_module._seen_updates.cache_clear()
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_feedback_webhook_processes_update(webhook_client):
+    client, headers, process = webhook_client
+
+    response = await client.post(BOT_PATH, headers=headers, json=_message_update(1))
+
+    assert response.status_code == 200
+    assert response.content == b'OK'
+    process.assert_awaited_once()
+    assert process.await_args.args[0] == BOT_UUID
+    assert process.await_args.args[2]['update_id'] == 1
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_feedback_webhook_skips_redelivered_update(webhook_client):
+    client, headers, process = webhook_client
+
+    await client.post(BOT_PATH, headers=headers, json=_message_update(1))
+    response = await client.post(BOT_PATH, headers=headers, json=_message_update(1))
+
+    assert response.status_code == 200
+    process.assert_awaited_once()
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_feedback_webhook_finishes_update_that_fails_to_parse(webhook_client):
+    client, headers, process = webhook_client
+    process.side_effect = ValueError('bad update')
+
+    response = await client.post(BOT_PATH, headers=headers, json=_message_update(2))
+
+    assert response.status_code == 400
+    # The claim is kept, so Telegram's redelivery of the invalid update is not processed again
+    response = await client.post(BOT_PATH, headers=headers, json=_message_update(2))
+    assert response.status_code == 200
+    process.assert_awaited_once()
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_feedback_webhook_releases_update_on_unexpected_error(webhook_client):
+    client, headers, process = webhook_client
+    process.side_effect = [RuntimeError('database is locked'), None]
+
+    response = await client.post(BOT_PATH, headers=headers, json=_message_update(3))
+    assert response.status_code == 500
+
+    # The claim was released, so Telegram's redelivery is processed
+    response = await client.post(BOT_PATH, headers=headers, json=_message_update(3))
+    assert response.status_code == 200
+    assert process.await_count == 2
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_feedback_webhook_acknowledges_unhandled_update_types(webhook_client, monkeypatch):
+    client, headers, process = webhook_client
+    get_bot_config = AsyncMock()
+    monkeypatch.setattr(webhooks_module, 'get_bot_config', get_bot_config)
+    monkeypatch.setattr(
+        webhooks_module, 'get_feedback_update_types', lambda: frozenset({'message'})
+    )
+
+    response = await client.post(
+        BOT_PATH,
+        headers=headers,
+        json={'update_id': 4, 'poll': {'id': '1', 'question': 'Why?', 'options': []}},
+    )
+
+    assert response.status_code == 200
+    get_bot_config.assert_not_awaited()
+    process.assert_not_awaited()
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_feedback_webhook_processes_inline_when_queue_is_full(
+    webhook_client, monkeypatch, settings
+):
+    client, headers, process = webhook_client
+    settings.TELEGRAM_WEBHOOK_FAST_ACK = True
+    dispatcher = SimpleNamespace(submit=lambda bot_uuid, bot_config, payload: False)
+    monkeypatch.setattr(webhooks_module, 'get_update_dispatcher', lambda: dispatcher)
+
+    response = await client.post(BOT_PATH, headers=headers, json=_message_update(5))
+
+    assert response.status_code == 200
+    process.assert_awaited_once()
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_feedback_webhook_returns_captured_reply(webhook_client, settings):
+    client, headers, process = webhook_client
+    settings.TELEGRAM_WEBHOOK_REPLY_IN_RESPONSE = True
+
+    async def defer_reply(bot_uuid, bot_config, payload):
+        assert defer_to_webhook_response('sendMessage', chat_id=999, text='Thanks')
+
+    process.side_effect = defer_reply
+
+    response = await client.post(BOT_PATH, headers=headers, json=_message_update(6))
+
+    assert response.status_code == 200
+    assert response['Content-Type'] == 'application/json'
+    assert response.json() == {'method': 'sendMessage', 'chat_id': 999, 'text': 'Thanks'}
+
+
+class FakeHandoff:
+    def __init__(self, error: Exception | None = None) -> None:
+        self.error = error
+        self.bodies: list[bytes] = []
+
+    async def forward(self, body: bytes) -> None:
+        self.bodies.append(body)
+        if self.error is not None:
+            raise self.error
+
+
+@pytest.fixture
+def builder_headers():
+    secret = generate_bot_webhook_secret(django_settings.TELEGRAM_BUILDER_BOT_WEBHOOK_PATH)
+    return {'X-Telegram-Bot-Api-Secret-Token': secret}
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_builder_webhook_hands_off_update(webhook_client, builder_headers):
+    client, _, _ = webhook_client
+    handoff = FakeHandoff()
+
+    response = await client.post(
+        BUILDER_PATH,
+        headers=builder_headers,
+        json=_message_update(7),
+        state={'ptb_application': None, 'update_handoff': handoff},
+    )
+
+    assert response.status_code == 200
+    assert len(handoff.bodies) == 1
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_builder_webhook_returns_503_without_handoff(webhook_client, builder_headers):
+    client, _, _ = webhook_client
+    state = {'ptb_application': None, 'update_handoff': FakeHandoff(ConnectionRefusedError())}
+
+    response = await client.post(
+        BUILDER_PATH, headers=builder_headers, json=_message_update(8), state=state
+    )
+
+    assert response.status_code == 503
+    # The claim was released, so Telegram's redelivery is handed off again
+    state['update_handoff'] = handoff = FakeHandoff()
+    response = await client.post(
+        BUILDER_PATH, headers=builder_headers, json=_message_update(8), state=state
+    )
+    assert response.status_code == 200
+    assert len(handoff.bodies) == 1
+
+
+@pytest.mark.api
+@pytest.mark.asyncio
+async def test_builder_webhook_rejects_update_the_builder_cannot_decode(
+    webhook_client, builder_headers
+):
+    client, _, _ = webhook_client
+    handoff = FakeHandoff(UpdateRejectedError('Invalid update'))
+
+    response = await client.post(
+        BUILDER_PATH,
+        headers=builder_headers,
+        json=_message_update(9),
+        state={'ptb_application': None, 'update_handoff': handoff},
+    )
+
+    assert response.status_code == 400
@@ -9,11 +9,13 @@ from feedback_bot import crud
 from feedback_bot.models import (
     BannedUser,
     Bot,
+    BotStats,
     BroadcastMessage,
     FeedbackChat,
     MessageMapping,
     User,
 )
+from feedback_bot.utils import flusher as flusher_module
 
 
 @pytest.fixture(autouse=True)
@@ -24,6 +26,27 @@ def configure_settings(settings):
     return settings
 
 
+@pytest.fixture(autouse=True)
+def reset_ban_index():
+    crud._ban_index_cache.clear()
+    yield
+    crud._ban_index_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_recent_mappings():
+    crud._recent_mappings.clear()
+    yield
+    crud._recent_mappings.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_feedback_chats():
+    crud._feedback_chats.clear()
+    yield
+    crud._feedback_chats.clear()
+
+
 @pytest.mark.django
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.asyncio
@@ -259,7 +282,7 @@ async def test_user_is_whitelisted_filters_properly():
 @pytest.mark.django
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.asyncio
-async def test_get_bots_tokens_returns_decrypted_tokens():
+async def test_get_bots_webhook_keys_returns_tokens_and_secret_hashes():
     owner, _ = await crud.upsert_user({'id': 6060})
     await crud.create_bot(
         telegram_id=444001,
@@ -270,7 +293,7 @@ async def test_get_bots_tokens_returns_decrypted_tokens():
         start_message='start',
         feedback_received_message='received',
     )
-    await crud.create_bot(
+    second = await crud.create_bot(
         telegram_id=444002,
         bot_token='TOKEN_TWO',  # noqa: S106
         username='token_bot_2',
@@ -280,9 +303,14 @@ async def test_get_bots_tokens_returns_decrypted_tokens():
         feedback_received_message='received',
     )
 
-    tokens = await crud.get_bots_tokens()
+    await crud.save_webhook_secret_hash(second.uuid, 'hash-two')
 
-    assert sorted(tokens) == ['TOKEN_ONE', 'TOKEN_TWO']
+    keys = await crud.get_bots_webhook_keys()
+
+    assert sorted((token, secret_hash) for _, token, secret_hash in keys) == [
+        ('TOKEN_ONE', ''),
+        ('TOKEN_TWO', 'hash-two'),
+    ]
 
 
 @pytest.mark.django
@@ -350,6 +378,39 @@ async def test_get_bot_config_returns_enabled_bot():
     assert config.antiflood_enabled is False
 
 
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_get_bot_config_is_cached_until_bot_changes():
+    owner, _ = await crud.upsert_user({'id': 7071})
+    bot = await crud.create_bot(
+        telegram_id=555002,
+        bot_token='CACHE_TOKEN',  # noqa: S106
+        username='cache_bot',
+        name='Cache Bot',
+        owner=owner.telegram_id,
+        start_message='hello',
+        feedback_received_message='reply',
+    )
+
+    first = await crud.get_bot_config(bot.uuid)
+    await Bot.objects.filter(pk=bot.pk).aupdate(start_message='stale')
+    assert await crud.get_bot_config(str(bot.uuid)) is first
+
+    await crud.update_bot_settings(bot.uuid, owner.telegram_id, {'use_topics': True})
+    refreshed = await crud.get_bot_config(bot.uuid)
+    assert refreshed is not first
+    assert refreshed.use_topics is True
+
+    await crud.update_bot_forward_chat_by_telegram_id(bot.telegram_id, -100555)
+    linked = await crud.get_bot_config(bot.uuid)
+    assert linked is not refreshed
+    assert linked.forward_chat_id == -100555
+
+    await crud.delete_bot(bot.uuid, owner.telegram_id)
+    assert await crud.get_bot_config(bot.uuid) is None
+
+
 @pytest.mark.django
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.asyncio
@@ -382,6 +443,29 @@ async def test_get_bots_respects_admin_visibility():
     assert [bot.username for bot in non_admin_view] == [bot_owner.username]
 
 
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_bot_management_queries_load_every_field_of_bot_out():
+    """Deferred fields would be lazily loaded while async views serialize `BotOut`."""
+    from feedback_bot.api.miniapp.bots import BotOut  # noqa: PLC0415
+
+    owner, _ = await crud.upsert_user({'id': 8090})
+    bot = await crud.create_bot(
+        telegram_id=666003,
+        bot_token='OUT_TOKEN',  # noqa: S106
+        username='out_bot',
+        name='Out Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+    exposed = {(field.alias or name).split('.')[0] for name, field in BotOut.model_fields.items()}
+
+    for loaded in (*await crud.get_bots(owner.telegram_id), await crud.get_bot(bot.uuid, 8090)):
+        assert not exposed & loaded.get_deferred_fields()
+
+
 @pytest.mark.django
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.asyncio
@@ -611,7 +695,7 @@ async def test_delete_message_mapping_removes_entry():
     )
 
     chat, _ = await crud.ensure_feedback_chat(bot, 555, None)
-    await crud.save_incoming_mapping(bot, chat, user_message_id=11, owner_message_id=22)
+    await crud.save_message_mapping(bot, chat, user_message_id=11, owner_message_id=22)
     mapping = await crud.get_owner_message_mapping(bot, 22)
     assert mapping is not None
 
@@ -689,21 +773,92 @@ async def test_mapping_helpers_create_and_fetch_records():
     chat, created = await crud.ensure_feedback_chat(bot, 300, 'mapuser')
     assert created is True
 
-    await crud.save_incoming_mapping(bot, chat, user_message_id=11, owner_message_id=22)
+    await crud.save_message_mapping(bot, chat, user_message_id=11, owner_message_id=22)
     mapping = await crud.get_user_message_mapping(bot, 300, 11)
     assert mapping is not None
     assert mapping.owner_message_id == 22
 
-    await crud.save_incoming_mapping(bot, chat, user_message_id=11, owner_message_id=33)
+    await crud.save_message_mapping(bot, chat, user_message_id=11, owner_message_id=33)
     mapping = await crud.get_user_message_mapping(bot, 300, 11)
     assert mapping.owner_message_id == 33
+    # The updated row is cached with the given chat instead of loading it lazily
+    assert mapping.user_chat is chat
 
-    await crud.save_outgoing_mapping(bot, chat, user_message_id=44, owner_message_id=55)
+    await crud.save_message_mapping(bot, chat, user_message_id=44, owner_message_id=55)
     outgoing = await crud.get_owner_message_mapping(bot, 55)
     assert outgoing is not None
     assert outgoing.user_message_id == 44
 
 
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_mappings_are_keyed_per_user_chat_and_destination():
+    owner, _ = await crud.upsert_user({'id': 17100})
+    bot = await crud.create_bot(
+        telegram_id=999610,
+        bot_token='MAP_KEYS_TOKEN',  # noqa: S106
+        username='map_keys_bot',
+        name='Map Keys Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+    first, _ = await crud.ensure_feedback_chat(bot, 301, 'first')
+    second, _ = await crud.ensure_feedback_chat(bot, 302, 'second')
+
+    await crud.save_message_mapping(bot, first, user_message_id=1, owner_message_id=10)
+    await crud.save_message_mapping(bot, second, user_message_id=1, owner_message_id=11)
+
+    assert (await crud.get_user_message_mapping(bot, 301, 1)).owner_message_id == 10
+    assert (await crud.get_user_message_mapping(bot, 302, 1)).owner_message_id == 11
+    assert (await crud.get_owner_message_mapping(bot, 11)).owner_chat_id == owner.telegram_id
+
+    bot.forward_chat_id = -100200
+    assert await crud.get_owner_message_mapping(bot, 10) is None
+    await crud.save_message_mapping(bot, first, user_message_id=2, owner_message_id=10)
+    mapping = await crud.get_owner_message_mapping(bot, 10)
+    assert mapping.user_message_id == 2
+    assert mapping.owner_chat_id == -100200
+
+
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_recently_saved_mappings_are_resolved_from_memory():
+    owner, _ = await crud.upsert_user({'id': 17200})
+    bot = await crud.create_bot(
+        telegram_id=999620,
+        bot_token='MAP_CACHE_TOKEN',  # noqa: S106
+        username='map_cache_bot',
+        name='Map Cache Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+    chat, _ = await crud.ensure_feedback_chat(bot, 303, 'cached')
+    await crud.save_message_mapping(bot, chat, user_message_id=1, owner_message_id=10)
+    await crud.save_message_mapping(bot, chat, user_message_id=2, owner_message_id=20)
+    # Rows deleted behind the cache's back are still served from memory
+    await MessageMapping.objects.filter(bot=bot).adelete()
+
+    assert (await crud.get_owner_message_mapping(bot, 10)).user_message_id == 1
+    assert (await crud.get_user_message_mapping(bot, 303, 2)).owner_message_id == 20
+
+    await crud.save_message_mapping(bot, chat, user_message_id=1, owner_message_id=11)
+    assert await crud.get_owner_message_mapping(bot, 10) is None
+    mapping = await crud.get_owner_message_mapping(bot, 11)
+    assert mapping.user_message_id == 1
+
+    await crud.delete_message_mapping(mapping)
+    assert await crud.get_owner_message_mapping(bot, 11) is None
+    assert await crud.get_user_message_mapping(bot, 303, 1) is None
+
+    await crud.clear_feedback_chat_mappings(bot, chat)
+    assert await crud.get_owner_message_mapping(bot, 20) is None
+    assert await crud.get_user_message_mapping(bot, 303, 2) is None
+
+
 @pytest.mark.django
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.asyncio
@@ -721,8 +876,8 @@ async def test_clear_feedback_chat_mappings_and_bump_stats():
     chat, created = await crud.ensure_feedback_chat(bot, 400, 'statuser')
     assert created is True
 
-    await crud.save_incoming_mapping(bot, chat, user_message_id=1, owner_message_id=2)
-    await crud.save_outgoing_mapping(bot, chat, user_message_id=3, owner_message_id=4)
+    await crud.save_message_mapping(bot, chat, user_message_id=1, owner_message_id=2)
+    await crud.save_message_mapping(bot, chat, user_message_id=3, owner_message_id=4)
 
     assert await crud.get_feedback_chat_count(bot) == 1
 
@@ -739,6 +894,199 @@ async def test_clear_feedback_chat_mappings_and_bump_stats():
     assert await crud.get_owner_message_mapping(bot, 4) is None
 
 
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_feedback_unit_of_work_commits_collected_changes():
+    owner, _ = await crud.upsert_user({'id': 18500})
+    bot = await crud.create_bot(
+        telegram_id=999750,
+        bot_token='UOW_TOKEN',  # noqa: S106
+        username='uow_bot',
+        name='UoW Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+    assert await crud.get_feedback_sender(bot, 450) == (False, None)
+    chat, _ = await crud.ensure_feedback_chat(bot, 450, 'before')
+    await crud.save_message_mapping(bot, chat, user_message_id=1, owner_message_id=2)
+    now = datetime.now(UTC)
+
+    changes = crud.FeedbackUnitOfWork(bot, chat)
+    changes.set_username('after')
+    changes.set_last_feedback(now)
+    changes.set_last_warning(None)
+    changes.save_incoming_mapping(1, 3)
+    changes.save_incoming_mapping(5, 6)
+    changes.bump_incoming_messages()
+    await changes.commit()
+    changes.bump_incoming_messages()
+    await changes.commit()
+
+    banned, stored_chat = await crud.get_feedback_sender(bot, 450)
+    assert banned is False
+    assert stored_chat.username == 'after'
+    assert stored_chat.last_feedback_at == now
+    assert (await crud.get_user_message_mapping(bot, 450, 1)).owner_message_id == 3
+    assert (await crud.get_user_message_mapping(bot, 450, 5)).owner_message_id == 6
+    assert (await crud.ensure_bot_stats(bot)).incoming_messages == 2
+
+    await crud.ensure_user_ban(bot.id, 450)
+    assert await crud.get_feedback_sender(bot, 450) == (True, None)
+
+
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_stats_aggregator_buffers_increments_until_flushed(settings):
+    settings.TELEGRAM_FLUSH_INTERVAL = 3600
+    flusher_module.get_flusher.cache_clear()
+    crud.get_stats_aggregator.cache_clear()
+    owner, _ = await crud.upsert_user({'id': 18600})
+    bot = await crud.create_bot(
+        telegram_id=999760,
+        bot_token='AGG_TOKEN',  # noqa: S106
+        username='agg_bot',
+        name='Agg Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+
+    flusher = flusher_module.get_flusher()
+    flusher.start()
+    try:
+        await crud.bump_incoming_messages(bot)
+        await crud.bump_incoming_messages(bot)
+        await crud.bump_outgoing_messages(bot)
+
+        assert not await BotStats.objects.filter(bot=bot, incoming_messages__gt=0).aexists()
+        stats = await crud.ensure_bot_stats(bot)
+        assert (stats.incoming_messages, stats.outgoing_messages) == (2, 1)
+    finally:
+        await flusher.stop()
+        flusher_module.get_flusher.cache_clear()
+        crud.get_stats_aggregator.cache_clear()
+
+    stored = await BotStats.objects.aget(bot=bot)
+    assert (stored.incoming_messages, stored.outgoing_messages) == (2, 1)
+
+
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_stats_aggregator_flushes_once_the_threshold_is_reached(settings):
+    settings.TELEGRAM_FLUSH_INTERVAL = 3600
+    settings.TELEGRAM_STATS_FLUSH_THRESHOLD = 3
+    flusher_module.get_flusher.cache_clear()
+    crud.get_stats_aggregator.cache_clear()
+    owner, _ = await crud.upsert_user({'id': 18650})
+    bot = await crud.create_bot(
+        telegram_id=999765,
+        bot_token='AGG_THRESHOLD_TOKEN',  # noqa: S106
+        username='agg_threshold_bot',
+        name='Agg Threshold Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+
+    flusher = flusher_module.get_flusher()
+    flusher.start()
+    try:
+        aggregator = crud.get_stats_aggregator()
+        await crud.bump_incoming_messages(bot)
+        await crud.bump_incoming_messages(bot)
+        assert aggregator._early_flush is None
+        await crud.bump_outgoing_messages(bot)
+        await aggregator._early_flush
+
+        stored = await BotStats.objects.aget(bot=bot)
+        assert (stored.incoming_messages, stored.outgoing_messages) == (2, 1)
+        assert aggregator.pending(bot.pk) == {}
+    finally:
+        await flusher.stop()
+        flusher_module.get_flusher.cache_clear()
+        crud.get_stats_aggregator.cache_clear()
+
+
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_feedback_chats_of_returning_users_are_cached():
+    owner, _ = await crud.upsert_user({'id': 18700})
+    bot = await crud.create_bot(
+        telegram_id=999770,
+        bot_token='CHAT_CACHE_TOKEN',  # noqa: S106
+        username='chat_cache_bot',
+        name='Chat Cache Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+    assert await crud.get_feedback_sender(bot, 500) == (False, None)
+    chat, created = await crud.ensure_feedback_chat(bot, 500, 'first')
+    assert created is True
+
+    await FeedbackChat.objects.filter(pk=chat.pk).aupdate(topic_id=5)
+    _, cached = await crud.get_feedback_sender(bot, 500)
+    assert cached is chat
+    assert cached.topic_id is None
+
+    # Topic changes made through another instance drop the cached one
+    await crud.set_feedback_chat_topic(await FeedbackChat.objects.aget(pk=chat.pk), 6)
+    _, reloaded = await crud.get_feedback_sender(bot, 500)
+    assert reloaded is not chat
+    assert reloaded.topic_id == 6
+
+    assert await crud.delete_bot(bot.uuid, owner.telegram_id) is True
+    assert len(crud._feedback_chats) == 0
+
+
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_feedback_chat_changes_are_written_behind(settings):
+    settings.TELEGRAM_FLUSH_INTERVAL = 3600
+    flusher_module.get_flusher.cache_clear()
+    crud.get_feedback_chat_writer.cache_clear()
+    owner, _ = await crud.upsert_user({'id': 18800})
+    bot = await crud.create_bot(
+        telegram_id=999780,
+        bot_token='CHAT_WRITER_TOKEN',  # noqa: S106
+        username='chat_writer_bot',
+        name='Chat Writer Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+    chat, _ = await crud.ensure_feedback_chat(bot, 501, 'before')
+    now = datetime.now(UTC)
+
+    flusher = flusher_module.get_flusher()
+    flusher.start()
+    try:
+        await crud.ensure_feedback_chat(bot, 501, 'after')
+        changes = crud.FeedbackUnitOfWork(bot, chat)
+        changes.set_last_feedback(now)
+        await changes.commit()
+
+        stored = await FeedbackChat.objects.aget(pk=chat.pk)
+        assert (stored.username, stored.last_feedback_at) == ('before', None)
+        # A chat reloaded before the flush still sees the buffered changes
+        crud._feedback_chats.clear()
+        _, reloaded = await crud.get_feedback_sender(bot, 501)
+        assert (reloaded.username, reloaded.last_feedback_at) == ('after', now)
+    finally:
+        await flusher.stop()
+        flusher_module.get_flusher.cache_clear()
+        crud.get_feedback_chat_writer.cache_clear()
+
+    stored = await FeedbackChat.objects.aget(pk=chat.pk)
+    assert (stored.username, stored.last_feedback_at) == ('after', now)
+
+
 @pytest.mark.django
 @pytest.mark.django_db(transaction=True)
 @pytest.mark.asyncio
@@ -773,3 +1121,62 @@ async def test_ban_helpers_manage_banned_users():
     assert removed is True
     assert await crud.is_user_banned(bot.id, 5000) is False
     assert await BannedUser.objects.filter(bot=bot).aexists() is False
+
+
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+@pytest.mark.parametrize('bloom_threshold', [10000, 1])
+async def test_ban_index_is_invalidated_by_ban_changes(settings, bloom_threshold):
+    settings.TELEGRAM_BAN_INDEX_BLOOM_THRESHOLD = bloom_threshold
+    owner, _ = await crud.upsert_user({'id': 19100})
+    bot = await crud.create_bot(
+        telegram_id=999810,
+        bot_token='BAN_INDEX_TOKEN',  # noqa: S106
+        username='ban_index_bot',
+        name='Ban Index Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+    await crud.ensure_user_ban(bot.id, 5001)
+    await crud.ensure_user_ban(bot.id, 5002)
+
+    assert await crud.is_user_banned(bot.id, 5001) is True
+    assert await crud.is_user_banned(bot.id, 5003) is False
+
+    # Rows written behind the index's back are picked up once a ban change reloads it
+    await BannedUser.objects.acreate(bot=bot, user_telegram_id=5003)
+    await crud.lift_user_ban(bot.id, 5001)
+    assert await crud.is_user_banned(bot.id, 5001) is False
+    assert await crud.is_user_banned(bot.id, 5003) is True
+    assert await crud.get_feedback_sender(bot, 5002) == (True, None)
+
+
+@pytest.mark.django
+@pytest.mark.django_db(transaction=True)
+@pytest.mark.asyncio
+async def test_ban_index_picks_up_ban_changes_of_other_workers(settings):
+    settings.TELEGRAM_BAN_INDEX_TTL = 3600
+    owner, _ = await crud.upsert_user({'id': 19200})
+    bot = await crud.create_bot(
+        telegram_id=999820,
+        bot_token='BAN_SHARED_TOKEN',  # noqa: S106
+        username='ban_shared_bot',
+        name='Ban Shared Bot',
+        owner=owner.telegram_id,
+        start_message='start',
+        feedback_received_message='received',
+    )
+    assert await crud.is_user_banned(bot.id, 5001) is False
+
+    # Another worker bans the user: its version bump is seen once the cached list is rechecked
+    other_worker_cache = crud._ban_index_cache.get(bot.id)
+    crud._ban_index_cache.clear()
+    await crud.ensure_user_ban(bot.id, 5001)
+    crud._ban_index_cache.set(bot.id, other_worker_cache)
+    assert await crud.is_user_banned(bot.id, 5001) is False
+
+    settings.TELEGRAM_BAN_INDEX_TTL = 0
+    assert await crud.is_user_banned(bot.id, 5001) is True
+    assert crud._ban_index_cache.get(bot.id).version == 1
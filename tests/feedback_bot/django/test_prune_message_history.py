@@ -0,0 +1,90 @@
+"""Tests for the prune_message_history management command."""
+
+from __future__ import annotations
+
+from datetime import UTC, datetime, timedelta
+from io import StringIO
+
+import pytest
+from feedback_bot.models import Bot, BroadcastMessage, FeedbackChat, MessageMapping, User
+
+from django.core.management import call_command
+
+
+@pytest.fixture
+def bot(settings):
+    settings.TELEGRAM_RETENTION_DAYS = 30
+    settings.TELEGRAM_RETENTION_MAX_MAPPINGS = 0
+    owner = User.objects.create(telegram_id=18000)
+    return Bot.objects.create(
+        owner=owner,
+        name='Prune Bot',
+        username='prune_bot',
+        telegram_id=999700,
+        _token='PRUNE_TOKEN',  # noqa: S106
+    )
+
+
+def add_mappings(bot: Bot, chat: FeedbackChat, count: int, *, age_days: int = 0) -> None:
+    start = MessageMapping.objects.filter(user_chat=chat).count()
+    created = MessageMapping.objects.bulk_create(
+        MessageMapping(
+            bot=bot,
+            user_chat=chat,
+            user_message_id=start + index + 1,
+            owner_chat_id=bot.owner_id,
+            owner_message_id=chat.user_telegram_id * 1000 + start + index + 1,
+        )
+        for index in range(count)
+    )
+    MessageMapping.objects.filter(pk__in=[mapping.pk for mapping in created]).update(
+        created_at=datetime.now(UTC) - timedelta(days=age_days)
+    )
+
+
+def prune(*args: str) -> str:
+    out = StringIO()
+    call_command('prune_message_history', *args, '--batch-size', '2', stdout=out)
+    return out.getvalue()
+
+
+@pytest.mark.django
+@pytest.mark.django_db
+def test_prune_deletes_rows_older_than_retention(bot):
+    chat = FeedbackChat.objects.create(bot=bot, user_telegram_id=1)
+    add_mappings(bot, chat, 5, age_days=40)
+    add_mappings(bot, chat, 2)
+    old_broadcast = BroadcastMessage.objects.create(bot=bot, chat_id=1, message_id=1)
+    BroadcastMessage.objects.filter(pk=old_broadcast.pk).update(
+        created_at=datetime.now(UTC) - timedelta(days=40)
+    )
+    BroadcastMessage.objects.create(bot=bot, chat_id=1, message_id=2)
+
+    assert 'Would delete 5 message mappings and 1 broadcast copies' in prune('--dry-run')
+    assert MessageMapping.objects.count() == 7
+
+    output = prune()
+
+    assert '@prune_bot: 5 mappings, 1 broadcast copies' in output
+    assert 'Deleted 5 message mappings and 1 broadcast copies' in output
+    assert sorted(MessageMapping.objects.values_list('user_message_id', flat=True)) == [6, 7]
+    assert list(BroadcastMessage.objects.values_list('message_id', flat=True)) == [2]
+
+
+@pytest.mark.django
+@pytest.mark.django_db
+def test_prune_keeps_newest_mappings_per_conversation(bot):
+    bot.retention_days = 0
+    bot.retention_max_mappings = 3
+    bot.save()
+    busy = FeedbackChat.objects.create(bot=bot, user_telegram_id=1)
+    quiet = FeedbackChat.objects.create(bot=bot, user_telegram_id=2)
+    add_mappings(bot, busy, 8, age_days=40)
+    add_mappings(bot, quiet, 2, age_days=40)
+
+    assert 'Deleted 5 message mappings' in prune()
+
+    assert sorted(
+        MessageMapping.objects.filter(user_chat=busy).values_list('user_message_id', flat=True)
+    ) == [6, 7, 8]
+    assert MessageMapping.objects.filter(user_chat=quiet).count() == 2
@@ -4,6 +4,7 @@ from types import SimpleNamespace
 
 import pytest
 from feedback_bot.telegram.builder import bot as bot_module
+from feedback_bot.utils.modules_loader import HandlerRegistry
 
 from telegram import Update
 from telegram.ext import CallbackContext, CommandHandler
@@ -53,3 +54,21 @@ def test_load_builder_modules_skips_non_command_handlers(monkeypatch):
 
     assert added_handlers == [non_command_handler]
     assert commands == []
+
+
+@pytest.mark.ptb
+def test_handler_registry_registers_handlers_with_groups():
+    added_handlers = []
+
+    class DummyApp:
+        def add_handler(self, handler, group=None):
+            added_handlers.append((handler, group))
+
+    first, second = SimpleNamespace(), SimpleNamespace()
+    modules = [SimpleNamespace(HANDLERS=[(first, -1), second]), SimpleNamespace()]
+
+    registry = HandlerRegistry.from_modules(modules)
+    registry.register(DummyApp())
+
+    assert registry.handlers == ((first, -1), (second, None))
+    assert added_handlers == [(first, -1), (second, None)]
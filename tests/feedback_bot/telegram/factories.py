@@ -28,6 +28,7 @@ def build_message(
     is_bot: bool = False,
     username: str | None = None,
     date: dt.datetime | None = None,
+    media_group_id: str | None = None,
 ) -> Message:
     now = date or dt.datetime(2025, 1, 1, tzinfo=dt.UTC)
     return Message(
@@ -39,6 +40,7 @@ def build_message(
         forward_origin=forward_origin,
         text=text,
         entities=entities,
+        media_group_id=media_group_id,
     )
 
 
@@ -7,9 +7,11 @@ from pathlib import Path
 
 import pytest
 import pytest_asyncio
+from feedback_bot import crud
 from feedback_bot.models import BannedUser, Bot, BotStats, FeedbackChat, User
 from feedback_bot.telegram.feedback_bot import bot as feedback_bot_module
 from feedback_bot.telegram.feedback_bot import modules as feedback_modules_pkg
+from feedback_bot.telegram.feedback_bot.antiflood import get_antiflood
 from feedback_bot.utils.modules_loader import get_modules, load_modules
 from tests.feedback_bot.telegram.factories import build_user
 
@@ -26,6 +28,37 @@ def stub_translation_feedback(monkeypatch):
         monkeypatch.setattr(module, '_', lambda message: message, raising=False)
 
 
+@pytest.fixture(autouse=True)
+def reset_ban_index():
+    """Tests write bans directly, so start every test without cached ban lists."""
+    crud._ban_index_cache.clear()
+    yield
+    crud._ban_index_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_recent_mappings():
+    """Tests write and delete mappings directly, so start every test without cached mappings."""
+    crud._recent_mappings.clear()
+    yield
+    crud._recent_mappings.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_feedback_chats():
+    """Tests change feedback chats directly, so start every test without cached chats."""
+    crud._feedback_chats.clear()
+    yield
+    crud._feedback_chats.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_antiflood():
+    get_antiflood().clear()
+    yield
+    get_antiflood().clear()
+
+
 @pytest_asyncio.fixture
 async def feedback_app(monkeypatch, db) -> tuple[Application, Bot]:
     """Initialize a PTB Application backed by a lightweight feedback bot config."""
@@ -2,13 +2,16 @@
 
 from __future__ import annotations
 
+import asyncio
 import datetime as dt
 from types import SimpleNamespace
 from unittest.mock import AsyncMock
 
 import pytest
 from feedback_bot.models import BannedUser, Bot, BotStats, FeedbackChat, MessageMapping
+from feedback_bot.telegram.feedback_bot import albums as albums_module
 from feedback_bot.telegram.feedback_bot.modules import messages as messages_module
+from feedback_bot.telegram.utils.webhook_reply import capture_webhook_reply
 from tests.feedback_bot.telegram.factories import build_message
 
 from telegram import MessageId, ReactionTypeEmoji, Update
@@ -59,8 +62,12 @@ async def _prepare_reaction_mapping(
     )
     await MessageMapping.objects.aupdate_or_create(
         bot=bot_config,
+        user_chat=feedback_chat,
         user_message_id=user_message_id,
-        defaults={'user_chat': feedback_chat, 'owner_message_id': owner_message_id},
+        defaults={
+            'owner_chat_id': bot_config.destination_chat_id,
+            'owner_message_id': owner_message_id,
+        },
     )
 
 
@@ -104,6 +111,34 @@ async def test_forward_feedback_creates_mapping(monkeypatch, feedback_app):
     assert intro_payload['text'].startswith('Tester')
 
 
+async def test_forward_feedback_defers_ack_to_webhook_response(monkeypatch, feedback_app):
+    _, bot_config = feedback_app
+    await FeedbackChat.objects.filter(bot=bot_config).adelete()
+    await MessageMapping.objects.filter(bot=bot_config).adelete()
+
+    user_message = build_message(999, message_id=11, text='hi there')
+
+    forward_mock = AsyncMock(return_value=SimpleNamespace(message_id=42, link=None))
+    reply_mock = AsyncMock()
+    _patch_message_method(monkeypatch, 'forward', forward_mock)
+    _patch_message_method(monkeypatch, 'reply_text', reply_mock)
+
+    context = _build_context(bot_config, bot_id=bot_config.telegram_id)
+    update = SimpleNamespace(effective_message=user_message)
+
+    with capture_webhook_reply() as reply:
+        await messages_module.forward_feedback(update, context)
+
+    forward_mock.assert_awaited_once()
+    reply_mock.assert_not_awaited()
+    assert reply == {
+        'method': 'sendMessage',
+        'chat_id': user_message.chat_id,
+        'text': 'Thanks',
+        'reply_parameters': {'message_id': 11},
+    }
+
+
 async def test_forward_feedback_private_mode_uses_copy(monkeypatch, feedback_app):
     _, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
@@ -189,6 +224,108 @@ async def test_forward_feedback_anonymous_topic(monkeypatch, feedback_app):
     assert chat.topic_id == 444
 
 
+async def test_ensure_topic_creates_one_topic_for_concurrent_messages(feedback_app):
+    _, bot_config = feedback_app
+    await FeedbackChat.objects.filter(bot=bot_config).adelete()
+    await Bot.objects.filter(pk=bot_config.pk).aupdate(use_topics=True, forward_chat_id=None)
+    await bot_config.arefresh_from_db()
+    feedback_chat = await FeedbackChat.objects.acreate(bot=bot_config, user_telegram_id=999)
+
+    async def create_forum_topic(**kwargs):
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(message_thread_id=777)
+
+    context = _build_context(bot_config, bot_id=bot_config.telegram_id, send_message=AsyncMock())
+    context.bot.create_forum_topic = AsyncMock(side_effect=create_forum_topic)
+
+    # Each message reads its own copy of the chat, as concurrent updates would
+    chats = [await FeedbackChat.objects.aget(pk=feedback_chat.pk) for _ in range(3)]
+    topic_ids = await asyncio.gather(
+        *(
+            messages_module._ensure_topic(
+                context, bot_config, build_message(999, message_id=11 + index), chat
+            )
+            for index, chat in enumerate(chats)
+        )
+    )
+
+    assert topic_ids == [777, 777, 777]
+    context.bot.create_forum_topic.assert_awaited_once()
+    context.bot.send_message.assert_awaited_once()
+    stored = await FeedbackChat.objects.aget(pk=feedback_chat.pk)
+    assert (stored.topic_id, stored.topic_claimed_at) == (777, None)
+
+
+async def test_topic_fallback_uses_topic_recreated_by_another_worker(feedback_app):
+    _, bot_config = feedback_app
+    await FeedbackChat.objects.filter(bot=bot_config).adelete()
+    await Bot.objects.filter(pk=bot_config.pk).aupdate(use_topics=True, forward_chat_id=None)
+    await bot_config.arefresh_from_db()
+    feedback_chat = await FeedbackChat.objects.acreate(
+        bot=bot_config, user_telegram_id=999, topic_id=5
+    )
+    await MessageMapping.objects.acreate(
+        bot=bot_config,
+        user_chat=feedback_chat,
+        user_message_id=10,
+        owner_chat_id=bot_config.owner_id,
+        owner_message_id=40,
+    )
+    # Another worker replaced the deleted topic after this copy of the chat was cached
+    await FeedbackChat.objects.filter(pk=feedback_chat.pk).aupdate(topic_id=7)
+
+    context = _build_context(bot_config, bot_id=bot_config.telegram_id)
+    context.bot.forward_message = AsyncMock(
+        side_effect=[BadRequest('Message thread not found'), SimpleNamespace(message_id=42)]
+    )
+
+    forwarded, topic_id = await messages_module._forward_with_topic_fallback(
+        context,
+        bot_config,
+        [build_message(999, message_id=11)],
+        feedback_chat,
+        bot_config.owner_id,
+        feedback_chat.topic_id,
+    )
+
+    assert ([message.message_id for message in forwarded], topic_id) == ([42], 7)
+    assert context.bot.forward_message.await_args.kwargs['message_thread_id'] == 7
+    assert feedback_chat.topic_id == 7
+    context.bot.create_forum_topic.assert_not_awaited()
+    assert await MessageMapping.objects.filter(user_chat=feedback_chat).aexists()
+
+
+async def test_ensure_topic_waits_for_topic_claimed_by_another_worker(monkeypatch, feedback_app):
+    _, bot_config = feedback_app
+    await FeedbackChat.objects.filter(bot=bot_config).adelete()
+    await Bot.objects.filter(pk=bot_config.pk).aupdate(use_topics=True, forward_chat_id=None)
+    await bot_config.arefresh_from_db()
+    feedback_chat = await FeedbackChat.objects.acreate(
+        bot=bot_config, user_telegram_id=999, topic_claimed_at=dt.datetime.now(dt.UTC)
+    )
+    monkeypatch.setattr(messages_module, 'TOPIC_CLAIM_POLL_INTERVAL', 0.01)
+
+    context = _build_context(bot_config, bot_id=bot_config.telegram_id)
+    context.bot.create_forum_topic = AsyncMock(side_effect=AssertionError('must not create'))
+
+    async def other_worker_creates_topic():
+        await asyncio.sleep(0.05)
+        await FeedbackChat.objects.filter(pk=feedback_chat.pk).aupdate(
+            topic_id=888, topic_claimed_at=None
+        )
+
+    topic_id, _ = await asyncio.gather(
+        messages_module._ensure_topic(
+            context, bot_config, build_message(999, message_id=11), feedback_chat
+        ),
+        other_worker_creates_topic(),
+    )
+
+    assert topic_id == 888
+    assert feedback_chat.topic_id == 888
+    context.bot.create_forum_topic.assert_not_awaited()
+
+
 async def test_forward_feedback_owner_topic_mode_standard_uses_forward_message(
     monkeypatch, feedback_app
 ):
@@ -308,6 +445,63 @@ async def test_forward_feedback_disables_topics_in_db_when_creation_blocked(
     new_context.bot.create_forum_topic.assert_not_awaited()
 
 
+async def test_forward_feedback_forwards_albums_with_one_request(
+    monkeypatch, settings, feedback_app
+):
+    _, bot_config = feedback_app
+    await FeedbackChat.objects.filter(bot=bot_config).adelete()
+    await MessageMapping.objects.filter(bot=bot_config).adelete()
+    settings.TELEGRAM_MEDIA_GROUP_WINDOW = 60
+    albums_module.get_album_buffer.cache_clear()
+
+    delivered: list[object] = []
+    forward_mock = AsyncMock(
+        side_effect=lambda message, **kwargs: (
+            delivered.append(message.message_id) or SimpleNamespace(message_id=42, link=None)
+        )
+    )
+    reply_mock = AsyncMock()
+    _patch_message_method(monkeypatch, 'forward', forward_mock)
+    _patch_message_method(monkeypatch, 'reply_text', reply_mock)
+
+    context = _build_context(bot_config, bot_id=bot_config.telegram_id)
+    context.bot.forward_messages = AsyncMock(
+        side_effect=lambda **kwargs: (
+            delivered.append(kwargs['message_ids'])
+            or (MessageId(101), MessageId(102), MessageId(103))
+        )
+    )
+
+    try:
+        for message_id in (11, 12, 13):
+            album_message = build_message(999, message_id=message_id, media_group_id='album-1')
+            await messages_module.forward_feedback(
+                SimpleNamespace(effective_message=album_message), context
+            )
+        assert delivered == []
+
+        # A later message of the chat delivers the pending album first
+        text_message = build_message(999, message_id=14, text='and a caption')
+        await messages_module.forward_feedback(
+            SimpleNamespace(effective_message=text_message), context
+        )
+    finally:
+        await albums_module.get_album_buffer().close()
+        albums_module.get_album_buffer.cache_clear()
+
+    assert delivered == [[11, 12, 13], 14]
+    assert context.bot.forward_messages.await_args.kwargs['from_chat_id'] == 555
+    assert [call.kwargs['reply_to_message_id'] for call in reply_mock.await_args_list] == [11, 14]
+    mappings = {
+        user_message_id: owner_message_id
+        async for user_message_id, owner_message_id in MessageMapping.objects.filter(
+            bot=bot_config
+        ).values_list('user_message_id', 'owner_message_id')
+    }
+    assert mappings == {11: 101, 12: 102, 13: 103, 14: 42}
+    assert (await BotStats.objects.aget(bot=bot_config)).incoming_messages == 4
+
+
 async def test_forward_feedback_blocks_banned_user(monkeypatch, feedback_app):
     _, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
@@ -876,8 +1070,8 @@ async def test_mirror_reaction_destination_chat_to_user_message(feedback_app):
     _, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
     await MessageMapping.objects.filter(bot=bot_config).adelete()
-    await _prepare_reaction_mapping(bot_config)
     bot_config.forward_chat_id = -100222333
+    await _prepare_reaction_mapping(bot_config)
 
     context = _build_context(bot_config, bot_id=bot_config.telegram_id)
     reaction = ReactionTypeEmoji('🔥')
@@ -903,8 +1097,8 @@ async def test_mirror_reaction_user_chat_to_destination_message(feedback_app):
     _, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
     await MessageMapping.objects.filter(bot=bot_config).adelete()
-    await _prepare_reaction_mapping(bot_config)
     bot_config.forward_chat_id = -100222333
+    await _prepare_reaction_mapping(bot_config)
 
     context = _build_context(bot_config, bot_id=bot_config.telegram_id)
     reaction = ReactionTypeEmoji('👍')
@@ -930,8 +1124,8 @@ async def test_mirror_reaction_clears_when_new_reaction_is_empty(feedback_app):
     _, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
     await MessageMapping.objects.filter(bot=bot_config).adelete()
-    await _prepare_reaction_mapping(bot_config)
     bot_config.forward_chat_id = -100222333
+    await _prepare_reaction_mapping(bot_config)
 
     context = _build_context(bot_config, bot_id=bot_config.telegram_id)
     update = SimpleNamespace(
@@ -956,8 +1150,8 @@ async def test_mirror_reaction_uses_first_reaction_only(feedback_app):
     _, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
     await MessageMapping.objects.filter(bot=bot_config).adelete()
-    await _prepare_reaction_mapping(bot_config)
     bot_config.forward_chat_id = -100222333
+    await _prepare_reaction_mapping(bot_config)
 
     context = _build_context(bot_config, bot_id=bot_config.telegram_id)
     first = ReactionTypeEmoji('🔥')
@@ -1005,8 +1199,8 @@ async def test_mirror_reaction_chat_mismatch_is_ignored(feedback_app):
     _, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
     await MessageMapping.objects.filter(bot=bot_config).adelete()
-    await _prepare_reaction_mapping(bot_config)
     bot_config.forward_chat_id = -100222333
+    await _prepare_reaction_mapping(bot_config)
 
     context = _build_context(bot_config, bot_id=bot_config.telegram_id)
     update = SimpleNamespace(
@@ -1027,8 +1221,8 @@ async def test_mirror_reaction_swallows_badrequest(feedback_app):
     _, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
     await MessageMapping.objects.filter(bot=bot_config).adelete()
-    await _prepare_reaction_mapping(bot_config)
     bot_config.forward_chat_id = -100222333
+    await _prepare_reaction_mapping(bot_config)
 
     context = _build_context(bot_config, bot_id=bot_config.telegram_id)
     context.bot.set_message_reaction = AsyncMock(side_effect=BadRequest('bad reaction'))
@@ -1050,8 +1244,8 @@ async def test_mirror_reaction_swallows_forbidden(feedback_app):
     _, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
     await MessageMapping.objects.filter(bot=bot_config).adelete()
-    await _prepare_reaction_mapping(bot_config)
     bot_config.forward_chat_id = -100222333
+    await _prepare_reaction_mapping(bot_config)
 
     context = _build_context(bot_config, bot_id=bot_config.telegram_id)
     context.bot.set_message_reaction = AsyncMock(side_effect=Forbidden('forbidden'))
@@ -1073,8 +1267,8 @@ async def test_mirror_reaction_handler_reachable_via_process_update(monkeypatch,
     app, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
     await MessageMapping.objects.filter(bot=bot_config).adelete()
-    await _prepare_reaction_mapping(bot_config)
     bot_config.forward_chat_id = -100222333
+    await _prepare_reaction_mapping(bot_config)
     reaction_mock = _patch_bot_set_message_reaction(monkeypatch)
 
     payload = {
@@ -1105,8 +1299,8 @@ async def test_message_reaction_count_updates_are_ignored(monkeypatch, feedback_
     app, bot_config = feedback_app
     await FeedbackChat.objects.filter(bot=bot_config).adelete()
     await MessageMapping.objects.filter(bot=bot_config).adelete()
-    await _prepare_reaction_mapping(bot_config)
     bot_config.forward_chat_id = -100222333
+    await _prepare_reaction_mapping(bot_config)
     reaction_mock = _patch_bot_set_message_reaction(monkeypatch)
 
     payload = {
@@ -1123,3 +1317,62 @@ async def test_message_reaction_count_updates_are_ignored(monkeypatch, feedback_
     await app.process_update(update)
 
     reaction_mock.assert_not_awaited()
+
+
+async def test_forward_feedback_acknowledges_albums_outside_the_webhook_reply(
+    monkeypatch, settings, feedback_app
+):
+    _, bot_config = feedback_app
+    await FeedbackChat.objects.filter(bot=bot_config).adelete()
+    await MessageMapping.objects.filter(bot=bot_config).adelete()
+    settings.TELEGRAM_MEDIA_GROUP_WINDOW = 0.01
+    albums_module.get_album_buffer.cache_clear()
+
+    reply_mock = AsyncMock()
+    _patch_message_method(monkeypatch, 'reply_text', reply_mock)
+    context = _build_context(bot_config, bot_id=bot_config.telegram_id)
+    context.bot.forward_messages = AsyncMock(return_value=(MessageId(101), MessageId(102)))
+
+    try:
+        with capture_webhook_reply() as webhook_reply:
+            for message_id in (11, 12):
+                album_message = build_message(999, message_id=message_id, media_group_id='album-1')
+                await messages_module.forward_feedback(
+                    SimpleNamespace(effective_message=album_message), context
+                )
+        # The webhook response was returned before the album is delivered in the background
+        await asyncio.sleep(0.1)
+    finally:
+        await albums_module.get_album_buffer().close()
+        albums_module.get_album_buffer.cache_clear()
+
+    assert webhook_reply == {}
+    context.bot.forward_messages.assert_awaited_once()
+    assert [call.kwargs['reply_to_message_id'] for call in reply_mock.await_args_list] == [11]
+
+
+async def test_forward_feedback_reports_album_delivery_errors(monkeypatch, settings, feedback_app):
+    _, bot_config = feedback_app
+    await FeedbackChat.objects.filter(bot=bot_config).adelete()
+    settings.TELEGRAM_MEDIA_GROUP_WINDOW = 60
+    albums_module.get_album_buffer.cache_clear()
+
+    context = _build_context(bot_config, bot_id=bot_config.telegram_id)
+    error = Forbidden('bot was blocked by the user')
+    context.bot.forward_messages = AsyncMock(side_effect=error)
+    context.application.process_error = AsyncMock(return_value=True)
+    updates = [
+        SimpleNamespace(
+            effective_message=build_message(999, message_id=message_id, media_group_id='album-1')
+        )
+        for message_id in (11, 12)
+    ]
+
+    try:
+        for update in updates:
+            await messages_module.forward_feedback(update, context)
+    finally:
+        await albums_module.get_album_buffer().close()
+        albums_module.get_album_buffer.cache_clear()
+
+    context.application.process_error.assert_awaited_once_with(updates[0], error)
@@ -0,0 +1,75 @@
+"""Tests for album buffering."""
+
+from __future__ import annotations
+
+import asyncio
+from time import time
+
+import pytest
+from feedback_bot.telegram.feedback_bot.albums import AlbumBuffer
+from feedback_bot.telegram.utils import journal as journal_module
+from feedback_bot.telegram.utils.journal import UpdateJournal, processing_update
+from tests.feedback_bot.telegram.factories import build_message
+
+pytestmark = [pytest.mark.ptb, pytest.mark.asyncio]
+
+
+async def test_album_buffer_delivers_albums_after_the_window():
+    buffer = AlbumBuffer(window=0.01)
+    delivered: list[list[int]] = []
+    done = asyncio.Event()
+
+    async def deliver(messages):
+        delivered.append([message.message_id for message in messages])
+        done.set()
+
+    buffer.start('chat', build_message(1, message_id=1, media_group_id='a'), deliver)
+    assert buffer.add('chat', build_message(1, message_id=2, media_group_id='a')) is True
+    assert buffer.add('chat', build_message(1, message_id=3, media_group_id='b')) is False
+    assert buffer.add('other', build_message(1, message_id=4, media_group_id='a')) is False
+
+    await asyncio.wait_for(done.wait(), timeout=5)
+
+    assert delivered == [[1, 2]]
+    assert len(buffer) == 0
+
+
+async def test_album_buffer_close_delivers_pending_albums():
+    buffer = AlbumBuffer(window=3600)
+    delivered: list[int] = []
+
+    async def deliver(messages):
+        delivered.extend(message.message_id for message in messages)
+
+    buffer.start('chat', build_message(1, message_id=1, media_group_id='a'), deliver)
+    buffer.add('chat', build_message(1, message_id=2, media_group_id='a'))
+    await buffer.close()
+
+    assert delivered == [1, 2]
+
+
+async def test_album_buffer_marks_updates_done_after_delivery(monkeypatch, tmp_path):
+    journal = UpdateJournal(tmp_path / 'journal.sqlite3')
+    monkeypatch.setattr(journal_module, 'get_update_journal', lambda: journal)
+    buffer = AlbumBuffer(window=3600)
+
+    async def deliver(messages):
+        raise RuntimeError('boom')
+
+    try:
+        for update_id in (1, 2):
+            await journal.record('bot-1', update_id, b'{}')
+            message = build_message(1, message_id=update_id, media_group_id='a')
+            with processing_update('bot-1', update_id) as processing:
+                if update_id == 1:
+                    buffer.start('chat', message, deliver)
+                else:
+                    buffer.add('chat', message)
+            assert processing.deferred is True
+
+        assert len(await journal.unfinished(received_before=time() + 1)) == 2
+        # A failed delivery was reported like a failed handler, so its updates are done too
+        await buffer.close()
+        assert await journal.unfinished(received_before=time() + 1) == []
+    finally:
+        journal.close()
@@ -0,0 +1,42 @@
+"""Tests for the token-bucket antiflood engine."""
+
+from __future__ import annotations
+
+import datetime as dt
+from types import SimpleNamespace
+
+from feedback_bot.telegram.feedback_bot.antiflood import AntifloodEngine, FloodVerdict
+
+START = dt.datetime(2025, 1, 1, 12, 0, tzinfo=dt.UTC)
+BOT = SimpleNamespace(pk=1, antiflood_seconds=60)
+
+
+def _at(seconds: float) -> dt.datetime:
+    return START + dt.timedelta(seconds=seconds)
+
+
+def test_antiflood_allows_bursts_then_warns_once_per_period():
+    engine = AntifloodEngine(maxsize=10, burst=3)
+
+    verdicts = [engine.check(BOT, 7, None, _at(second)) for second in (0, 1, 2, 3, 4, 30)]
+
+    assert verdicts == [
+        FloodVerdict.ALLOW,
+        FloodVerdict.ALLOW,
+        FloodVerdict.ALLOW,
+        FloodVerdict.WARN,
+        FloodVerdict.DROP,
+        FloodVerdict.DROP,
+    ]
+    # One message refills every 60 seconds, and other users have their own buckets
+    assert engine.check(BOT, 7, None, _at(62)) is FloodVerdict.ALLOW
+    assert engine.check(BOT, 7, None, _at(63)) is FloodVerdict.WARN
+    assert engine.check(BOT, 8, None, _at(63)) is FloodVerdict.ALLOW
+
+
+def test_antiflood_seeds_buckets_from_feedback_chat():
+    engine = AntifloodEngine(maxsize=10, burst=1)
+    chat = SimpleNamespace(pk=5, last_feedback_at=_at(0), last_warning_at=_at(10))
+
+    assert engine.check(BOT, 7, chat, _at(20)) is FloodVerdict.DROP
+    assert engine.check(BOT, 7, chat, _at(70)) is FloodVerdict.ALLOW
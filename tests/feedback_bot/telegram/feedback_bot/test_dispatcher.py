@@ -0,0 +1,46 @@
+"""Tests for the fast-ack feedback update dispatcher."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from feedback_bot.telegram.feedback_bot import dispatcher as dispatcher_module
+
+pytestmark = [pytest.mark.ptb, pytest.mark.asyncio]
+
+
+@pytest.fixture
+def processed(monkeypatch) -> list[tuple[str, dict]]:
+    calls: list[tuple[str, dict]] = []
+
+    async def fake_process(bot_uuid, bot_config, payload):
+        await asyncio.sleep(0)
+        if payload.get('boom'):
+            raise RuntimeError('boom')
+        calls.append((bot_uuid, payload))
+
+    monkeypatch.setattr(dispatcher_module, 'process_feedback_update', fake_process)
+    return calls
+
+
+async def test_dispatcher_processes_submitted_updates(processed):
+    dispatcher = dispatcher_module.UpdateDispatcher(workers=2, queue_size=10)
+
+    assert dispatcher.submit('bot-1', object(), {'update_id': 1}) is True
+    assert dispatcher.submit('bot-1', object(), {'update_id': 2, 'boom': True}) is True
+    assert dispatcher.submit('bot-2', object(), {'update_id': 3}) is True
+    await dispatcher.stop()
+
+    assert sorted(payload['update_id'] for _, payload in processed) == [1, 3]
+    assert dispatcher.pending == 0
+
+
+async def test_dispatcher_rejects_updates_when_queue_is_full(processed):
+    dispatcher = dispatcher_module.UpdateDispatcher(workers=1, queue_size=1)
+
+    assert dispatcher.submit('bot-1', object(), {'update_id': 1}) is True
+    assert dispatcher.submit('bot-1', object(), {'update_id': 2}) is False
+    await dispatcher.stop()
+
+    assert [payload['update_id'] for _, payload in processed] == [1]
@@ -0,0 +1,114 @@
+"""Tests for the pooled feedback bot applications."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from feedback_bot.telegram.feedback_bot import pool as pool_module
+
+pytestmark = [pytest.mark.ptb, pytest.mark.asyncio]
+
+
+class FakeApplication:
+    def __init__(self, bot_config) -> None:
+        self.bot_config = bot_config
+        self.bot_data: dict[str, object] = {}
+        self.initialized = 0
+        self.shut_down = 0
+
+    async def initialize(self) -> None:
+        self.initialized += 1
+
+    async def shutdown(self) -> None:
+        self.shut_down += 1
+
+
+@pytest.fixture
+def built(monkeypatch) -> list[FakeApplication]:
+    applications: list[FakeApplication] = []
+
+    def fake_build(bot_config):
+        application = FakeApplication(bot_config)
+        applications.append(application)
+        return application
+
+    monkeypatch.setattr(pool_module, 'build_feedback_bot_application', fake_build)
+    return applications
+
+
+def _config(token: str = 'token-a') -> SimpleNamespace:  # noqa: S107
+    return SimpleNamespace(_token=token)
+
+
+async def test_pool_reuses_initialized_application(built):
+    pool = pool_module.ApplicationPool(max_size=4, idle_timeout=0)
+    first_config, second_config = _config(), _config()
+
+    async with pool.application('bot-1', first_config) as first:
+        pass
+    async with pool.application('bot-1', second_config) as second:
+        pass
+
+    assert first is second
+    assert len(built) == 1
+    assert first.initialized == 1
+    assert first.bot_data['bot_config'] is second_config
+
+
+async def test_pool_rebuilds_when_token_changes(built):
+    pool = pool_module.ApplicationPool(max_size=4, idle_timeout=0)
+
+    async with pool.application('bot-1', _config('token-a')) as first:
+        pass
+    async with pool.application('bot-1', _config('token-b')) as second:
+        pass
+    await asyncio.sleep(0)
+
+    assert first is not second
+    assert first.shut_down == 1
+    assert second.shut_down == 0
+
+
+async def test_pool_evicts_least_recently_used(built):
+    pool = pool_module.ApplicationPool(max_size=2, idle_timeout=0)
+
+    for bot_uuid in ('bot-1', 'bot-2', 'bot-1', 'bot-3'):
+        async with pool.application(bot_uuid, _config()):
+            pass
+    await asyncio.sleep(0)
+
+    assert 'bot-1' in pool
+    assert 'bot-2' not in pool
+    assert 'bot-3' in pool
+    assert [application.shut_down for application in built] == [0, 1, 0]
+
+
+async def test_pool_defers_shutdown_while_in_use(built):
+    pool = pool_module.ApplicationPool(max_size=4, idle_timeout=0)
+
+    async with pool.application('bot-1', _config()) as application:
+        pool.invalidate('bot-1')
+        await asyncio.sleep(0)
+        assert application.shut_down == 0
+    await asyncio.sleep(0)
+
+    assert application.shut_down == 1
+    assert 'bot-1' not in pool
+
+
+async def test_pool_drops_idle_applications(built, monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(pool_module, 'monotonic', lambda: clock.now)
+    pool = pool_module.ApplicationPool(max_size=4, idle_timeout=60)
+
+    async with pool.application('bot-1', _config()):
+        pass
+    clock.now += 120
+    async with pool.application('bot-2', _config()):
+        pass
+    await pool.close()
+
+    assert 'bot-1' not in pool
+    assert [application.shut_down for application in built] == [1, 1]
@@ -0,0 +1,155 @@
+"""Tests for feedback bot webhook registration at startup."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from feedback_bot.telegram.feedback_bot import bot as bot_module
+from feedback_bot.telegram.utils.cryptography import (
+    generate_bot_webhook_secret,
+    hash_bot_webhook_secret,
+)
+
+pytestmark = [pytest.mark.ptb, pytest.mark.asyncio]
+
+UPDATE_TYPES = ['message', 'message_reaction']
+
+
+class FakeBot:
+    def __init__(self, token: str, registry: dict[str, dict]) -> None:
+        self.token = token
+        self.registry = registry
+
+    async def get_webhook_info(self):
+        webhook = self.registry.get(self.token, {})
+        return SimpleNamespace(
+            url=webhook.get('url', ''),
+            allowed_updates=tuple(webhook.get('allowed_updates', ())),
+            last_error_message=webhook.get('last_error_message'),
+        )
+
+    async def set_webhook(self, url, secret_token, allowed_updates):
+        await asyncio.sleep(0)
+        if self.token == 'broken':  # noqa: S105
+            raise RuntimeError('Unauthorized')
+        self.registry[self.token] = {'url': url, 'allowed_updates': allowed_updates}
+
+
+@pytest.fixture
+def registry(monkeypatch, settings) -> dict[str, dict]:
+    settings.TELEGRAM_BUILDER_BOT_WEBHOOK_URL = 'https://example.com'
+    settings.TELEGRAM_WEBHOOK_SETUP_CONCURRENCY = 2
+    webhooks: dict[str, dict] = {}
+    monkeypatch.setattr(bot_module, 'build_bot', lambda token: FakeBot(token, webhooks))
+    monkeypatch.setattr(bot_module, 'get_feedback_allowed_updates', lambda: UPDATE_TYPES)
+    return webhooks
+
+
+def _bots(monkeypatch, bots_keys: list[tuple[str, str]], secret_hashes=None) -> dict[str, str]:
+    """Serve `bots_keys` as enabled bots; returns the stored secret hashes by bot UUID."""
+    hashes = dict(secret_hashes or {})
+
+    async def fake_get_bots_keys():
+        return bots_keys
+
+    async def fake_get_bots_webhook_keys():
+        return [(bot_uuid, token, hashes.get(bot_uuid, '')) for bot_uuid, token in bots_keys]
+
+    async def fake_save_webhook_secret_hash(bot_uuid, secret_hash):
+        hashes[bot_uuid] = secret_hash
+
+    monkeypatch.setattr(bot_module, 'get_bots_keys', fake_get_bots_keys)
+    monkeypatch.setattr(bot_module, 'get_bots_webhook_keys', fake_get_bots_webhook_keys)
+    monkeypatch.setattr(bot_module, 'save_webhook_secret_hash', fake_save_webhook_secret_hash)
+    return hashes
+
+
+def _secret_hash(bot_uuid: str) -> str:
+    return hash_bot_webhook_secret(generate_bot_webhook_secret(bot_uuid))
+
+
+async def test_setup_bots_webhooks_sets_missing_and_outdated_webhooks(monkeypatch, registry):
+    registry['current'] = {
+        'url': 'https://example.com/api/webhook/uuid-1/',
+        'allowed_updates': list(reversed(UPDATE_TYPES)),
+    }
+    registry['outdated'] = {
+        'url': 'https://example.com/api/webhook/uuid-2/',
+        'allowed_updates': ['message'],
+    }
+    registry['wrong-secret'] = {
+        'url': 'https://example.com/api/webhook/uuid-3/',
+        'allowed_updates': UPDATE_TYPES,
+    }
+    hashes = _bots(
+        monkeypatch,
+        [
+            ('uuid-1', 'current'),
+            ('uuid-2', 'outdated'),
+            ('uuid-3', 'wrong-secret'),
+            ('uuid-4', 'new'),
+            ('uuid-5', 'broken'),
+        ],
+        # The secret of uuid-3 was set before SECRET_KEY changed
+        {'uuid-1': _secret_hash('uuid-1'), 'uuid-2': _secret_hash('uuid-2'), 'uuid-3': 'stale'},
+    )
+    set_calls: list[str] = []
+    original_set_webhook = FakeBot.set_webhook
+
+    async def tracking_set_webhook(self, url, secret_token, allowed_updates):
+        set_calls.append(self.token)
+        await original_set_webhook(self, url, secret_token, allowed_updates)
+
+    monkeypatch.setattr(FakeBot, 'set_webhook', tracking_set_webhook)
+
+    await bot_module.setup_bots_webhooks()
+
+    assert sorted(set_calls) == ['broken', 'new', 'outdated', 'wrong-secret']
+    assert registry['new'] == {
+        'url': 'https://example.com/api/webhook/uuid-4/',
+        'allowed_updates': UPDATE_TYPES,
+    }
+    assert 'broken' not in registry
+    assert hashes['uuid-3'] == _secret_hash('uuid-3')
+    assert hashes['uuid-4'] == _secret_hash('uuid-4')
+    assert 'uuid-5' not in hashes
+
+
+async def test_setup_bots_webhooks_bounds_concurrency(monkeypatch, registry):
+    bots_keys = [(f'uuid-{index}', f'token-{index}') for index in range(6)]
+    _bots(monkeypatch, bots_keys, {bot_uuid: _secret_hash(bot_uuid) for bot_uuid, _ in bots_keys})
+    running = 0
+    peak = 0
+
+    async def slow_info(self):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return SimpleNamespace(url='', allowed_updates=(), last_error_message=None)
+
+    monkeypatch.setattr(FakeBot, 'get_webhook_info', slow_info)
+
+    await bot_module.setup_bots_webhooks()
+
+    assert peak == 2
+    assert len(registry) == 6
+
+
+async def test_remove_bots_webhooks_continues_after_failures(monkeypatch, registry):
+    _bots(monkeypatch, [('uuid-1', 'broken'), ('uuid-2', 'token-2')])
+    removed: list[str] = []
+
+    async def delete_webhook(self):
+        if self.token == 'broken':  # noqa: S105
+            raise RuntimeError('Unauthorized')
+        removed.append(self.token)
+
+    monkeypatch.setattr(FakeBot, 'delete_webhook', delete_webhook, raising=False)
+
+    await bot_module.remove_bots_webhooks()
+
+    assert removed == ['token-2']
@@ -0,0 +1,44 @@
+"""Tests for webhook update deduplication."""
+
+from __future__ import annotations
+
+import pytest
+from feedback_bot.telegram.utils import dedup as dedup_module
+from feedback_bot.telegram.utils import journal as journal_module
+from feedback_bot.telegram.utils.dedup import claim_update, peek_update_id, release_update
+
+
+@pytest.fixture(autouse=True)
+def local_dedup(settings):
+    settings.TELEGRAM_UPDATE_JOURNAL_PATH = ''
+    settings.TELEGRAM_UPDATE_DEDUP_WINDOW = 600
+    settings.TELEGRAM_UPDATE_DEDUP_CACHE_SIZE = 100
+    journal_module.get_update_journal.cache_clear()
+    dedup_module._seen_updates.cache_clear()
+    yield
+    journal_module.get_update_journal.cache_clear()
+    dedup_module._seen_updates.cache_clear()
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected'),
+    [
+        (b'{"update_id":42,"message":{}}', 42),
+        (b'{"message": {"text": "x"}, "update_id" : 7}', 7),
+        (b'{"message": {"text": "\\"update_id\\": 1"}}', None),
+        (b'not json', None),
+    ],
+)
+def test_peek_update_id(body, expected):
+    assert peek_update_id(body) == expected
+
+
+@pytest.mark.asyncio
+async def test_claim_update_skips_redeliveries_per_bot():
+    assert await claim_update('bot-1', 1, b'{}') is True
+    assert await claim_update('bot-1', 1, b'{}') is False
+    assert await claim_update('bot-2', 1, b'{}') is True
+
+    await release_update('bot-1', 1)
+
+    assert await claim_update('bot-1', 1, b'{}') is True
@@ -0,0 +1,72 @@
+"""Tests for the builder update hand-off between workers."""
+
+from __future__ import annotations
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+import pytest_asyncio
+from feedback_bot.telegram.utils.handoff import (
+    UpdateHandoffClient,
+    UpdateHandoffServer,
+    UpdateRejectedError,
+)
+
+from telegram import Update
+
+pytestmark = [pytest.mark.ptb, pytest.mark.asyncio]
+
+
+@pytest_asyncio.fixture
+async def handoff(tmp_path):
+    application = SimpleNamespace(bot=None, update_queue=asyncio.Queue())
+    server = UpdateHandoffServer(tmp_path / 'handoff.sock', application)
+    await server.start()
+    client = UpdateHandoffClient(server.path)
+    yield application, server, client
+    await client.close()
+    await server.close()
+
+
+async def test_handoff_queues_updates_on_the_lock_holder(handoff):
+    application, server, client = handoff
+
+    await client.forward(b'{"update_id": 1}')
+    await client.forward(b'{"update_id": 2}')
+
+    first = application.update_queue.get_nowait()
+    second = application.update_queue.get_nowait()
+    assert isinstance(first, Update)
+    assert (first.update_id, second.update_id) == (1, 2)
+    assert server.stats.count == 2
+    assert client.stats.count == 2
+
+
+async def test_handoff_rejects_invalid_updates(handoff):
+    application, _, client = handoff
+
+    with pytest.raises(UpdateRejectedError):
+        await client.forward(b'not json')
+
+    await client.forward(b'{"update_id": 3}')
+    assert application.update_queue.get_nowait().update_id == 3
+
+
+async def test_handoff_fails_without_a_lock_holder(tmp_path):
+    client = UpdateHandoffClient(tmp_path / 'missing.sock')
+
+    with pytest.raises(FileNotFoundError):
+        await client.forward(b'{"update_id": 1}')
+
+
+async def test_handoff_reconnects_after_the_lock_holder_restarts(handoff):
+    application, server, client = handoff
+    await client.forward(b'{"update_id": 1}')
+
+    await server.close()
+    await asyncio.sleep(0)
+    await server.start()
+    await client.forward(b'{"update_id": 2}')
+
+    assert [application.update_queue.get_nowait().update_id for _ in range(2)] == [1, 2]
@@ -0,0 +1,33 @@
+"""Tests for the shared Bot API connection pool."""
+
+from __future__ import annotations
+
+import pytest
+from feedback_bot.telegram.utils import http as http_module
+
+pytestmark = [pytest.mark.ptb, pytest.mark.asyncio]
+
+
+@pytest.fixture(autouse=True)
+def fresh_shared_request():
+    http_module.get_shared_request.cache_clear()
+    yield
+    http_module.get_shared_request.cache_clear()
+
+
+async def test_bots_share_one_request_that_outlives_them():
+    first = http_module.build_bot('1111111111:aaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaaa')
+    second = http_module.build_bot('2222222222:bbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbbb')
+    request = http_module.get_shared_request()
+
+    assert first.request is request
+    assert second.request is request
+
+    await request.shutdown()
+
+    assert not request._client.is_closed
+
+    await http_module.close_shared_request()
+
+    assert request._client.is_closed
+    assert http_module.get_shared_request.cache_info().currsize == 0
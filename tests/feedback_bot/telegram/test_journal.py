@@ -0,0 +1,62 @@
+"""Tests for the durable webhook update journal."""
+
+from __future__ import annotations
+
+from time import time
+
+import pytest
+from feedback_bot.telegram.utils.journal import JournalEntry, UpdateJournal
+
+pytestmark = pytest.mark.asyncio
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = UpdateJournal(tmp_path / 'journal.sqlite3', max_attempts=2)
+    yield journal
+    journal.close()
+
+
+async def test_journal_replays_only_unfinished_updates(journal):
+    assert await journal.record('bot-1', 1, b'{"update_id": 1}') is True
+    assert await journal.record('bot-1', 1, b'{"update_id": 1}') is False
+    assert await journal.record('bot-1', 2, b'{"update_id": 2}') is True
+    await journal.mark_done('bot-1', 1)
+
+    entries = await journal.unfinished(received_before=time() + 1)
+
+    assert entries == [JournalEntry('bot-1', 2, b'{"update_id": 2}')]
+
+
+async def test_journal_gives_up_after_max_attempts(journal):
+    await journal.record('builder', 7, b'{}')
+
+    assert len(await journal.unfinished(received_before=time() + 1)) == 1
+    assert len(await journal.unfinished(received_before=time() + 1)) == 1
+    assert await journal.unfinished(received_before=time() + 1) == []
+
+
+async def test_journal_prunes_finished_updates(journal):
+    await journal.record('bot-1', 1, b'{}')
+    await journal.record('bot-1', 2, b'{}')
+    await journal.mark_done('bot-1', 1)
+
+    assert await journal.prune(done_before=time() + 1) == 1
+    assert await journal.record('bot-1', 2, b'{}') is False
+
+
+async def test_journal_reclaims_abandoned_updates(tmp_path):
+    journal = UpdateJournal(tmp_path / 'journal.sqlite3', stale_after=0)
+    await journal.record('bot-1', 1, b'{}')
+    await journal.record('bot-1', 2, b'{}')
+    await journal.mark_done('bot-1', 2)
+
+    assert await journal.record('bot-1', 1, b'{}') is True
+    assert await journal.record('bot-1', 2, b'{}') is False
+
+    await journal.forget('bot-1', 1)
+    await journal.forget('bot-1', 2)
+
+    assert await journal.unfinished(received_before=time() + 1) == []
+    assert await journal.record('bot-1', 2, b'{}') is False
+    journal.close()
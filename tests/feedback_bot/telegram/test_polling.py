@@ -0,0 +1,180 @@
+"""Tests for the long-polling engine."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from feedback_bot.telegram import polling as polling_module
+from feedback_bot.telegram.polling import OffsetStore, PollingEngine
+from feedback_bot.telegram.utils import dedup as dedup_module
+from feedback_bot.telegram.utils import journal as journal_module
+from tests.feedback_bot.telegram.factories import build_message, build_update
+
+from telegram.error import Conflict
+
+pytestmark = pytest.mark.ptb
+
+
+class FakeBot:
+    """Serves queued batches from getUpdates, then long-polls forever."""
+
+    def __init__(self, token: str, batches: list) -> None:
+        self.token = token
+        self.batches = batches
+        self.offsets: list[int | None] = []
+        self.webhook_deleted = False
+
+    async def get_updates(self, offset, timeout, allowed_updates):
+        self.offsets.append(offset)
+        if self.batches:
+            batch = self.batches.pop(0)
+            if isinstance(batch, Exception):
+                raise batch
+            return batch
+        await asyncio.sleep(3600)
+        return ()
+
+    async def delete_webhook(self):
+        self.webhook_deleted = True
+        return True
+
+
+@pytest.fixture(autouse=True)
+def local_dedup(settings):
+    settings.TELEGRAM_UPDATE_JOURNAL_PATH = ''
+    journal_module.get_update_journal.cache_clear()
+    dedup_module._seen_updates.cache_clear()
+    yield
+    dedup_module._seen_updates.cache_clear()
+
+
+def test_offset_store_persists_offsets(tmp_path):
+    path = tmp_path / 'offsets.json'
+    offsets = OffsetStore(path)
+    offsets.advance('bot-1', 10)
+    offsets.advance('bot-1', 5)
+    offsets.save()
+
+    assert OffsetStore(path).get('bot-1') == 10
+    assert OffsetStore(path).get('bot-2') is None
+
+
+def test_offset_store_ignores_unreadable_file(tmp_path):
+    path = tmp_path / 'offsets.json'
+    path.write_text('not json')
+
+    assert OffsetStore(path).get('bot-1') is None
+
+
+@pytest.mark.asyncio
+async def test_polling_engine_processes_feedback_updates_in_order(monkeypatch, tmp_path):
+    batches = [
+        Conflict('terminated by setWebhook request'),
+        [
+            build_update(build_message(1, chat_id=1, text='first'), update_id=7),
+            build_update(build_message(2, chat_id=2, text='other'), update_id=8),
+            build_update(build_message(1, chat_id=1, text='second'), update_id=9),
+        ],
+    ]
+    bots: dict[str, FakeBot] = {}
+    processed: list[tuple[str, str]] = []
+    done = asyncio.Event()
+
+    def fake_build_bot(token):
+        bots[token] = FakeBot(token, batches)
+        return bots[token]
+
+    async def fake_get_bots_keys():
+        return [('uuid-1', 'token-1')]
+
+    async def fake_get_bot_config(bot_uuid):
+        return object()
+
+    async def fake_process(bot_uuid, bot_config, payload):
+        processed.append((bot_uuid, payload['message']['text']))
+        if len(processed) == 3:
+            done.set()
+
+    monkeypatch.setattr(polling_module, 'build_bot', fake_build_bot)
+    monkeypatch.setattr(polling_module, 'get_bots_keys', fake_get_bots_keys)
+    monkeypatch.setattr(polling_module, 'get_bot_config', fake_get_bot_config)
+    monkeypatch.setattr(polling_module, 'get_feedback_allowed_updates', lambda: ['message'])
+    monkeypatch.setattr(polling_module, 'process_feedback_update', fake_process)
+
+    offsets = OffsetStore(tmp_path / 'offsets.json')
+    engine = PollingEngine(None, offsets, concurrency=4, timeout=30)
+    task = asyncio.create_task(engine.run())
+    await asyncio.wait_for(done.wait(), timeout=5)
+    while offsets.get('uuid-1') is None:
+        await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    texts = [text for _, text in processed]
+    assert texts.index('first') < texts.index('second')
+    assert bots['token-1'].webhook_deleted is True
+    assert OffsetStore(tmp_path / 'offsets.json').get('uuid-1') == 10
+
+
+@pytest.mark.asyncio
+async def test_poll_timeout_shrinks_when_bots_outnumber_slots(tmp_path):
+    engine = PollingEngine(None, OffsetStore(tmp_path / 'offsets.json'), concurrency=2, timeout=30)
+    loop = asyncio.get_running_loop()
+    engine._tasks = {(f'bot-{index}', 'token'): loop.create_future() for index in range(6)}
+
+    assert engine.poll_timeout == 10
+
+
+@pytest.mark.asyncio
+async def test_poll_retries_batch_that_failed_to_handle(monkeypatch, tmp_path):
+    update = build_update(build_message(1, chat_id=1, text='retried'), update_id=7)
+    bot = FakeBot('token-1', [[update], [update]])
+    handled: list[int] = []
+    done = asyncio.Event()
+
+    async def handle(updates):
+        handled.append(updates[0].update_id)
+        if len(handled) == 1:
+            raise RuntimeError('database is locked')
+        done.set()
+
+    monkeypatch.setattr(polling_module, 'MAX_BACKOFF', 0)
+    offsets = OffsetStore(tmp_path / 'offsets.json')
+    engine = PollingEngine(None, offsets, concurrency=1, timeout=30)
+    task = asyncio.create_task(engine._poll('uuid-1', bot, ['message'], handle))
+    await asyncio.wait_for(done.wait(), timeout=5)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    assert handled == [7, 7]
+    assert bot.offsets[:2] == [None, None]
+    assert offsets.get('uuid-1') == 8
+
+
+@pytest.mark.asyncio
+async def test_refresh_restarts_stopped_pollers(monkeypatch, tmp_path):
+    started: list[str] = []
+
+    async def fake_get_bots_keys():
+        return [('uuid-1', 'token-1')]
+
+    def fake_build_bot(token):
+        started.append(token)
+        return FakeBot(token, [])
+
+    monkeypatch.setattr(polling_module, 'build_bot', fake_build_bot)
+    monkeypatch.setattr(polling_module, 'get_bots_keys', fake_get_bots_keys)
+    monkeypatch.setattr(polling_module, 'get_feedback_allowed_updates', lambda: ['message'])
+
+    engine = PollingEngine(None, OffsetStore(tmp_path / 'offsets.json'), concurrency=1, timeout=30)
+    crashed = asyncio.get_running_loop().create_future()
+    crashed.set_exception(RuntimeError('boom'))
+    engine._tasks[('uuid-1', 'token-1')] = crashed
+    await engine._refresh()
+
+    assert started == ['token-1']
+    assert engine._tasks[('uuid-1', 'token-1')] is not crashed
+    await engine.stop()
@@ -0,0 +1,57 @@
+"""Tests for the conversation-ordered update processor."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from feedback_bot.telegram.utils.update_processor import (
+    ConversationUpdateProcessor,
+    conversation_key,
+    payload_conversation_key,
+)
+from tests.feedback_bot.telegram.factories import build_message, build_update
+
+pytestmark = pytest.mark.ptb
+
+
+def test_conversation_key_uses_chat_and_matches_raw_payload():
+    update = build_update(build_message(42, chat_id=777))
+
+    assert conversation_key(update) == 777
+    assert conversation_key(object()) is None
+    assert payload_conversation_key(update.to_dict()) == 777
+    assert payload_conversation_key({'update_id': 1, 'poll': {'id': 'x'}}) is None
+    assert payload_conversation_key({'update_id': 1, 'inline_query': {'from': {'id': 9}}}) == 9
+
+
+@pytest.mark.asyncio
+async def test_processor_serializes_conversation_and_parallelizes_others():
+    processor = ConversationUpdateProcessor(8)
+    events: list[tuple[str, str]] = []
+    release = asyncio.Event()
+
+    async def handle(name: str, *, wait: bool = False) -> None:
+        events.append(('start', name))
+        if wait:
+            await release.wait()
+        events.append(('end', name))
+
+    def submit(name: str, chat_id: int, *, wait: bool = False) -> asyncio.Task:
+        update = build_update(build_message(chat_id, chat_id=chat_id))
+        return asyncio.create_task(processor.process_update(update, handle(name, wait=wait)))
+
+    first = submit('a1', 1, wait=True)
+    second = submit('a2', 1)
+    other = submit('b1', 2)
+    await other
+    await asyncio.sleep(0)
+
+    assert ('start', 'a2') not in events
+    assert ('end', 'b1') in events
+
+    release.set()
+    await asyncio.gather(first, second)
+
+    assert events.index(('end', 'a1')) < events.index(('start', 'a2'))
+    assert not processor._locks
@@ -0,0 +1,92 @@
+"""Tests for deriving update types from registered handlers."""
+
+from __future__ import annotations
+
+import pytest
+from feedback_bot.telegram.feedback_bot.bot import (
+    get_feedback_allowed_updates,
+    get_feedback_update_types,
+)
+from feedback_bot.telegram.utils.update_types import (
+    MESSAGE_UPDATE_TYPES,
+    allowed_updates,
+    handler_update_types,
+    handlers_update_types,
+    peek_update_type,
+)
+
+from telegram import Update
+from telegram.ext import (
+    CallbackQueryHandler,
+    ChatMemberHandler,
+    CommandHandler,
+    ConversationHandler,
+    MessageHandler,
+    MessageReactionHandler,
+    TypeHandler,
+    filters,
+)
+
+pytestmark = pytest.mark.ptb
+
+
+async def _noop(update, context) -> None:
+    return None
+
+
+def test_handler_update_types_by_handler_kind():
+    assert handler_update_types(MessageHandler(filters.ALL, _noop)) == MESSAGE_UPDATE_TYPES
+    assert handler_update_types(CommandHandler('start', _noop)) == MESSAGE_UPDATE_TYPES
+    assert handler_update_types(CallbackQueryHandler(_noop)) == {'callback_query'}
+    assert handler_update_types(MessageReactionHandler(_noop)) == {
+        'message_reaction',
+        'message_reaction_count',
+    }
+    assert handler_update_types(
+        MessageReactionHandler(
+            _noop, message_reaction_types=MessageReactionHandler.MESSAGE_REACTION_UPDATED
+        )
+    ) == {'message_reaction'}
+    assert handler_update_types(ChatMemberHandler(_noop)) == {'my_chat_member'}
+    assert handler_update_types(TypeHandler(object, _noop)) is None
+
+
+def test_handlers_update_types_unions_conversation_handlers():
+    conversation = ConversationHandler(
+        entry_points=[CommandHandler('start', _noop)],
+        states={0: [CallbackQueryHandler(_noop)]},
+        fallbacks=[],
+    )
+
+    assert handlers_update_types([conversation]) == MESSAGE_UPDATE_TYPES | {'callback_query'}
+    assert handlers_update_types([conversation, TypeHandler(object, _noop)]) is None
+
+
+def test_feedback_bot_handlers_skip_unrelated_update_types():
+    update_types = get_feedback_update_types()
+
+    assert update_types is not None
+    assert {'message', 'edited_message', 'message_reaction'} <= update_types
+    assert 'callback_query' not in update_types
+    assert 'poll' not in update_types
+
+
+def test_allowed_updates_falls_back_to_all_types():
+    assert allowed_updates([CallbackQueryHandler(_noop), ChatMemberHandler(_noop)]) == [
+        'callback_query',
+        'my_chat_member',
+    ]
+    assert allowed_updates([TypeHandler(object, _noop)]) == Update.ALL_TYPES
+    assert set(get_feedback_allowed_updates()) == get_feedback_update_types()
+
+
+@pytest.mark.parametrize(
+    ('body', 'expected'),
+    [
+        (b'{"update_id":1,"message":{"text":"hi"}}', 'message'),
+        (b'{"update_id": 2, "poll": {}}', 'poll'),
+        (b'{"poll": {}, "update_id": 2}', None),
+    ],
+)
+def test_peek_update_type(body, expected):
+    assert peek_update_type(body) == expected
@@ -0,0 +1,35 @@
+"""Tests for the periodic write-behind flusher."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from feedback_bot.utils.flusher import PeriodicFlusher
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_flusher_flushes_periodically_and_on_stop():
+    flushes: list[int] = []
+
+    async def flush():
+        flushes.append(len(flushes))
+
+    async def broken_flush():
+        raise RuntimeError('database is down')
+
+    flusher = PeriodicFlusher(interval=0.1)
+    flusher.register(broken_flush)
+    flusher.register(flush)
+    assert flusher.running is False
+
+    flusher.start()
+    assert flusher.running is True
+    await asyncio.sleep(0.25)
+    periodic = len(flushes)
+    await flusher.stop()
+
+    assert periodic >= 2
+    assert len(flushes) > periodic
+    assert flusher.running is False
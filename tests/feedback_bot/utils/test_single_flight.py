@@ -0,0 +1,45 @@
+"""Tests for single-flight call deduplication."""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+from feedback_bot.utils.single_flight import SingleFlight
+
+pytestmark = pytest.mark.asyncio
+
+
+async def test_single_flight_shares_one_call_between_concurrent_callers():
+    flight: SingleFlight[str, int] = SingleFlight()
+    calls = 0
+
+    async def call():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    results = await asyncio.gather(*(flight.run('key', call) for _ in range(5)))
+
+    assert results == [1, 1, 1, 1, 1]
+    assert 'key' not in flight
+    assert await flight.run('key', call) == 2
+
+
+async def test_single_flight_shares_exceptions_then_retries():
+    flight: SingleFlight[str, int] = SingleFlight()
+
+    async def failing():
+        await asyncio.sleep(0.01)
+        raise RuntimeError('boom')
+
+    async def succeeding():
+        return 1
+
+    results = await asyncio.gather(
+        flight.run('key', failing), flight.run('key', succeeding), return_exceptions=True
+    )
+
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
+    assert await flight.run('key', succeeding) == 1